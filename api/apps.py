@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from celery.signals import task_postrun, task_prerun
+        from django.db.backends.signals import connection_created
+
+        from . import metrics
+
+        connection_created.connect(metrics.install_query_timer)
+        task_prerun.connect(metrics.task_started)
+        task_postrun.connect(metrics.task_finished)
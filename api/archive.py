@@ -0,0 +1,80 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedAuction, ArchivedAuctionImage, ArchivedBid, Auction, AuctionImage, Bid, FeedEntry,
+)
+
+# Auctions closed for longer than ARCHIVE_AFTER are moved, with their bids
+# and images, into the archive tables, so the live tables hold only open
+# and recently closed auctions. Ids are kept, and the *Record models read
+# both, so listings and details don't change. Followed-auction feeds drop
+# archived auctions. Image files stay where they are.
+
+MOVES = [
+    (Auction, ArchivedAuction, 'pk'),
+    (Bid, ArchivedBid, 'auction_id'),
+    (AuctionImage, ArchivedAuctionImage, 'auction_id'),
+]
+
+
+def _copy(source, target, field, ids):
+    columns = [f.column for f in target._meta.concrete_fields]
+    select, params = (
+        source.objects.filter(**{f'{field}__in': ids}).order_by().values_list(*columns).query.sql_with_params()
+    )
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(target._meta.db_table)} ({', '.join(map(quote, columns))}) {select}", params)
+
+
+def _delete(model, column, ids):
+    # Raw rather than QuerySet.delete(), which would load every bid to
+    # clear Auction.winning_bid first.
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})", ids)
+
+
+def archive_auctions(auctions):
+    """
+    Move the closed auctions in `auctions` to the archive tables, in one
+    transaction. Returns the ids that were moved.
+    """
+    with transaction.atomic():
+        ids = list(
+            auctions.filter(closed=True)
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)
+        )
+        if not ids:
+            return []
+
+        # The authors' live version sums drop; see ListUserAuctions.
+        Auction.objects.filter(pk__in=ids).bump_author_versions()
+        for source, target, field in MOVES:
+            _copy(source, target, field, ids)
+        _delete(FeedEntry, 'auction_id', ids)
+        _delete(AuctionImage, 'auction_id', ids)
+        _delete(Bid, 'auction_id', ids)
+        _delete(Auction, 'id', ids)
+
+    return ids
+
+
+def archive_due(archive_after, batch_size, max_batches):
+    """Archive auctions whose deadline is more than `archive_after` ago, in bounded batches."""
+    archived = 0
+    for _ in range(max_batches):
+        ids = list(
+            Auction.objects.filter(closed=True, deadline__lte=timezone.now() - archive_after)
+            .order_by('deadline').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        moved = archive_auctions(Auction.objects.filter(pk__in=ids))
+        archived += len(moved)
+        if len(ids) < batch_size or not moved:
+            break
+    return archived
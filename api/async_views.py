@@ -0,0 +1,131 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from .views import (
+    ListCreateAuctionAPIView,
+    ListCreateBidAPIView,
+    RetrieveAuctionAPIView,
+    RetrieveUserAPIView,
+)
+
+# Async GET handlers for the hot read endpoints, for the ASGI application.
+#
+# Each one borrows its DRF view's configuration (authentication, filters,
+# pagination, serializer, response cache) and runs DRF's request setup
+# inline: read requests authenticate from the token alone, so nothing
+# there touches the database. Requests a throttle applies to run it in a
+# thread, as it calls Redis. Queries and cache lookups are awaited, and
+# the response goes through the same serializer and renderer, so the JSON
+# is identical to the DRF view's. Other methods are handed to the DRF view
+# as they are.
+
+
+class AsyncReadView(View):
+    drf_view = None
+    drf_handler = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        drf_handler = sync_to_async(cls.drf_view.as_view())
+        return csrf_exempt(super().as_view(drf_handler=drf_handler, **initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return self.get(request, *args, **kwargs)
+        return self.drf_handler(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        drf_view = self.drf_view()
+        drf_view.setup(request, *args, **kwargs)
+        drf_view.args, drf_view.kwargs = args, kwargs
+        request = drf_view.initialize_request(request, *args, **kwargs)
+        drf_view.request = request
+        drf_view.headers = drf_view.default_response_headers
+
+        try:
+            if drf_view.get_throttles():
+                # Throttles call Redis, so searches take a thread for it.
+                await sync_to_async(drf_view.initial)(request, *args, **kwargs)
+            else:
+                drf_view.initial(request, *args, **kwargs)
+            response = await self.read(drf_view, request, *args, **kwargs)
+        except Exception as exc:
+            response = drf_view.handle_exception(exc)
+
+        response = drf_view.finalize_response(request, response, *args, **kwargs)
+        return self.rendered(response)
+
+    async def read(self, drf_view, request, *args, **kwargs):
+        raise NotImplementedError
+
+    @staticmethod
+    def rendered(response):
+        # Rendered here: Django would hop to a thread to render a DRF
+        # Response. `data` is kept for callers that read it, like tests.
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        rendered.data = response.data
+        return rendered
+
+
+async def list_page(drf_view, request, queryset):
+    queryset = drf_view.filter_queryset(queryset)
+    page = await drf_view.paginator.apaginate_queryset(queryset, request, view=drf_view)
+    serializer = drf_view.get_serializer(page, many=True)
+    return drf_view.get_paginated_response(serializer.data)
+
+
+async def detail(drf_view, queryset, pk):
+    instance = await queryset.filter(pk=pk).afirst()
+    if instance is None:
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+    drf_view.check_object_permissions(drf_view.request, instance)
+    return drf_view.get_serializer(instance)
+
+
+class AuctionListView(AsyncReadView):
+    drf_view = ListCreateAuctionAPIView
+
+    async def read(self, drf_view, request, *args, **kwargs):
+        async def handler(request, *args, **kwargs):
+            return await list_page(drf_view, request, drf_view.get_queryset())
+        return await drf_view.acached_response(handler, request, *args, **kwargs)
+
+
+class AuctionDetailView(AsyncReadView):
+    drf_view = RetrieveAuctionAPIView
+
+    async def read(self, drf_view, request, *args, **kwargs):
+        async def handler(request, *args, **kwargs):
+            serializer = await detail(drf_view, drf_view.get_queryset(), kwargs['auction_id'])
+            return Response(serializer.data)
+        return await drf_view.aconditional_response(
+            partial(drf_view.acached_response, handler), request, *args, **kwargs
+        )
+
+
+class BidListView(AsyncReadView):
+    drf_view = ListCreateBidAPIView
+
+    async def read(self, drf_view, request, *args, **kwargs):
+        async def handler(request, *args, **kwargs):
+            if drf_view.current_version is None:
+                raise Http404("No Auction matches the given query.")
+            return await list_page(drf_view, request, drf_view.bids(kwargs['auction_id']))
+        return await drf_view.aconditional_response(handler, request, *args, **kwargs)
+
+
+class UserDetailView(AsyncReadView):
+    drf_view = RetrieveUserAPIView
+
+    async def read(self, drf_view, request, *args, **kwargs):
+        serializer = await detail(drf_view, drf_view.get_queryset(), kwargs['user_id'])
+        return Response(serializer.data)
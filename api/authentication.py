@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser as BaseTokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+# The User fields requests read from request.user. Only these are loaded
+# and cached: the password hash and the profile fields stay out.
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class TokenUser(BaseTokenUser):
+    """A user built from token claims, with the integer id the models use."""
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that keeps loaded users, with only USER_FIELDS, for
+    AUTH_USER_CACHE_TIMEOUT seconds, so deactivating a user can take that
+    long to lock them out.
+    """
+
+    def get_user(self, validated_token):
+        key = user_cache_key(validated_token.get(api_settings.USER_ID_CLAIM))
+        user = cache.get(key)
+        if user is None:
+            user = self.load_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    def load_user(self, validated_token):
+        # JWTAuthentication.get_user without loading the whole row. It skips
+        # CHECK_REVOKE_TOKEN, which needs the password hash; it is off here.
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = self.user_model.objects.only(*USER_FIELDS).filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class StatelessReadJWTAuthentication(CachedJWTAuthentication):
+    """
+    Reads authenticate from the token alone: request.user is a TokenUser
+    carrying the id and username claims, and no query is made. Writes get
+    the full (cached) User.
+    """
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.stateless and api_settings.USER_ID_CLAIM in validated_token:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        return super().get_user(validated_token)
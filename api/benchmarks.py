@@ -0,0 +1,73 @@
+import itertools
+import math
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SYLLABLES = "ka lo mi ne su ta ri po ve da gu hi zo be ny fa".split()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def latency_summary(samples):
+    """Summarise latencies given in seconds as milliseconds."""
+    return {
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'max_ms': round(max(samples, default=0.0) * 1000, 3),
+    }
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def zipf_cum_weights(count, exponent=1.0):
+    """Cumulative weights making rank 1 the most likely of `count` choices."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def bench_host():
+    # DEBUG only allows localhost when ALLOWED_HOSTS is empty.
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def request_factory():
+    from rest_framework.test import APIRequestFactory
+
+    return APIRequestFactory(HTTP_HOST=bench_host())
+
+
+def test_client(asgi=False):
+    """
+    A client that goes through URL routing and the full middleware stack,
+    through the ASGI handler if `asgi`; its request methods are then coroutines.
+    """
+    from django.test import AsyncClient, Client
+
+    return (AsyncClient if asgi else Client)(HTTP_HOST=bench_host())
+
+
+def measure(fn, repeat):
+    """Call `fn` `repeat` times, returning per-call latencies and query counts."""
+    latencies, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+    return latencies, queries
@@ -0,0 +1,124 @@
+import logging
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.http import Http404
+from django.utils import timezone
+from .models import Auction, Bid
+from . import events, ledger
+from .cache import auctions_changed
+
+logger = logging.getLogger(__name__)
+
+
+class BidRejected(Exception):
+    OWN_AUCTION = 'own_auction'
+    ENDED = 'ended'
+    OUTBID = 'outbid'
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.message = message
+        self.reason = reason
+
+
+def place_bid(auction_id, bidder, amount):
+    """
+    Accept or reject a bid with a single conditional UPDATE on the auction row.
+
+    The UPDATE only matches while the auction is open, not authored by the
+    bidder and `amount` clears the current price plus the minimal increment.
+    The row lock it takes serializes concurrent bidders, so of two racing
+    bids only one can match the increment against the same current price.
+
+    Auctions flagged `is_hot` are decided by the Redis ledger instead when
+    HOT_AUCTION_LEDGER is on; the returned Bid is then not saved yet. If
+    Redis fails they fall back to the UPDATE.
+    """
+    amount = Decimal(amount)
+    now = timezone.now()
+
+    auctions = Auction.objects.filter(pk=auction_id, closed=False, deadline__gte=now)
+    bid = _update(auctions.filter(is_hot=False) if ledger.enabled() else auctions, auction_id, bidder, amount, now)
+    if bid is not None:
+        return bid
+
+    auction = _get_auction(auction_id)
+
+    if ledger.enabled() and auction.is_hot and not auction.closed:
+        try:
+            outcome = ledger.try_place_bid(auction_id, bidder, amount, now)
+            if outcome is None:
+                ledger.load(auction)
+                outcome = ledger.try_place_bid(auction_id, bidder, amount, now)
+        except Exception:
+            logger.exception("Hot auction ledger unavailable, placing the bid on auction %s directly", auction_id)
+            bid = _update(auctions, auction_id, bidder, amount, now)
+            if bid is not None:
+                return bid
+            auction = _get_auction(auction_id)
+        else:
+            return _ledger_bid(auction_id, bidder, amount, now, outcome)
+
+    raise _rejection(auction, bidder, now)
+
+
+def _update(auctions, auction_id, bidder, amount, now):
+    with transaction.atomic():
+        accepted = auctions.exclude(
+            author_id=bidder.pk,
+        ).filter(
+            Q(bid_count=0, minimal_bid__lte=amount)
+            | Q(bid_count__gt=0, current_price__lte=Value(amount) - F('minimal_bid'))
+        ).update(
+            current_price=amount,
+            bid_count=F('bid_count') + 1,
+            last_bid_on=now,
+            version=F('version') + 1,
+        )
+
+        if not accepted:
+            return None
+        auctions_changed()
+        bid = Bid.objects.create(auction_id=auction_id, bidder=bidder, amount=amount, placed_on=now)
+        events.bid_placed(bid)
+        return bid
+
+
+def _ledger_bid(auction_id, bidder, amount, now, outcome):
+    result, required = outcome
+    if result == 'accepted':
+        # No id until api.tasks.flush_hot_bids writes it.
+        bid = Bid(auction_id=auction_id, bidder=bidder, amount=amount, placed_on=now)
+        events.bid_placed(bid)
+        return bid
+    if result == BidRejected.OWN_AUCTION:
+        raise BidRejected("You can't bid on your auction", BidRejected.OWN_AUCTION)
+    if result == BidRejected.ENDED:
+        raise BidRejected("Auction has ended", BidRejected.ENDED)
+    raise BidRejected(f"Bid must be at least ${required}", BidRejected.OUTBID)
+
+
+def _get_auction(auction_id):
+    auction = Auction.objects.filter(pk=auction_id).only(
+        'author', 'closed', 'deadline', 'current_price', 'bid_count', 'minimal_bid', 'is_hot'
+    ).first()
+
+    if auction is None:
+        raise Http404("No Auction matches the given query.")
+    return auction
+
+
+def _rejection(auction, bidder, now):
+    if auction.author_id == bidder.pk:
+        return BidRejected("You can't bid on your auction", BidRejected.OWN_AUCTION)
+
+    if auction.closed or auction.deadline < now:
+        return BidRejected("Auction has ended", BidRejected.ENDED)
+
+    return BidRejected(f"Bid must be at least ${minimal_allowed(auction)}", BidRejected.OUTBID)
+
+
+def minimal_allowed(auction):
+    highest_amount = Decimal(auction.current_price) if auction.bid_count else Decimal('0')
+    return Decimal(auction.minimal_bid) + highest_amount
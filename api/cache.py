@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_redis.client import DefaultClient # type: ignore
+from rest_framework.response import Response
+
+from .routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+# Cached responses are keyed on a version number rather than deleted:
+# writes bump the version, so older entries are simply never read again
+# and expire on their own. Listings use a version kept here, bumped once
+# a write commits; views with an ETag use the database version the ETag
+# is computed from, so a body and its ETag always match.
+
+LISTING_VERSION_KEY = 'version:auctions'
+
+CACHED_QUERY_PARAMS = ('category', 'min_bid', 'max_bid', 'search', 'ordering', 'size', 'page', 'closed', 'cursor')
+
+
+def stats_key(name, outcome):
+    return f'stats:response-cache:{name}:{outcome}'
+
+
+def _initial_version():
+    # If a version key is evicted it restarts from the clock, which is
+    # always ahead of any version handed out before.
+    return int(time.time() * 1000)
+
+
+def _add_versions(keys):
+    # add() for each key, pipelined when the cache is Redis.
+    initial = _initial_version()
+    client = getattr(cache, 'client', None)
+    if not isinstance(client, DefaultClient):
+        for key in keys:
+            cache.add(key, initial, None)
+        return
+    try:
+        pipeline = client.get_client(write=True).pipeline()
+        for key in keys:
+            client.set(key, initial, None, client=pipeline, nx=True)
+        pipeline.execute()
+    except Exception:
+        # Like the cache's own IGNORE_EXCEPTIONS: the versions read back
+        # as None and nothing is cached under them for long.
+        logger.warning("Could not add response cache versions", exc_info=True)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        _add_versions(missing)
+        added = cache.get_many(missing)
+        versions.update({key: added.get(key) for key in missing})
+    return versions
+
+
+async def aget_versions(keys):
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        await sync_to_async(_add_versions)(missing)
+        added = await cache.aget_many(missing)
+        versions.update({key: added.get(key) for key in missing})
+    return versions
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def auctions_changed():
+    """Invalidate listings once the transaction commits."""
+    transaction.on_commit(lambda: _bump([LISTING_VERSION_KEY]))
+
+
+def normalized_params(request):
+    params = []
+    for name in CACHED_QUERY_PARAMS:
+        if name not in request.query_params:
+            continue
+        value = request.query_params.get(name, '').strip()
+        if name == 'closed':
+            value = value.lower()
+        if value or name == 'cursor':
+            params.append((name, value))
+    return urlencode(params)
+
+
+def response_key(name, host, kwargs, params, versions):
+    raw = '|'.join([host, repr(sorted(kwargs.items())), params, *map(str, versions)])
+    return f'response:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def record(name, outcome):
+    key = stats_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+async def arecord(name, outcome):
+    key = stats_key(name, outcome)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+def stats(names):
+    keys = {stats_key(name, outcome): (name, outcome) for name in names for outcome in ('hits', 'misses')}
+    values = cache.get_many(list(keys))
+    result = {name: {'hits': 0, 'misses': 0} for name in names}
+    for key, (name, outcome) in keys.items():
+        result[name][outcome] = values.get(key, 0)
+    return result
+
+
+class CachedResponseMixin:
+    """
+    Serve GET responses from the cache, keyed on the view, its URL kwargs,
+    the normalized query params and the versions in `get_cache_versions`,
+    or, behind ConditionalGetMixin, the version found for the ETag.
+    """
+    cache_name = None
+
+    def get_cache_versions(self):
+        return [LISTING_VERSION_KEY]
+
+    def get_cache_timeout(self):
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def cache_key(self, request, kwargs, versions):
+        return response_key(self.cache_name, request.get_host(), kwargs, normalized_params(request), versions)
+
+    def etag_versions(self):
+        version = getattr(self, 'current_version', None)
+        return None if version is None else [version]
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = self.etag_versions()
+        if versions is None:
+            version_keys = self.get_cache_versions()
+            found = get_versions(version_keys)
+            versions = [found[version_key] for version_key in version_keys]
+        key = self.cache_key(request, kwargs, versions)
+
+        data = cache.get(key)
+        if data is not None:
+            record(self.cache_name, 'hits')
+            return Response(data)
+
+        record(self.cache_name, 'misses')
+        with primary_reads():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_cache_timeout())
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """cached_response() for async views; `handler` is a coroutine function."""
+        versions = self.etag_versions()
+        if versions is None:
+            version_keys = self.get_cache_versions()
+            found = await aget_versions(version_keys)
+            versions = [found[version_key] for version_key in version_keys]
+        key = self.cache_key(request, kwargs, versions)
+
+        data = await cache.aget(key)
+        if data is not None:
+            await arecord(self.cache_name, 'hits')
+            return Response(data)
+
+        await arecord(self.cache_name, 'misses')
+        with primary_reads():
+            response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, self.get_cache_timeout())
+        return response
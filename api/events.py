@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import weakref
+from collections import defaultdict
+
+import redis.asyncio as aioredis # type: ignore
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django_redis import get_redis_connection # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Live auction events (new bids and the close) are published on one Redis
+# channel per auction. Each web process keeps a single pub/sub connection
+# and fans every message out to its own streaming viewers, so a message is
+# read and encoded once per process however many viewers are watching.
+
+BID = 'bid'
+CLOSED = 'closed'
+
+# Put on a viewer's queue in place of the events it was too slow to take.
+RESYNC = 'resync'
+
+
+def channel(auction_id):
+    return f'auction:{auction_id}:events'
+
+
+def encode(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n".encode()
+
+
+def get_redis():
+    return get_redis_connection('default')
+
+
+def publish(messages):
+    """Publish (auction id, event, data) triples once the transaction commits."""
+    payloads = [
+        (channel(auction_id), json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder))
+        for auction_id, event, data in messages
+    ]
+    if not payloads:
+        return
+
+    def send():
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for name, payload in payloads:
+                pipe.publish(name, payload)
+            pipe.execute()
+        except Exception:
+            # Viewers fall back to the snapshot they get on reconnect.
+            logger.exception("Could not publish auction events")
+
+    transaction.on_commit(send)
+
+
+def bid_placed(bid):
+    data = {
+        'bidder': {'id': bid.bidder.pk, 'username': bid.bidder.username},
+        'amount': bid.amount,
+        'placed_on': bid.placed_on,
+    }
+    # Bids accepted by the hot auction ledger have no id yet.
+    if bid.pk is not None:
+        data = {'id': bid.pk, **data}
+    publish([(bid.auction_id, BID, data)])
+
+
+def auctions_closed(auction_ids):
+    publish([(auction_id, CLOSED, {'closed': True}) for auction_id in auction_ids])
+
+
+class Broadcaster:
+    """Share one Redis subscription per channel among all viewers in this event loop."""
+
+    def __init__(self, url):
+        self.url = url
+        self.queues = defaultdict(set)
+        self.lock = asyncio.Lock()
+        self.pubsub = None
+        self.reader = None
+
+    async def subscribe(self, auction_id):
+        queue = asyncio.Queue(maxsize=settings.BID_STREAM_QUEUE_SIZE)
+        name = channel(auction_id)
+        async with self.lock:
+            if self.pubsub is None:
+                self.pubsub = aioredis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+            if not self.queues[name]:
+                await self.pubsub.subscribe(name)
+            self.queues[name].add(queue)
+            if self.reader is None or self.reader.done():
+                self.reader = asyncio.create_task(self.read())
+        return queue
+
+    async def unsubscribe(self, auction_id, queue):
+        name = channel(auction_id)
+        async with self.lock:
+            self.queues[name].discard(queue)
+            if not self.queues[name]:
+                del self.queues[name]
+                await self.pubsub.unsubscribe(name)
+
+    async def read(self):
+        while self.queues:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except Exception:
+                logger.exception("Auction event subscription failed, retrying")
+                await asyncio.sleep(1)
+                continue
+            if message is not None and message['type'] == 'message':
+                self.dispatch(message['channel'].decode(), message['data'])
+
+    def dispatch(self, name, payload):
+        message = json.loads(payload)
+        event = message['event']
+        # Encoded once and shared by every viewer of the channel.
+        frame = encode(event, message['data'])
+        for queue in list(self.queues.get(name, ())):
+            try:
+                queue.put_nowait((event, frame))
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((RESYNC, None))
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster():
+    # One per event loop: uvicorn runs a single loop per worker, while the
+    # development server starts a new one for every async request.
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster(settings.BID_STREAM_REDIS_URL)
+    return _broadcasters[loop]
@@ -1,10 +1,28 @@
 import django_filters # type: ignore
+from rest_framework.filters import BaseFilterBackend
 from .models import Auction
+from .search import search
 
 class AuctionFilter(django_filters.FilterSet):
-    min_bid = django_filters.NumberFilter(field_name='highest_bid_amount', lookup_expr='gte')
-    max_bid = django_filters.NumberFilter(field_name='highest_bid_amount', lookup_expr='lte')
+    # Declared without a Meta.model so it also filters AuctionRecord.
+    category = django_filters.ChoiceFilter(choices=Auction.CategoryChoices.choices)
+    min_bid = django_filters.NumberFilter(field_name='current_price', lookup_expr='gte')
+    max_bid = django_filters.NumberFilter(field_name='current_price', lookup_expr='lte')
 
-    class Meta:
-        model = Auction
-        fields = ['category', 'min_bid', 'max_bid',]
+
+class AuctionSearchFilter(BaseFilterBackend):
+    """
+    Full-text search on name and description. Results are ranked by
+    relevance; an `ordering` handled by OrderingFilter replaces that.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+
+        queryset = search(queryset, text)
+        if 'search_rank' not in queryset.query.annotations:
+            return queryset
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
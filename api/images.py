@@ -0,0 +1,147 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import auctions_changed
+from .models import Auction, AuctionImage
+
+# Variant field -> (longest side in px, Pillow format, file extension)
+VARIANTS = {
+    'thumbnail': (240, 'JPEG', 'jpg'),
+    'medium': (960, 'JPEG', 'jpg'),
+    'webp': (960, 'WEBP', 'webp'),
+}
+
+# Originals are re-encoded in their own format where Pillow can write it.
+ORIGINAL_FORMATS = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+
+ENCODER_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'PNG': {'optimize': True},
+}
+
+# Pillow releases the GIL while decoding, so uploads are checked in parallel.
+INSPECT_WORKERS = 4
+
+# EXIF orientations that rotate the image by 90 degrees.
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+logger = logging.getLogger(__name__)
+
+
+def inspect(upload):
+    """Return the displayed (width, height) of an upload, or None if it is not a readable image."""
+    try:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            image.verify()
+        # verify() only checks the structure; decoding catches truncated data.
+        upload.seek(0)
+        with Image.open(upload) as image:
+            image.load()
+            width, height = image.size
+            if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+                width, height = height, width
+    except Exception:
+        return None
+    finally:
+        upload.seek(0)
+    return width, height
+
+
+def inspect_all(uploads):
+    if len(uploads) < 2:
+        return [inspect(upload) for upload in uploads]
+    with ThreadPoolExecutor(max_workers=min(INSPECT_WORKERS, len(uploads))) as pool:
+        return list(pool.map(inspect, uploads))
+
+
+def encode(image, format):
+    if format == 'JPEG' and image.mode != 'RGB':
+        image = _flatten(image)
+    buffer = io.BytesIO()
+    # Only pixel data is written: EXIF, GPS and other metadata are dropped.
+    image.save(buffer, format=format, **ENCODER_OPTIONS.get(format, {}))
+    return ContentFile(buffer.getvalue())
+
+
+def _flatten(image):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, 'white')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process(auction_image):
+    """
+    Decode the uploaded original once, rewrite it without metadata and
+    store the resized variants with their dimensions.
+    """
+    with auction_image.image.open('rb') as source:
+        original = Image.open(source)
+        format = ORIGINAL_FORMATS.get(original.format, 'PNG')
+        original.load()
+
+    # Apply the EXIF orientation before the EXIF block is thrown away.
+    original = ImageOps.exif_transpose(original)
+    stem = os.path.splitext(os.path.basename(auction_image.image.name))[0]
+
+    old_name = auction_image.image.name
+    auction_image.image.save(f"{stem}.{format.lower()}", encode(original, format), save=False)
+    if auction_image.image.name != old_name:
+        auction_image.image.storage.delete(old_name)
+    auction_image.width, auction_image.height = original.size
+
+    for field, (size, variant_format, extension) in VARIANTS.items():
+        variant = original.copy()
+        variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+        getattr(auction_image, field).save(f"{stem}_{field}.{extension}", encode(variant, variant_format), save=False)
+        setattr(auction_image, f"{field}_width", variant.width)
+        setattr(auction_image, f"{field}_height", variant.height)
+
+    auction_image.processed_on = timezone.now()
+    with transaction.atomic():
+        auction_image.save()
+        auctions = Auction.objects.filter(pk=auction_image.auction_id)
+        auctions.update(version=F('version') + 1)
+        auctions_changed()
+    return auction_image
+
+
+def process_by_id(image_id):
+    auction_image = AuctionImage.objects.filter(pk=image_id).first()
+    if auction_image is None or auction_image.processed_on is not None:
+        return None
+    try:
+        return process(auction_image)
+    except Exception:
+        # Marked so process_pending_images stops queueing it.
+        logger.exception("Could not process auction image %s", image_id)
+        AuctionImage.objects.filter(pk=image_id).update(failed_on=timezone.now())
+        raise
+
+
+def pending(created_before, limit):
+    """
+    Ids of unprocessed images on auctions created, and last queued, before
+    `created_before`, marked as queued now. Failed images are left out.
+    """
+    with transaction.atomic():
+        image_ids = list(
+            AuctionImage.objects.filter(
+                Q(queued_on__isnull=True) | Q(queued_on__lt=created_before),
+                processed_on__isnull=True, failed_on__isnull=True, auction__created_on__lt=created_before,
+            ).order_by('pk').values_list('pk', flat=True)[:limit]
+        )
+        AuctionImage.objects.filter(pk__in=image_ids).update(queued_on=timezone.now())
+    return image_ids
@@ -0,0 +1,175 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django_redis import get_redis_connection # type: ignore
+
+from .models import Auction, Bid
+from .cache import auctions_changed
+
+# Hot auctions accept bids against a Redis hash instead of the auction row.
+# Accepted bids are queued on a per-auction list and written to the Bid
+# table in batches by api.tasks.flush_hot_bids.
+
+DIRTY_KEY = 'ledger:dirty'
+
+# KEYS: ledger hash, pending list, dirty set
+# ARGV: auction id, bidder id, amount in cents, now (epoch seconds)
+PLACE_BID = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {'missing'}
+end
+local state = redis.call('HMGET', KEYS[1], 'price', 'min_bid', 'deadline', 'author', 'count', 'closed')
+local price = tonumber(state[1])
+local min_bid = tonumber(state[2])
+local count = tonumber(state[5])
+-- Same order as api.bidding._rejection.
+if state[4] == ARGV[2] then
+    return {'own_auction'}
+end
+if state[6] == '1' or tonumber(ARGV[4]) > tonumber(state[3]) then
+    return {'ended'}
+end
+local required = min_bid
+if count > 0 then
+    required = price + min_bid
+end
+local amount = tonumber(ARGV[3])
+if amount < required then
+    return {'outbid', tostring(required)}
+end
+redis.call('HSET', KEYS[1], 'price', ARGV[3], 'count', count + 1)
+redis.call('RPUSH', KEYS[2], ARGV[2] .. ':' .. ARGV[3] .. ':' .. ARGV[4])
+redis.call('SADD', KEYS[3], ARGV[1])
+return {'accepted'}
+"""
+
+# KEYS: ledger hash; ARGV: field/value pairs
+LOAD_LEDGER = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# KEYS: pending list, dirty set; ARGV: auction id
+CLEAR_DIRTY = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+
+def get_redis():
+    return get_redis_connection('default')
+
+
+def ledger_key(auction_id):
+    return f'ledger:auction:{auction_id}'
+
+
+def pending_key(auction_id):
+    return f'ledger:auction:{auction_id}:pending'
+
+
+def to_cents(amount):
+    return int(Decimal(amount) * 100)
+
+
+def from_cents(cents):
+    return (Decimal(int(cents)) / 100).quantize(Decimal('0.01'))
+
+
+def enabled():
+    return getattr(settings, 'HOT_AUCTION_LEDGER', False)
+
+
+def try_place_bid(auction_id, bidder, amount, now):
+    """
+    Run the acceptance script for `auction_id`.
+
+    Returns None when the auction has no ledger, otherwise a tuple of the
+    outcome ('accepted', 'outbid', 'ended' or 'own_auction') and, for
+    'outbid', the minimal allowed amount.
+    """
+    result = get_redis().eval(
+        PLACE_BID, 3,
+        ledger_key(auction_id), pending_key(auction_id), DIRTY_KEY,
+        auction_id, bidder.pk, to_cents(amount), now.timestamp(),
+    )
+    outcome = result[0].decode()
+    if outcome == 'missing':
+        return None
+    if outcome == 'outbid':
+        return outcome, from_cents(result[1])
+    return outcome, None
+
+
+def load(auction):
+    get_redis().eval(
+        LOAD_LEDGER, 1, ledger_key(auction.pk),
+        'price', to_cents(auction.current_price),
+        'min_bid', to_cents(auction.minimal_bid),
+        'deadline', auction.deadline.timestamp(),
+        'author', auction.author_id,
+        'count', auction.bid_count,
+        'closed', int(auction.closed),
+    )
+
+
+def flush(auction_id, batch_size=None):
+    """Write queued bids for one auction to the database. Returns the number written."""
+    batch_size = batch_size or settings.HOT_AUCTION_FLUSH_BATCH
+    redis = get_redis()
+    written = 0
+
+    with redis.lock(f'ledger:auction:{auction_id}:flush', timeout=60):
+        while True:
+            entries = redis.lrange(pending_key(auction_id), 0, batch_size - 1)
+            if not entries:
+                break
+
+            bids = []
+            for entry in entries:
+                bidder_id, cents, placed = entry.decode().split(':')
+                bids.append(Bid(
+                    auction_id=auction_id,
+                    bidder_id=int(bidder_id),
+                    amount=from_cents(cents),
+                    placed_on=datetime.fromtimestamp(float(placed), tz=dt_timezone.utc),
+                ))
+
+            with transaction.atomic():
+                Bid.objects.bulk_create(bids)
+                Auction.objects.filter(pk=auction_id).update(
+                    current_price=bids[-1].amount,
+                    bid_count=F('bid_count') + len(bids),
+                    last_bid_on=bids[-1].placed_on,
+                    version=F('version') + 1,
+                )
+                auctions_changed()
+            redis.ltrim(pending_key(auction_id), len(entries), -1)
+            written += len(entries)
+
+        redis.eval(CLEAR_DIRTY, 2, pending_key(auction_id), DIRTY_KEY, auction_id)
+
+    return written
+
+
+def dirty_auctions():
+    return [int(auction_id) for auction_id in get_redis().smembers(DIRTY_KEY)]
+
+
+def reconcile(auction_id):
+    """Stop accepting bids for `auction_id`, persist what is queued and drop the ledger."""
+    redis = get_redis()
+    if not redis.exists(ledger_key(auction_id)):
+        return 0
+    redis.hset(ledger_key(auction_id), 'closed', 1)
+    written = flush(auction_id)
+    redis.delete(ledger_key(auction_id), pending_key(auction_id))
+    return written
@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from types import ModuleType
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import path
+from django.utils import timezone
+
+from api import urls, views
+from api.benchmarks import latency_summary, request_factory
+from api.models import Auction, Bid, User
+
+# The same routes served by the synchronous DRF views, as before the async views.
+sync_urls = ModuleType('sync_urls')
+sync_urls.urlpatterns = [
+    path('users/<int:user_id>/', views.RetrieveUserAPIView.as_view()),
+    path('auctions/', views.ListCreateAuctionAPIView.as_view()),
+    path('auctions/<int:auction_id>/', views.RetrieveAuctionAPIView.as_view()),
+    path('auctions/<int:auction_id>/bids/', views.ListCreateBidAPIView.as_view()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and tail latency of the read endpoints served by the sync DRF "
+        "views on WSGI worker threads and by the async views on one ASGI event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=200)
+        parser.add_argument('--bids-per-auction', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=100)
+
+    def handle(self, *args, **options):
+        # Worker threads and the async ORM use their own connections, so the
+        # seed is committed and deleted afterwards instead of rolled back.
+        tag = uuid.uuid4().hex[:8]
+        paths = self.seed(tag, options['auctions'], options['bids_per_auction'])
+        try:
+            requests = list(itertools.islice(itertools.cycle(paths), options['requests']))
+            for label, run in (("sync/wsgi", self.run_wsgi), ("async/asgi", self.run_asgi)):
+                latencies, elapsed = run(requests, options['concurrency'])
+                summary = " ".join(f"{key}={value}" for key, value in latency_summary(latencies).items())
+                self.stdout.write(f"{label:>10}: {len(latencies) / elapsed:.0f} req/s {summary}")
+        finally:
+            User.objects.filter(username__startswith=f"bench-{tag}-").delete()
+
+    def seed(self, tag, count, bids_per_auction):
+        seller = User.objects.create(username=f"bench-{tag}-seller")
+        bidder = User.objects.create(username=f"bench-{tag}-bidder")
+        deadline = timezone.now() + timedelta(days=1)
+        auctions = [
+            Auction.objects.create(
+                name=f"Auction {i}",
+                description="Async read benchmark",
+                author=seller,
+                starting_price=Decimal("1.00"),
+                category=Auction.CategoryChoices.OTHER,
+                deadline=deadline,
+            )
+            for i in range(count)
+        ]
+        Bid.objects.bulk_create(
+            Bid(auction=auction, bidder=bidder, amount=Decimal(2 + i))
+            for auction in auctions
+            for i in range(bids_per_auction)
+        )
+
+        paths = ["/auctions/", "/auctions/?ordering=-current_price", f"/users/{seller.pk}/"]
+        for auction in auctions:
+            paths += [f"/auctions/{auction.pk}/", f"/auctions/{auction.pk}/bids/"]
+        return paths
+
+    def run_wsgi(self, requests, concurrency):
+        handler = WSGIHandler()
+        factory = request_factory()
+
+        def call(url):
+            environ = factory.get(url).environ
+            started = time.perf_counter()
+            statuses = []
+            body = b''.join(handler(environ, lambda status, headers: statuses.append(status)))
+            latency = time.perf_counter() - started
+            assert statuses[0].startswith('200'), (url, statuses[0], body[:200])
+            return latency
+
+        with override_settings(ROOT_URLCONF=sync_urls):
+            with ThreadPoolExecutor(concurrency) as pool:
+                started = time.perf_counter()
+                latencies = list(pool.map(call, requests))
+                elapsed = time.perf_counter() - started
+        return latencies, elapsed
+
+    def run_asgi(self, requests, concurrency):
+        handler = ASGIHandler()
+        host = request_factory().get('/').get_host().encode()
+
+        async def call(url):
+            path, _, query = url.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'headers': [(b'host', host)],
+                'client': ('127.0.0.1', 0),
+                'server': ('testserver', 80),
+            }
+            done = asyncio.Event()
+            sent = []
+
+            async def receive():
+                if not sent:
+                    sent.append(None)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            started = time.perf_counter()
+            await handler(scope, receive, send)
+            latency = time.perf_counter() - started
+            done.set()
+            status = messages[0]['status']
+            assert status == 200, (url, status)
+            return latency
+
+        async def run():
+            gate = asyncio.Semaphore(concurrency)
+
+            async def limited(url):
+                async with gate:
+                    return await call(url)
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(limited(url) for url in requests))
+            return latencies, time.perf_counter() - started
+
+        with override_settings(ROOT_URLCONF=urls):
+            return asyncio.run(run())
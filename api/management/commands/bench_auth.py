@@ -0,0 +1,68 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.authentication import StatelessReadJWTAuthentication
+from api.benchmarks import latency_summary, measure, request_factory
+from api.models import Auction, User
+from api.serializers import MyTokenObtainPairSerializer
+from api.views import ListFollowedAuctionsAPIView
+
+
+class Command(BaseCommand):
+    help = "Compare requests/sec on auctions/followed/ with database and token-only JWT authentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sellers', type=int, default=50)
+        parser.add_argument('--auctions-per-seller', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Everything is seeded inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            viewer = self.seed(options['sellers'], options['auctions_per_seller'])
+            token = MyTokenObtainPairSerializer.get_token(viewer).access_token
+            factory = request_factory()
+
+            for label, authentication in (
+                ("database user", JWTAuthentication),
+                ("token user", StatelessReadJWTAuthentication),
+            ):
+                handler = ListFollowedAuctionsAPIView.as_view(authentication_classes=[authentication])
+
+                def call():
+                    request = factory.get("/auctions/followed/", HTTP_AUTHORIZATION=f"Bearer {token}")
+                    response = handler(request).render()
+                    assert response.status_code == 200, response.status_code
+
+                latencies, queries = measure(call, options['requests'])
+                summary = " ".join(f"{key}={value}" for key, value in latency_summary(latencies).items())
+                self.stdout.write(
+                    f"{label:>13}: {len(latencies) / sum(latencies):.0f} req/s "
+                    f"queries/request={max(queries)} {summary}"
+                )
+
+            transaction.set_rollback(True)
+
+    def seed(self, sellers, per_seller):
+        tag = uuid.uuid4().hex[:8]
+        viewer = User.objects.create(username=f"bench-viewer-{tag}")
+        deadline = timezone.now() + timedelta(days=1)
+        for i in range(sellers):
+            seller = User.objects.create(username=f"bench-seller-{tag}-{i}")
+            for j in range(per_seller):
+                Auction.objects.create(
+                    name=f"Auction {i}-{j}",
+                    description="Auth benchmark",
+                    author=seller,
+                    starting_price=Decimal("1.00"),
+                    category=Auction.CategoryChoices.OTHER,
+                    deadline=deadline + timedelta(minutes=j),
+                )
+            viewer.follow(seller)
+        return viewer
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import resource
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import events
+from api.benchmarks import latency_summary
+
+LOAD_TEST_EVENT = 'loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold many idle SSE viewers on one auction's event stream and measure how long "
+        "a published event takes to reach all of them. Run it against an ASGI server "
+        "(e.g. uvicorn backend.asgi:application) that shares this project's Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction', type=int, help="Id of an open auction to watch.")
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--viewers', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds between published events.")
+        parser.add_argument('--connect-concurrency', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.raise_file_limit(options['viewers'] + 100)
+        asyncio.run(self.run(options))
+
+    def raise_file_limit(self, wanted):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+        if min(wanted, hard) < wanted:
+            raise CommandError(f"Open file limit {hard} is too low for {wanted - 100} viewers.")
+
+    async def run(self, options):
+        url = urlsplit(options['url'])
+        path = f"{url.path.rstrip('/')}/auctions/{options['auction']}/events/"
+        received = {}
+        ready = asyncio.Event()
+        connected = 0
+        gate = asyncio.Semaphore(options['connect_concurrency'])
+
+        async def viewer():
+            nonlocal connected
+            async with gate:
+                reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                writer.write(
+                    f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: text/event-stream\r\n\r\n".encode()
+                )
+                await writer.drain()
+                status = await reader.readline()
+                if b' 200 ' not in status:
+                    raise CommandError(f"Stream refused: {status.decode().strip()}")
+                # Headers, then the snapshot frame, mean the viewer is subscribed.
+                line = b''
+                while not line.startswith(b'data: '):
+                    line = await reader.readline()
+                    if not line:
+                        raise CommandError("Stream closed before its snapshot.")
+            connected += 1
+            if connected == options['viewers']:
+                ready.set()
+
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        return
+                    if line.startswith(b'data: ') and b'"seq"' in line:
+                        arrived = time.time()
+                        data = json.loads(line[6:])
+                        received.setdefault(data['seq'], []).append(arrived - data['sent'])
+            finally:
+                writer.close()
+
+        started = time.perf_counter()
+        viewers = [asyncio.create_task(viewer()) for _ in range(options['viewers'])]
+        waiting = asyncio.create_task(ready.wait())
+        # Any viewer finishing before all are connected means something is wrong.
+        done, _ = await asyncio.wait([waiting, *viewers], return_when=asyncio.FIRST_COMPLETED)
+        if not ready.is_set():
+            for task in viewers:
+                task.cancel()
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+            raise CommandError("A stream ended early; is the auction still open?")
+        self.stdout.write(f"{connected} viewers connected in {time.perf_counter() - started:.1f}s")
+
+        redis = events.get_redis()
+        for seq in range(options['messages']):
+            payload = json.dumps({'event': LOAD_TEST_EVENT, 'data': {'seq': seq, 'sent': time.time()}})
+            redis.publish(events.channel(options['auction']), payload)
+            await asyncio.sleep(options['interval'])
+        await asyncio.sleep(max(options['interval'], 1.0))
+
+        for task in viewers:
+            task.cancel()
+        await asyncio.gather(*viewers, return_exceptions=True)
+
+        deliveries = [latency for latencies in received.values() for latency in latencies]
+        last_viewer = [max(latencies) for latencies in received.values() if len(latencies) == connected]
+        expected = connected * options['messages']
+        self.stdout.write(f"delivered {len(deliveries)}/{expected} events")
+        for label, samples in (("per viewer", deliveries), ("all viewers", last_viewer)):
+            summary = " ".join(f"{key}={value}" for key, value in latency_summary(samples).items())
+            self.stdout.write(f"{label:>12}: {summary}")
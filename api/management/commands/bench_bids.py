@@ -0,0 +1,104 @@
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.utils import timezone
+
+from api.benchmarks import latency_summary
+from api.bidding import place_bid, BidRejected
+from api.models import Auction, Bid, User
+
+
+class Command(BaseCommand):
+    help = "Hammer a single auction with concurrent bidders and report accepted bids/s and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--bids', type=int, default=50, help="Bid attempts per thread.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark auction and users.")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        attempts = options['bids']
+        tag = uuid.uuid4().hex[:8]
+
+        seller = User.objects.create(username=f"bench-seller-{tag}")
+        bidders = [User.objects.create(username=f"bench-bidder-{tag}-{i}") for i in range(threads)]
+        auction = Auction.objects.create(
+            name="Benchmark auction",
+            description="Concurrent bid benchmark",
+            author=seller,
+            starting_price=Decimal("1.00"),
+            minimal_bid=Decimal("1.00"),
+            category=Auction.CategoryChoices.OTHER,
+            deadline=timezone.now() + timedelta(hours=1),
+        )
+
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+        latencies = []
+        outcomes = Counter()
+
+        def worker(bidder):
+            barrier.wait()
+            try:
+                for _ in range(attempts):
+                    current = Auction.objects.values_list('current_price', flat=True).get(pk=auction.pk)
+                    started = time.perf_counter()
+                    try:
+                        place_bid(auction.pk, bidder, current + auction.minimal_bid)
+                        outcome = 'accepted'
+                    except BidRejected as rejection:
+                        outcome = rejection.reason
+                    except OperationalError:
+                        outcome = 'error'
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        outcomes[outcome] += 1
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker, args=(bidder,)) for bidder in bidders]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        try:
+            self.check_consistency(auction, outcomes['accepted'])
+        finally:
+            if not options['keep']:
+                auction.delete()
+                User.objects.filter(username__contains=f"-{tag}").delete()
+
+        self.stdout.write(f"threads={threads} attempts={threads * attempts} wall={wall:.2f}s")
+        self.stdout.write(
+            "accepted={accepted} outbid={outbid} errors={error}".format(
+                accepted=outcomes['accepted'], outbid=outcomes[BidRejected.OUTBID], error=outcomes['error'],
+            )
+        )
+        self.stdout.write(f"accepted_per_sec={outcomes['accepted'] / wall:.1f}")
+        self.stdout.write(" ".join(f"{key}={value}" for key, value in latency_summary(latencies).items()))
+        self.stdout.write(self.style.SUCCESS("No lost updates."))
+
+    def check_consistency(self, auction, accepted):
+        auction.refresh_from_db()
+        amounts = list(Bid.objects.filter(auction=auction).order_by('pk').values_list('amount', flat=True))
+
+        if not (len(amounts) == auction.bid_count == accepted):
+            raise CommandError(
+                f"Lost update: {len(amounts)} bids stored, bid_count={auction.bid_count}, {accepted} accepted"
+            )
+        if amounts and amounts[-1] != auction.current_price:
+            raise CommandError(f"current_price {auction.current_price} != last bid {amounts[-1]}")
+        for previous, amount in zip(amounts, amounts[1:]):
+            if amount < previous + auction.minimal_bid:
+                raise CommandError(f"Bid {amount} accepted below increment over {previous}")
@@ -0,0 +1,71 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.benchmarks import latency_summary, measure, request_factory
+from api.models import Auction, Bid, User
+from api.serializers import BidSerializer, UserSerializer
+from api.views import ListCreateBidAPIView
+
+
+class FullBidderSerializer(BidSerializer):
+    # The bids listing before it switched to a compact bidder.
+    bidder = UserSerializer(read_only=True)
+
+
+class FullBidderListView(ListCreateBidAPIView):
+    serializer_class = FullBidderSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency of the bids listing with full and compact bidder objects."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=5000)
+        parser.add_argument('--bidders', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # Everything is seeded inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            auction = self.seed(options['bids'], options['bidders'])
+            factory = request_factory()
+
+            for label, view in (("full bidder", FullBidderListView), ("compact bidder", ListCreateBidAPIView)):
+                handler = view.as_view()
+
+                def call():
+                    request = factory.get(f"/auctions/{auction.pk}/bids/", {"size": 10})
+                    handler(request, auction_id=auction.pk).render()
+
+                latencies, queries = measure(call, options['repeat'])
+                summary = " ".join(f"{key}={value}" for key, value in latency_summary(latencies).items())
+                self.stdout.write(f"{label:>15}: queries/request={max(queries)} {summary}")
+
+            transaction.set_rollback(True)
+
+    def seed(self, bids, bidders):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create(username=f"bench-seller-{tag}")
+        users = User.objects.bulk_create(
+            User(username=f"bench-bidder-{tag}-{i}") for i in range(bidders)
+        )
+        for user in users[:20]:
+            user.follows.add(seller)
+
+        auction = Auction.objects.create(
+            name="Benchmark auction",
+            description="Bids listing benchmark",
+            author=seller,
+            starting_price=Decimal("1.00"),
+            category=Auction.CategoryChoices.OTHER,
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        Bid.objects.bulk_create(
+            Bid(auction=auction, bidder=users[i % bidders], amount=Decimal(i + 1)) for i in range(bids)
+        )
+        return auction
@@ -0,0 +1,104 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api import scheduler
+from api.closing import close_due
+from api.models import Auction, User
+
+
+class Command(BaseCommand):
+    help = "Compare the old full-scan close with the deadline-set scheduler over many open auctions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=100_000)
+        parser.add_argument('--due', type=int, default=2_000, help="How many of them are past their deadline.")
+
+    def handle(self, *args, **options):
+        key = f'bench:deadlines:{uuid.uuid4().hex[:8]}'
+        try:
+            scheduler.get_redis().ping()
+        except Exception as exc:
+            raise CommandError(f"Redis is required for this benchmark: {exc}")
+
+        try:
+            # Seeded rows are rolled back at the end; each approach runs in a savepoint.
+            with transaction.atomic():
+                self.seed(options['auctions'], options['due'], key)
+                self.bench_full_scan()
+                self.bench_scheduler(key)
+                transaction.set_rollback(True)
+        finally:
+            scheduler.get_redis().delete(key)
+
+    def seed(self, total, due, key):
+        started = time.perf_counter()
+        # bulk_create skips Auction.save, so the author's counters are set here.
+        author = User.objects.create(
+            username=f"bench-closer-{uuid.uuid4().hex[:8]}",
+            auctions_count=total,
+            open_auctions_count=total,
+        )
+        now = timezone.now()
+        auctions = Auction.objects.bulk_create(
+            (
+                Auction(
+                    name=f"Auction {i}",
+                    description="Closing benchmark",
+                    author=author,
+                    starting_price=Decimal("1.00"),
+                    current_price=Decimal("1.00"),
+                    category=Auction.CategoryChoices.OTHER,
+                    deadline=now - timedelta(seconds=random.randint(1, 600)) if i < due
+                    else now + timedelta(seconds=random.randint(60, 7 * 24 * 3600)),
+                )
+                for i in range(total)
+            ),
+            batch_size=5000,
+        )
+        redis = scheduler.get_redis()
+        for start in range(0, len(auctions), 10_000):
+            chunk = auctions[start:start + 10_000]
+            redis.zadd(key, {str(auction.pk): auction.deadline.timestamp() for auction in chunk})
+        self.stdout.write(f"seeded {total} open auctions, {due} due, in {time.perf_counter() - started:.1f}s")
+
+    def bench_full_scan(self):
+        sid = transaction.savepoint()
+        started = time.perf_counter()
+        closed = Auction.objects.filter(closed=False, deadline__lte=timezone.now()).update(closed=True)
+        elapsed = time.perf_counter() - started
+        transaction.savepoint_rollback(sid)
+        self.stdout.write(f"full scan: closed {closed} in {elapsed * 1000:.1f}ms (runs every minute, up to 60s late)")
+
+    def bench_scheduler(self, key):
+        batch_size = settings.AUCTION_CLOSE_BATCH_SIZE
+        sid = transaction.savepoint()
+
+        started = time.perf_counter()
+        closed = 0
+        ticks = 0
+        while True:
+            done = close_due(batch_size, settings.AUCTION_CLOSE_MAX_BATCHES, key=key)
+            ticks += 1
+            closed += done
+            if not done:
+                break
+        drain = time.perf_counter() - started
+
+        started = time.perf_counter()
+        close_due(batch_size, settings.AUCTION_CLOSE_MAX_BATCHES, key=key)
+        idle = time.perf_counter() - started
+
+        transaction.savepoint_rollback(sid)
+        self.stdout.write(
+            f"scheduler: closed {closed} in {drain * 1000:.1f}ms over {ticks} run(s) "
+            f"({closed / drain if drain else 0:.0f} auctions/s), idle tick {idle * 1000:.2f}ms, "
+            f"{scheduler.pending(key)} still scheduled"
+        )
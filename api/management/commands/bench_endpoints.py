@@ -0,0 +1,298 @@
+import io
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from api.benchmarks import latency_summary, test_client, zipf_cum_weights
+from api.models import Auction, Bid, User
+from api.serializers import MyTokenObtainPairSerializer
+
+PASSWORD = "bench-password-1"
+
+# Routes that only answer under ASGI.
+ASGI_ROUTES = {"auction_events"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every route in api/urls.py and backend/urls.py with a realistic mix of query "
+        "parameters against the current database (e.g. after seed_data), and record latency, "
+        "queries per request and throughput as JSON. Writes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per route.")
+        parser.add_argument('--routes', nargs='*', help="Only these route names.")
+        parser.add_argument('--output', help="Results file; defaults to bench_results/endpoints-<time>.json.")
+        parser.add_argument('--baseline', help="An earlier results file to compare against.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.load_samples()
+
+        tag = uuid.uuid4().hex[:8]
+        media_root = tempfile.mkdtemp()
+        self.user = User.objects.create_user(username=f"bench-endpoints-{tag}", password=PASSWORD, is_staff=True)
+        # Each run starts from an empty response cache under its own key
+        # prefix, and uploads go to a scratch directory. Throttles are off:
+        # one client sends every request.
+        isolated = override_settings(
+            CACHES={'default': {**settings.CACHES['default'], 'KEY_PREFIX': f'bench-{tag}'}},
+            MEDIA_ROOT=media_root,
+            METRICS_TOKEN=settings.METRICS_TOKEN or f'bench-{tag}',
+            THROTTLE_BUCKETS={},
+        )
+        try:
+            with isolated:
+                routes = self.routes()
+                names = options['routes'] or list(routes)
+                unknown = set(names) - set(routes)
+                if unknown:
+                    raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+                results = {}
+                for name in names:
+                    results[name] = self.run(routes[name], options['requests'], asgi=name in ASGI_ROUTES)
+                    self.report(name, results[name])
+        finally:
+            self.user.delete()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = self.save(results, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+        if options['baseline']:
+            self.compare(results, json.loads(Path(options['baseline']).read_text())['routes'])
+
+    def load_samples(self):
+        self.open_auctions = list(Auction.objects.filter(closed=False).values_list('pk', flat=True))
+        self.closed_auctions = list(Auction.objects.filter(closed=True).values_list('pk', flat=True)[:1000])
+        self.sellers = list(User.objects.filter(auctions_count__gt=0).values_list('pk', flat=True)[:10_000])
+        self.followers = list(User.objects.filter(following_count__gt=0).values_list('pk', flat=True)[:1000])
+        if not self.open_auctions or not self.closed_auctions or not self.followers:
+            raise CommandError("Needs open and closed auctions and followers; run seed_data first.")
+        # A few auctions draw most of the traffic.
+        self.rng.shuffle(self.open_auctions)
+        self.gone_auction = max(self.open_auctions + self.closed_auctions) + 1_000_000
+        self.auction_weights = zipf_cum_weights(len(self.open_auctions))
+        self.words = [
+            word for name in Auction.objects.values_list('name', flat=True)[:200] for word in name.lower().split()
+        ]
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), "steelblue").save(buffer, format="JPEG")
+        self.image = buffer.getvalue()
+
+    def hot_auction(self):
+        return self.rng.choices(self.open_auctions, cum_weights=self.auction_weights)[0]
+
+    def token(self, user_id):
+        user = User(pk=user_id, username="")
+        return f"Bearer {MyTokenObtainPairSerializer.get_token(user).access_token}"
+
+    def upload(self):
+        return SimpleUploadedFile("photo.jpg", self.image, content_type="image/jpeg")
+
+    def auction_fields(self):
+        return {
+            "name": "Benchmark auction",
+            "description": "Created by bench_endpoints",
+            "starting_price": "10.00",
+            "minimal_bid": "1.00",
+            "category": "other",
+            "deadline": (timezone.now() + timedelta(days=3)).isoformat(),
+        }
+
+    def routes(self):
+        """Route name -> function returning (method, path, data, extra) for one request."""
+        rng = self.rng
+        own = self.token(self.user.pk)
+        refresh = str(MyTokenObtainPairSerializer.get_token(self.user))
+
+        def auctions():
+            params = rng.choice([
+                {},
+                {"page": 2},
+                {"size": 20},
+                {"cursor": ""},
+                {"closed": "true"},
+                {"ordering": rng.choice(["deadline", "-highest_bid_amount", "created_on"])},
+                {"category": rng.choice(Auction.CategoryChoices.values)},
+                {"min_bid": 50, "max_bid": 200},
+                {"search": " ".join(rng.sample(self.words, 2))},
+                {"search": rng.choice(self.words), "category": rng.choice(Auction.CategoryChoices.values)},
+            ])
+            return "get", reverse("auctions"), params, {}
+
+        def auction_facets():
+            params = rng.choice([
+                {},
+                {"closed": "true"},
+                {"category": rng.choice(Auction.CategoryChoices.values)},
+                {"min_bid": 50, "max_bid": 200},
+                {"search": rng.choice(self.words)},
+            ])
+            return "get", reverse("auction_facets"), params, {}
+
+        def bid():
+            auction = Auction.objects.get(pk=self.hot_auction())
+            return "post", reverse("bids", args=[auction.pk]), {
+                "amount": str(auction.current_price + auction.minimal_bid)
+            }, {"HTTP_AUTHORIZATION": own}
+
+        def bulk_auctions():
+            items = [{**self.auction_fields(), "uploaded_images": [f"image{i}"]} for i in range(5)]
+            data = {"auctions": json.dumps(items), **{f"image{i}": self.upload() for i in range(5)}}
+            return "post", reverse("bulk_auctions"), data, {"HTTP_AUTHORIZATION": own}
+
+        return {
+            "register": lambda: ("post", reverse("register"), {
+                "username": f"bench-{uuid.uuid4().hex[:12]}", "password": PASSWORD,
+            }, {}),
+            "get_token": lambda: ("post", reverse("get_token"), {
+                "username": self.user.username, "password": PASSWORD,
+            }, {}),
+            "refresh": lambda: ("post", reverse("refresh"), {"refresh": refresh}, {}),
+            "user": lambda: ("get", reverse("user", args=[rng.choice(self.sellers)]), {}, rng.choice([
+                {}, {"HTTP_AUTHORIZATION": self.token(rng.choice(self.followers))},
+            ])),
+            "user_auctions": lambda: ("get", reverse("user_auctions", args=[rng.choice(self.sellers)]), rng.choice([
+                {}, {"size": 20}, {"cursor": ""},
+            ]), {}),
+            "follow_user": lambda: ("post", reverse("follow_user", args=[rng.choice(self.sellers)]), {}, {
+                "HTTP_AUTHORIZATION": own,
+            }),
+            "auctions": auctions,
+            "create_auction": lambda: ("post", reverse("auctions"), {
+                **self.auction_fields(), "uploaded_images": [self.upload()],
+            }, {"HTTP_AUTHORIZATION": own}),
+            "bulk_auctions": bulk_auctions,
+            "auction_facets": auction_facets,
+            "auction_batch": lambda: ("get", reverse("auction_batch"), {
+                # A watchlist: mostly popular auctions, a few long gone.
+                "ids": ",".join(str(self.hot_auction()) for _ in range(50)) + f",{self.gone_auction}",
+            }, {}),
+            "auction": lambda: ("get", reverse("auction", args=[self.hot_auction()]), {}, {}),
+            "bids": lambda: ("get", reverse("bids", args=[self.hot_auction()]), rng.choice([
+                {}, {"size": 20}, {"cursor": ""},
+            ]), {}),
+            "place_bid": bid,
+            # Closed auctions answer with a snapshot and end the stream.
+            "auction_events": lambda: ("get", reverse("auction_events", args=[rng.choice(self.closed_auctions)]), {}, {}),
+            "followed_auctions": lambda: ("get", reverse("followed_auctions"), rng.choice([
+                {}, {"size": 20}, {"cursor": ""},
+            ]), {"HTTP_AUTHORIZATION": self.token(rng.choice(self.followers))}),
+            "response_cache_stats": lambda: ("get", reverse("response_cache_stats"), {}, {
+                "HTTP_AUTHORIZATION": own,
+            }),
+            "metrics": lambda: ("get", reverse("metrics"), {}, {
+                "HTTP_AUTHORIZATION": f"Bearer {settings.METRICS_TOKEN}",
+            }),
+            "admin": lambda: ("get", "/admin/login/", {}, {}),
+            "api_auth_login": lambda: ("get", "/api-auth/login/", {}, {}),
+        }
+
+    def run(self, route, requests, asgi=False):
+        client = test_client(asgi)
+        latencies, queries, statuses = [], [], {}
+        for _ in range(requests):
+            method, path, data, extra = route()
+            # Writes are rolled back, so the data set stays the same between runs.
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    send = getattr(client, method)
+                    response = (async_to_sync(send) if asgi else send)(path, data, **extra)
+                    if response.streaming:
+                        consume(response)
+                    latencies.append(time.perf_counter() - started)
+                transaction.set_rollback(True)
+            queries.append(len(captured))
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        return {
+            'requests': requests,
+            'throughput_rps': round(len(latencies) / sum(latencies), 1),
+            **latency_summary(latencies),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'statuses': statuses,
+        }
+
+    def report(self, name, result):
+        statuses = ",".join(f"{status}x{count}" for status, count in sorted(result['statuses'].items()))
+        self.stdout.write(
+            f"{name:>21}: {result['throughput_rps']:8.1f} req/s p50={result['p50_ms']}ms "
+            f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+            f"queries={result['queries_mean']}/{result['queries_max']} [{statuses}]"
+        )
+
+    def save(self, results, output):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            ).stdout.strip()
+        except OSError:
+            commit = ""
+        document = {
+            'started': timezone.now().isoformat(),
+            'commit': commit,
+            'database': connection.vendor,
+            'data': {
+                'users': User.objects.count(),
+                'auctions': Auction.objects.count(),
+                'bids': Bid.objects.count(),
+            },
+            'routes': results,
+        }
+        if output:
+            path = Path(output)
+        else:
+            path = Path(settings.BASE_DIR) / 'bench_results' / f"endpoints-{timezone.now():%Y%m%d-%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document, indent=2))
+        return path
+
+    def compare(self, results, baseline):
+        self.stdout.write("Against baseline (req/s, p99):")
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{name:>21}: {change(before['throughput_rps'], result['throughput_rps'])} req/s, "
+                f"{change(before['p99_ms'], result['p99_ms'])} p99"
+            )
+
+
+def consume(response):
+    if not response.is_async:
+        b''.join(response.streaming_content)
+        return
+
+    async def read():
+        async for _ in response.streaming_content:
+            pass
+
+    async_to_sync(read)()
+
+
+def change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before:+.1%}"
@@ -0,0 +1,102 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend # type: ignore
+from rest_framework import filters, generics
+
+from api.benchmarks import latency_summary, measure, request_factory, vocabulary, zipf_cum_weights
+from api.models import Auction, User
+from api.views import ListCreateAuctionAPIView
+
+class UncachedListView(ListCreateAuctionAPIView):
+    def list(self, request, *args, **kwargs):
+        return generics.ListCreateAPIView.list(self, request, *args, **kwargs)
+
+
+class LikeNameListView(UncachedListView):
+    # The listing before full-text search: ILIKE on the name only.
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name']
+
+
+class LikeNameDescriptionListView(LikeNameListView):
+    search_fields = ['name', 'description']
+
+
+class Command(BaseCommand):
+    help = "Compare ILIKE search with the full-text index on the auctions listing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auctions', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Seeded rows are rolled back at the end.
+        with transaction.atomic():
+            words = self.seed(options['auctions'])
+            factory = request_factory()
+            # Word frequency follows Zipf's law, so rank in the vocabulary
+            # stands in for how common a word is.
+            queries = (
+                ("common word", {"search": words[0]}),
+                ("mid word", {"search": words[200]}),
+                ("rare word", {"search": words[5000]}),
+                ("two words", {"search": f"{words[10]} {words[300]}"}),
+                ("prefix", {"search": words[1000][:4]}),
+                ("category + word", {"search": words[200], "category": Auction.CategoryChoices.OTHER}),
+            )
+            views = (
+                ("ILIKE name", LikeNameListView),
+                ("ILIKE name+description", LikeNameDescriptionListView),
+                ("full-text", UncachedListView),
+            )
+
+            for label, params in queries:
+                for view_label, view in views:
+                    handler = view.as_view()
+
+                    def call():
+                        handler(factory.get("/auctions/", params)).render()
+
+                    latencies, _ = measure(call, options['repeat'])
+                    summary = " ".join(f"{key}={value}" for key, value in latency_summary(latencies).items())
+                    self.stdout.write(f"{label:>16} | {view_label:>22}: {summary}")
+
+            transaction.set_rollback(True)
+
+    def seed(self, total):
+        started = time.perf_counter()
+        rng = random.Random(13)
+        words = vocabulary(20_000, rng)
+        rng.shuffle(words)
+        weights = zipf_cum_weights(len(words))
+        author = User.objects.create(
+            username=f"bench-search-{uuid.uuid4().hex[:8]}",
+            auctions_count=total,
+            open_auctions_count=total,
+        )
+        deadline = timezone.now() + timedelta(days=7)
+        categories = [value for value, _ in Auction.CategoryChoices.choices]
+        Auction.objects.bulk_create(
+            (
+                Auction(
+                    name=" ".join(rng.choices(words, cum_weights=weights, k=4)).capitalize(),
+                    description=" ".join(rng.choices(words, cum_weights=weights, k=40)),
+                    author=author,
+                    starting_price=Decimal("1.00"),
+                    current_price=Decimal("1.00"),
+                    category=rng.choice(categories),
+                    deadline=deadline,
+                )
+                for _ in range(total)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(f"seeded {total} auctions in {time.perf_counter() - started:.1f}s")
+        return words
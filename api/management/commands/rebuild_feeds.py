@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from api.models import FeedEntry, User
+
+Follow = User.follows.through
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild followed-auction feeds from the follow graph. By default only cold users "
+        "(following someone but with an empty feed) are rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help="Rebuild these users' feeds.")
+        parser.add_argument('--all', action='store_true', help="Rebuild every user who follows someone.")
+
+    def handle(self, *args, **options):
+        if options['user_ids']:
+            users = User.objects.filter(pk__in=options['user_ids'])
+        else:
+            users = User.objects.filter(Exists(Follow.objects.filter(from_user=OuterRef('pk'))))
+            if not options['all']:
+                users = users.exclude(Exists(FeedEntry.objects.filter(user=OuterRef('pk'))))
+
+        rebuilt = 0
+        for user_id in list(users.order_by('pk').values_list('pk', flat=True)):
+            FeedEntry.objects.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} feeds."))
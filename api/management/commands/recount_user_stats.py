@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api.models import Auction, AuctionRecord, User
+
+Follow = User.follows.through
+
+
+def count(queryset, field):
+    return Coalesce(
+        Subquery(queryset.order_by().values(field).annotate(total=Count('pk')).values('total')),
+        Value(0),
+    )
+
+
+def actual_counts():
+    return {
+        'followers_count': count(Follow.objects.filter(to_user=OuterRef('pk')), 'to_user'),
+        'following_count': count(Follow.objects.filter(from_user=OuterRef('pk')), 'from_user'),
+        'auctions_count': count(AuctionRecord.objects.filter(author=OuterRef('pk')), 'author'),
+        'open_auctions_count': count(Auction.objects.filter(author=OuterRef('pk'), closed=False), 'author'),
+    }
+
+
+class Command(BaseCommand):
+    help = "Recompute the follower and auction counters stored on User and repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report users whose counters drifted.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        drifted = 0
+
+        while True:
+            chunk = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1]
+
+            expressions = actual_counts()
+            stale = User.objects.filter(pk__in=chunk).alias(
+                **{f'actual_{field}': expression for field, expression in expressions.items()}
+            ).filter(
+                Q(*[~Q(**{field: F(f'actual_{field}')}) for field in expressions], _connector=Q.OR)
+            ).values_list('pk', flat=True)
+
+            with transaction.atomic():
+                stale_ids = list(stale)
+                drifted += len(stale_ids)
+                if stale_ids and not options['dry_run']:
+                    User.objects.filter(pk__in=stale_ids).update(**actual_counts())
+
+        verb = "Found" if options['dry_run'] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {drifted} users with drifted counters."))
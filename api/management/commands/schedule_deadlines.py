@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api import scheduler
+from api.models import Auction
+
+
+class Command(BaseCommand):
+    help = "Register every open auction in the Redis deadline set, e.g. after deploying or losing Redis data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        redis = scheduler.get_redis()
+        open_auctions = Auction.objects.filter(closed=False).order_by('pk').values_list('pk', 'deadline')
+        last_pk = 0
+        total = 0
+
+        while True:
+            chunk = list(open_auctions.filter(pk__gt=last_pk)[:options['chunk_size']])
+            if not chunk:
+                break
+            redis.zadd(scheduler.DEADLINES_KEY, {str(pk): deadline.timestamp() for pk, deadline in chunk})
+            last_pk = chunk[-1][0]
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {total} open auctions."))
@@ -0,0 +1,274 @@
+import io
+import itertools
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from PIL import Image
+
+from api import images, scheduler
+from api.benchmarks import vocabulary, zipf_cum_weights
+from api.cache import auctions_changed
+from api.models import Auction, AuctionImage, Bid, FeedEntry, User
+
+Follow = User.follows.through
+
+# Auctions run for AUCTION_DAYS and end between DEADLINE_SPREAD days ago and
+# AUCTION_DAYS - DEADLINE_SPREAD days from now, so some are already closed.
+AUCTION_DAYS = 7
+DEADLINE_SPREAD = 3
+
+PLACEHOLDER_COLOURS = ["firebrick", "seagreen", "steelblue", "goldenrod", "slategray"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load users, follows, auctions, images and bids for load testing. Popular sellers "
+        "get most followers and listings and a few auctions get most bids (Zipf). Stored "
+        "counters, prices, winners and feeds are filled in as the app would have."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--auctions', type=int, default=100_000)
+        parser.add_argument('--images-per-auction', type=int, default=1)
+        parser.add_argument('--bids', type=int, default=1_000_000)
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for repeatable data sets.")
+        parser.add_argument('--prefix', default='load', help="Username prefix for the seeded users.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.started = time.perf_counter()
+        self.now = timezone.now()
+
+        users = options['users']
+        follows = self.plan_follows(users, min(options['follows_per_user'], users - 1))
+        # How much a seller lists is skewed too, but unrelated to how many
+        # followers they have.
+        listers = self.rng.sample(range(users), users)
+        authors = self.rng.choices(listers, cum_weights=zipf_cum_weights(users, 0.5), k=options['auctions'])
+        bid_counts = self.plan_bid_counts(options['auctions'], options['bids'])
+
+        user_ids = self.create_users(options['prefix'], users, follows, authors)
+        self.create_follows(user_ids, follows)
+        auctions = self.create_auctions(user_ids, authors, bid_counts)
+        self.create_images(auctions, options['images_per_auction'])
+        self.create_bids(user_ids, auctions, bid_counts)
+        self.set_winners(auctions)
+        self.fill_feeds(user_ids, follows)
+        auctions_changed()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {users} users, {len(follows)} follows, {len(auctions)} auctions "
+            f"and {sum(bid_counts)} bids in {time.perf_counter() - self.started:.0f}s."
+        ))
+
+    def progress(self, message):
+        self.stdout.write(f"[{time.perf_counter() - self.started:7.1f}s] {message}")
+
+    def chunks(self, iterable):
+        iterator = iter(iterable)
+        while chunk := list(itertools.islice(iterator, self.chunk_size)):
+            yield chunk
+
+    def plan_follows(self, users, per_user):
+        """Pairs of user indexes; popular users (low indexes) get most followers."""
+        weights = zipf_cum_weights(users)
+        follows = []
+        for user in range(users):
+            followed = set()
+            while len(followed) < per_user:
+                other = self.rng.choices(range(users), cum_weights=weights)[0]
+                if other != user:
+                    followed.add(other)
+            follows.extend((user, other) for other in followed)
+        return follows
+
+    def plan_bid_counts(self, auctions, bids):
+        if not auctions:
+            return []
+        shares = [1 / rank ** 0.8 for rank in range(1, auctions + 1)]
+        self.rng.shuffle(shares)
+        total = sum(shares)
+        counts = [int(bids * share / total) for share in shares]
+        for i in self.rng.sample(range(auctions), bids - sum(counts)):
+            counts[i] += 1
+        return counts
+
+    def create_users(self, prefix, users, follows, authors):
+        tag = uuid.uuid4().hex[:6]
+        password = make_password(None)
+        followers = [0] * users
+        following = [0] * users
+        for user, other in follows:
+            following[user] += 1
+            followers[other] += 1
+        listed = [0] * users
+        for author in authors:
+            listed[author] += 1
+
+        ids = []
+        for chunk in self.chunks(range(users)):
+            created = User.objects.bulk_create(
+                User(
+                    username=f"{prefix}-{tag}-{i}",
+                    password=password,
+                    followers_count=followers[i],
+                    following_count=following[i],
+                    auctions_count=listed[i],
+                )
+                for i in chunk
+            )
+            ids.extend(user.pk for user in created)
+        self.progress(f"{len(ids)} users")
+        return ids
+
+    def create_follows(self, user_ids, follows):
+        for chunk in self.chunks(follows):
+            Follow.objects.bulk_create(
+                Follow(from_user_id=user_ids[user], to_user_id=user_ids[other]) for user, other in chunk
+            )
+        self.progress(f"{len(follows)} follows")
+
+    def create_auctions(self, user_ids, authors, bid_counts):
+        words = vocabulary(5_000, self.rng)
+        self.rng.shuffle(words)
+        weights = zipf_cum_weights(len(words))
+        categories = [value for value, _ in Auction.CategoryChoices.choices]
+
+        auctions = []
+        open_counts = {}
+        for chunk in self.chunks(range(len(authors))):
+            batch = []
+            for i in chunk:
+                deadline = self.now + timedelta(days=self.rng.uniform(-DEADLINE_SPREAD, AUCTION_DAYS - DEADLINE_SPREAD))
+                starting_price = Decimal(self.rng.randint(100, 50_000)) / 100
+                minimal_bid = Decimal(self.rng.choice([1, 2, 5, 10]))
+                bids = bid_counts[i]
+                # Bid n (from 1) is starting_price + n * minimal_bid, spread
+                # evenly over the part of the auction that has passed.
+                last_bid_on = self.bid_time(deadline, bids, bids) if bids else None
+                batch.append(Auction(
+                    name=" ".join(self.rng.choices(words, cum_weights=weights, k=4)).capitalize(),
+                    description=" ".join(self.rng.choices(words, cum_weights=weights, k=40)),
+                    author_id=user_ids[authors[i]],
+                    starting_price=starting_price,
+                    minimal_bid=minimal_bid,
+                    category=self.rng.choice(categories),
+                    deadline=deadline,
+                    closed=deadline <= self.now,
+                    current_price=starting_price + bids * minimal_bid,
+                    bid_count=bids,
+                    last_bid_on=last_bid_on,
+                ))
+            with transaction.atomic():
+                created = Auction.objects.bulk_create(batch)
+                ids = [auction.pk for auction in created]
+                # created_on is set on insert; move it back to the auction's start.
+                Auction.objects.filter(pk__in=ids).update(created_on=F('deadline') - timedelta(days=AUCTION_DAYS))
+                scheduler.schedule((auction.pk, auction.deadline) for auction in created if not auction.closed)
+            for auction in created:
+                if not auction.closed:
+                    open_counts[auction.author_id] = open_counts.get(auction.author_id, 0) + 1
+            auctions.extend(created)
+            self.progress(f"{len(auctions)} auctions")
+
+        for user_id, count in open_counts.items():
+            User.objects.filter(pk=user_id).update(open_auctions_count=count)
+        return auctions
+
+    def bid_time(self, deadline, n, total):
+        start = deadline - timedelta(days=AUCTION_DAYS)
+        end = min(deadline, self.now)
+        return start + (end - start) * n / (total + 1)
+
+    def create_images(self, auctions, per_auction):
+        if not per_auction or not auctions:
+            return
+        # A few real, processed images whose files every seeded image shares.
+        templates = []
+        for colour in PLACEHOLDER_COLOURS:
+            buffer = io.BytesIO()
+            Image.new("RGB", (1200, 900), colour).save(buffer, format="JPEG")
+            template = AuctionImage(auction=auctions[0])
+            template.image.save(f"seed_{colour}.jpg", ContentFile(buffer.getvalue()), save=False)
+            template.save()
+            templates.append(images.process(template))
+        AuctionImage.objects.filter(pk__in=[template.pk for template in templates]).delete()
+
+        fields = ['image', 'width', 'height', 'processed_on']
+        for variant in images.VARIANTS:
+            fields += [variant, f'{variant}_width', f'{variant}_height']
+        rows = (
+            AuctionImage(auction=auction, **{field: getattr(self.rng.choice(templates), field) for field in fields})
+            for auction in auctions
+            for _ in range(per_auction)
+        )
+        total = 0
+        for chunk in self.chunks(rows):
+            AuctionImage.objects.bulk_create(chunk)
+            total += len(chunk)
+        self.progress(f"{total} images")
+
+    def create_bids(self, user_ids, auctions, bid_counts):
+        # Rows go through executemany rather than bulk_create: preparing each
+        # field of each Bid instance took most of the time at 10M rows.
+        ops = connection.ops
+        sql = f"INSERT INTO {Bid._meta.db_table} (auction_id, bidder_id, amount, placed_on) VALUES (%s, %s, %s, %s)"
+
+        def rows():
+            for auction, count in zip(auctions, bid_counts):
+                for n in range(1, count + 1):
+                    bidder = self.rng.choice(user_ids)
+                    while bidder == auction.author_id:
+                        bidder = self.rng.choice(user_ids)
+                    yield (
+                        auction.pk,
+                        bidder,
+                        ops.adapt_decimalfield_value(auction.starting_price + n * auction.minimal_bid, 9, 2),
+                        ops.adapt_datetimefield_value(self.bid_time(auction.deadline, n, count)),
+                    )
+
+        total = 0
+        with connection.cursor() as cursor:
+            for chunk in self.chunks(rows()):
+                with transaction.atomic():
+                    cursor.executemany(sql, chunk)
+                total += len(chunk)
+                if total % (self.chunk_size * 50) == 0:
+                    self.progress(f"{total} bids")
+        self.progress(f"{total} bids")
+
+    def set_winners(self, auctions):
+        top_bid = Bid.objects.filter(auction=OuterRef('pk')).order_by('-amount').values('pk')[:1]
+        closed = [auction.pk for auction in auctions if auction.closed and auction.bid_count]
+        for chunk in self.chunks(closed):
+            Auction.objects.filter(pk__in=chunk).update(winning_bid=Subquery(top_bid))
+        self.progress(f"{len(closed)} winners")
+
+    def fill_feeds(self, user_ids, follows):
+        # Set-based: one INSERT ... SELECT per chunk of followers instead of
+        # FeedEntry.objects.rebuild's query per followed seller.
+        sql = (
+            f"INSERT INTO {FeedEntry._meta.db_table} (user_id, auction_id, author_id, closed, deadline) "
+            f"SELECT f.from_user_id, a.id, a.author_id, a.closed, a.deadline "
+            f"FROM {Follow._meta.db_table} f JOIN {Auction._meta.db_table} a ON a.author_id = f.to_user_id "
+            f"WHERE f.from_user_id >= %s AND f.from_user_id <= %s"
+        )
+        total = 0
+        with connection.cursor() as cursor:
+            for chunk in self.chunks(sorted({user_ids[user] for user, _ in follows})):
+                cursor.execute(sql, [chunk[0], chunk[-1]])
+                total += cursor.rowcount
+        self.progress(f"{total} feed entries")
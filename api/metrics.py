@@ -0,0 +1,300 @@
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django_redis import get_redis_connection # type: ignore
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Request and task timings are aggregated into histograms in process
+# memory and added to Redis hashes at most every METRICS_FLUSH_INTERVAL
+# seconds, so every web and Celery process feeds the same totals and a
+# request costs no Redis round trip. The metrics/ view renders the totals
+# in the Prometheus text format.
+
+KEY_PREFIX = 'metrics:'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def get_redis():
+    return get_redis_connection('default')
+
+
+class Timings:
+    """What one request or task spent, filled in as it runs."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+
+
+current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+@contextmanager
+def timed(part):
+    """Add the time spent in the block to the current request's `part`."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, part, getattr(timings, part) + time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # First in the list, so a surrounding connection.execute_wrapper()
+    # block still pops its own wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class SerializerTimingMixin:
+    """Counts building a top-level serializer's `data` as serialization time."""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _label_string(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ",".join(f'{name}="{escape(value)}"' for name, value in sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+
+    @property
+    def key(self):
+        return f'{KEY_PREFIX}{self.name}'
+
+    def observe(self, value, **labels):
+        label_string = _label_string(labels)
+        bucket = next((str(bound) for bound in self.buckets if value <= bound), '+Inf')
+        with _pending_lock:
+            for field, amount in ((f'{label_string}|{bucket}', 1), (f'{label_string}|sum', value)):
+                _pending[(self.key, field)] = _pending.get((self.key, field), 0) + amount
+
+    def exposition(self, values):
+        """Prometheus text lines for the hash `values` read from Redis."""
+        series = {}
+        for field, value in values.items():
+            label_string, _, part = field.decode().rpartition('|')
+            series.setdefault(label_string, {})[part] = value
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_string, parts in sorted(series.items()):
+            prefix = f"{label_string}," if label_string else ""
+            total = 0
+            for bound in [*map(str, self.buckets), '+Inf']:
+                total += int(parts.get(bound, 0))
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {total}')
+            braces = f"{{{label_string}}}" if label_string else ""
+            lines.append(f"{self.name}_sum{braces} {float(parts.get('sum', 0))}")
+            lines.append(f"{self.name}_count{braces} {total}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', "Time until the response is returned, by view.", DURATION_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', "Time spent running SQL per request, by view.", DURATION_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', "SQL queries per request, by view.", QUERY_BUCKETS)
+REQUEST_SERIALIZE_TIME = Histogram(
+    'http_request_serialize_seconds', "Time spent building serializer data per request, by view.", DURATION_BUCKETS)
+REQUEST_RENDER_TIME = Histogram(
+    'http_request_render_seconds', "Time spent rendering the response body per request, by view.", DURATION_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', "Response body size, by view. Streaming responses are not counted.", SIZE_BUCKETS)
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', "Celery task run time, by task.", DURATION_BUCKETS)
+TASK_DB_TIME = Histogram(
+    'celery_task_db_seconds', "Time spent running SQL per Celery task run, by task.", DURATION_BUCKETS)
+TASK_QUERIES = Histogram(
+    'celery_task_db_queries', "SQL queries per Celery task run, by task.", QUERY_BUCKETS)
+
+HISTOGRAMS = [
+    REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_QUERIES, REQUEST_SERIALIZE_TIME, REQUEST_RENDER_TIME,
+    RESPONSE_SIZE, TASK_DURATION, TASK_DB_TIME, TASK_QUERIES,
+]
+
+
+class Counter:
+    """A counter whose hash fields are incremented in Redis directly, by api.throttling."""
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+
+    @property
+    def key(self):
+        return f'{KEY_PREFIX}{self.name}'
+
+    def field(self, **labels):
+        return _label_string(labels)
+
+    def exposition(self, values):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_string, value in sorted((field.decode(), value) for field, value in values.items()):
+            braces = f"{{{label_string}}}" if label_string else ""
+            lines.append(f"{self.name}{braces} {int(value)}")
+        return lines
+
+
+THROTTLE_REQUESTS = Counter(
+    'http_throttle_requests_total', "Requests checked against a throttle bucket, by scope and outcome.")
+
+COUNTERS = [THROTTLE_REQUESTS]
+
+
+def flush_due():
+    return bool(_pending) and time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+
+def flush(force=False):
+    """Add the observations made since the last flush to the totals in Redis."""
+    global _pending, _last_flush
+    with _pending_lock:
+        now = time.monotonic()
+        if not _pending or (not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL):
+            return
+        pending, _pending, _last_flush = _pending, {}, now
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for (key, field), amount in pending.items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(key, field, amount)
+            else:
+                pipe.hincrby(key, field, amount)
+        pipe.execute()
+    except Exception:
+        # Dropped rather than retried, so an outage can't grow memory.
+        logger.exception("Could not flush metrics")
+
+
+def exposition():
+    pipe = get_redis().pipeline(transaction=False)
+    for metric in [*HISTOGRAMS, *COUNTERS]:
+        pipe.hgetall(metric.key)
+    lines = []
+    for metric, values in zip([*HISTOGRAMS, *COUNTERS], pipe.execute()):
+        lines.extend(metric.exposition(values))
+    return "\n".join(lines) + "\n"
+
+
+def record_request(view, method, elapsed, timings, size):
+    labels = {'view': view, 'method': method}
+    REQUEST_DURATION.observe(elapsed, **labels)
+    REQUEST_DB_TIME.observe(timings.db, **labels)
+    REQUEST_QUERIES.observe(timings.queries, **labels)
+    REQUEST_SERIALIZE_TIME.observe(timings.serialize, **labels)
+    REQUEST_RENDER_TIME.observe(timings.render, **labels)
+    if size is not None:
+        RESPONSE_SIZE.observe(size, **labels)
+
+
+def server_timing(elapsed, timings):
+    return ", ".join([
+        f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+        f'serialize;dur={timings.serialize * 1000:.1f}',
+        f'render;dur={timings.render * 1000:.1f}',
+        f'total;dur={elapsed * 1000:.1f}',
+    ])
+
+
+_task_runs = {}
+
+
+def task_started(task_id=None, **kwargs):
+    timings = Timings()
+    current_timings.set(timings)
+    _task_runs[task_id] = (timings, time.perf_counter())
+
+
+def task_finished(task_id=None, task=None, **kwargs):
+    run = _task_runs.pop(task_id, None)
+    current_timings.set(None)
+    if run is None:
+        return
+    timings, started = run
+    TASK_DURATION.observe(time.perf_counter() - started, task=task.name)
+    TASK_DB_TIME.observe(timings.db, task=task.name)
+    TASK_QUERIES.observe(timings.queries, task=task.name)
+    flush()
+
+
+_profiling = threading.Lock()
+
+
+def start_profile():
+    """A running profiler for a PROFILE_SAMPLE_RATE share of requests, else None."""
+    if random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return None
+    # cProfile allows one active profiler at a time.
+    if not _profiling.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        _profiling.release()
+        return None
+    return profiler
+
+
+def finish_profile(profiler, view, elapsed):
+    """Keep the profile in PROFILE_DIR if the request was slow."""
+    try:
+        profiler.disable()
+        if elapsed >= settings.PROFILE_SLOW_REQUEST_SECONDS:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            name = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', view)}-{time.strftime('%Y%m%d-%H%M%S')}-{elapsed * 1000:.0f}ms.prof"
+            profiler.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+    finally:
+        _profiling.release()
@@ -0,0 +1,123 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics
+from .routers import RequestRouting, current_routing, pin_to_primary
+
+
+class MetricsMiddleware:
+    """
+    Times each request's SQL, serializer data and rendering, reports them
+    in a Server-Timing header and records them in api.metrics histograms
+    per view. With PROFILE_SAMPLE_RATE set, that share of requests run
+    under cProfile and the slow ones are written to PROFILE_DIR.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = metrics.Timings()
+        token = metrics.current_timings.set(timings)
+        profiler = metrics.start_profile()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.current_timings.reset(token)
+            if profiler is not None:
+                metrics.finish_profile(profiler, self.view_name(request), elapsed)
+        self.finish(request, response, timings, elapsed)
+        # Sends to Redis at most once per METRICS_FLUSH_INTERVAL.
+        metrics.flush()
+        return response
+
+    async def __acall__(self, request):
+        timings = metrics.Timings()
+        token = metrics.current_timings.set(timings)
+        # Other requests on the event loop run inside the profile too.
+        profiler = metrics.start_profile()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.current_timings.reset(token)
+            if profiler is not None:
+                metrics.finish_profile(profiler, self.view_name(request), elapsed)
+        self.finish(request, response, timings, elapsed)
+        if metrics.flush_due():
+            # The flush is a Redis round trip: not on the event loop.
+            await sync_to_async(metrics.flush)()
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unmatched'
+
+    def finish(self, request, response, timings, elapsed):
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing(elapsed, timings)
+        size = None if response.streaming else len(response.content)
+        metrics.record_request(self.view_name(request), request.method, elapsed, timings, size)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets api.routers.ReplicaRouter send a safe request's reads to a replica,
+    and pins a user's reads to the primary for a while after they write.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_routing.set(RequestRouting(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        user_id = self.writer_id(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        token = current_routing.set(RequestRouting(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        user_id = await sync_to_async(self.writer_id)(request, response)
+        if user_id is not None:
+            await sync_to_async(pin_to_primary)(user_id)
+        return response
+
+    @staticmethod
+    def writer_id(request, response):
+        if not settings.DATABASE_REPLICAS or request.method in SAFE_METHODS or response.status_code >= 400:
+            return None
+        # DRF sets the authenticated user on the Django request.
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2025-11-30 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_rename_placed_at_bid_placed_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follows',
+            field=models.ManyToManyField(blank=True, related_name='followers', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_stats(apps, schema_editor):
+    Auction = apps.get_model('api', 'Auction')
+    Bid = apps.get_model('api', 'Bid')
+
+    bids = Bid.objects.filter(auction=OuterRef('pk')).order_by().values('auction')
+    Auction.objects.update(
+        current_price=Coalesce(
+            Subquery(bids.annotate(top=Max('amount')).values('top')),
+            F('starting_price'),
+        ),
+        bid_count=Coalesce(
+            Subquery(bids.annotate(total=Count('pk')).values('total')),
+            Value(0),
+        ),
+        last_bid_on=Subquery(bids.annotate(last=Max('placed_on')).values('last')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_follows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='last_bid_on',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_bid_stats, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='auction',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=9),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['closed', 'current_price'], name='auction_closed_price_idx'),
+        ),
+    ]
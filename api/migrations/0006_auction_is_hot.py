@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_auction_current_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='is_hot',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='bid',
+            name='placed_on',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Auction = apps.get_model('api', 'Auction')
+    Follow = User.follows.through
+
+    def count(queryset, field):
+        return Coalesce(
+            Subquery(queryset.order_by().values(field).annotate(total=Count('pk')).values('total')),
+            Value(0),
+        )
+
+    User.objects.update(
+        followers_count=count(Follow.objects.filter(to_user=OuterRef('pk')), 'to_user'),
+        following_count=count(Follow.objects.filter(from_user=OuterRef('pk')), 'from_user'),
+        auctions_count=count(Auction.objects.filter(author=OuterRef('pk')), 'author'),
+        open_auctions_count=count(Auction.objects.filter(author=OuterRef('pk'), closed=False), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_auction_is_hot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='auctions_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='open_auctions_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
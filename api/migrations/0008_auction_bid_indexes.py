@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auction',
+            name='auction_closed_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', False)), fields=['created_on'], name='auction_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', False)), fields=['deadline'], name='auction_open_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', False)), fields=['current_price'], name='auction_open_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', True)), fields=['created_on'], name='auction_closed_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', True)), fields=['deadline'], name='auction_closed_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('closed', True)), fields=['current_price'], name='auction_closed_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['author', 'closed', 'deadline'], name='auction_author_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', '-amount'], name='bid_auction_amount_idx'),
+        ),
+    ]
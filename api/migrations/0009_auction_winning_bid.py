@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_winning_bids(apps, schema_editor):
+    Auction = apps.get_model('api', 'Auction')
+    Bid = apps.get_model('api', 'Bid')
+
+    winning_bid = Bid.objects.filter(auction=OuterRef('pk')).order_by('-amount', 'placed_on').values('pk')[:1]
+    Auction.objects.filter(closed=True).update(winning_bid=Subquery(winning_bid))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_auction_bid_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='winning_bid',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_auction', to='api.bid'),
+        ),
+        migrations.RunPython(backfill_winning_bids, migrations.RunPython.noop),
+    ]
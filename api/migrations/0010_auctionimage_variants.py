@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_auction_winning_bid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, height_field='medium_height', upload_to='auction_images/medium/', width_field='medium_width'),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='medium_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='medium_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='processed_on',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, height_field='thumbnail_height', upload_to='auction_images/thumbnails/', width_field='thumbnail_width'),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='thumbnail_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='thumbnail_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='webp',
+            field=models.ImageField(blank=True, editable=False, height_field='webp_height', upload_to='auction_images/webp/', width_field='webp_width'),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='webp_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='webp_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# The search index lives outside the model, so it is created per database
+# vendor. Other backends fall back to icontains matching in api.search.
+
+POSTGRES_FORWARDS = [
+    "ALTER TABLE api_auction ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION api_auction_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER api_auction_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON api_auction
+    FOR EACH ROW EXECUTE FUNCTION api_auction_search_vector()
+    """,
+    # Fires the trigger for existing rows.
+    "UPDATE api_auction SET name = name",
+    "CREATE INDEX api_auction_search_idx ON api_auction USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS api_auction_search_vector_update ON api_auction",
+    "DROP FUNCTION IF EXISTS api_auction_search_vector()",
+    "ALTER TABLE api_auction DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE api_auction_fts USING fts5(
+        name, description,
+        content='api_auction', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER api_auction_fts_insert AFTER INSERT ON api_auction BEGIN
+        INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_auction_fts_delete AFTER DELETE ON api_auction BEGIN
+        INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_auction_fts_update AFTER UPDATE OF name, description ON api_auction BEGIN
+        INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO api_auction_fts(api_auction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS api_auction_fts_insert",
+    "DROP TRIGGER IF EXISTS api_auction_fts_delete",
+    "DROP TRIGGER IF EXISTS api_auction_fts_update",
+    "DROP TABLE IF EXISTS api_auction_fts",
+]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_auctionimage_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            run({'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_feeds(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Auction = apps.get_model('api', 'Auction')
+    FeedEntry = apps.get_model('api', 'FeedEntry')
+    Follow = User.follows.through
+
+    followers = {}
+    for user_id, author_id in Follow.objects.values_list('from_user_id', 'to_user_id').iterator():
+        followers.setdefault(author_id, []).append(user_id)
+
+    for author_id, user_ids in followers.items():
+        auctions = list(Auction.objects.filter(author_id=author_id).values_list('pk', 'closed', 'deadline'))
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=user_id, auction_id=pk, author_id=author_id, closed=closed, deadline=deadline)
+                for user_id in user_ids
+                for pk, closed, deadline in auctions
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_auction_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('closed', models.BooleanField(default=False)),
+                ('deadline', models.DateTimeField()),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='api.auction')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'closed', 'deadline', 'auction'], name='feed_entry_order_idx'), models.Index(fields=['user', 'author'], name='feed_entry_author_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'auction'), name='feed_entry_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
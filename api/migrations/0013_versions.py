@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+# SQLite adds the column by rebuilding api_auction, which drops the
+# full-text triggers from 0011_auction_search; they are created again here.
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_auction_fts_insert AFTER INSERT ON api_auction BEGIN
+        INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_auction_fts_delete AFTER DELETE ON api_auction BEGIN
+        INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_auction_fts_update AFTER UPDATE OF name, description ON api_auction BEGIN
+        INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='auction',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='auctions_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
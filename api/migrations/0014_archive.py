@@ -0,0 +1,283 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Views over the live and the archived tables, read through the *Record
+# models. On SQLite the full-text index from 0011_auction_search is
+# rebuilt over the auction view, so archived auctions stay searchable;
+# its triggers leave the index alone while a row moves between tables.
+# On PostgreSQL the archive gets the same search_vector column and trigger.
+#
+# SQLite can't rebuild a table while a view reads it: a later migration
+# that makes SQLite remake one of the six tables has to drop the views
+# first and create them again after.
+
+AUCTION_COLUMNS = (
+    "id, name, description, author_id, starting_price, minimal_bid, created_on, closed, category, "
+    "deadline, current_price, bid_count, last_bid_on, is_hot, winning_bid_id, version"
+)
+BID_COLUMNS = "id, auction_id, bidder_id, amount, placed_on"
+IMAGE_COLUMNS = (
+    "id, auction_id, image, width, height, thumbnail, thumbnail_width, thumbnail_height, "
+    "medium, medium_width, medium_height, webp, webp_width, webp_height, processed_on"
+)
+
+
+def views(auction_columns):
+    return [
+        f"""
+        CREATE VIEW api_auction_record AS
+        SELECT {auction_columns} FROM api_auction
+        UNION ALL SELECT {auction_columns} FROM api_archivedauction
+        """,
+        f"""
+        CREATE VIEW api_bid_record AS
+        SELECT {BID_COLUMNS} FROM api_bid
+        UNION ALL SELECT {BID_COLUMNS} FROM api_archivedbid
+        """,
+        f"""
+        CREATE VIEW api_auction_image_record AS
+        SELECT {IMAGE_COLUMNS} FROM api_auctionimage
+        UNION ALL SELECT {IMAGE_COLUMNS} FROM api_archivedauctionimage
+        """,
+    ]
+
+
+DROP_VIEWS = [
+    "DROP VIEW IF EXISTS api_auction_record",
+    "DROP VIEW IF EXISTS api_bid_record",
+    "DROP VIEW IF EXISTS api_auction_image_record",
+]
+
+POSTGRES_FORWARDS = [
+    "ALTER TABLE api_archivedauction ADD COLUMN search_vector tsvector",
+    """
+    CREATE TRIGGER api_archivedauction_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON api_archivedauction
+    FOR EACH ROW EXECUTE FUNCTION api_auction_search_vector()
+    """,
+    "CREATE INDEX api_archivedauction_search_idx ON api_archivedauction USING GIN (search_vector)",
+    *views(f"{AUCTION_COLUMNS}, search_vector"),
+]
+
+POSTGRES_BACKWARDS = [
+    *DROP_VIEWS,
+    "DROP TRIGGER IF EXISTS api_archivedauction_search_vector_update ON api_archivedauction",
+    "ALTER TABLE api_archivedauction DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE api_auction_fts USING fts5(
+        name, description,
+        content='{content}', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+
+
+def sqlite_triggers(table, other=None):
+    # A row inserted into one table while it is still in `other`, or
+    # deleted from one table once it is in `other`, is being moved: its
+    # entry in the index stays as it is.
+    insert_when = f"WHEN NOT EXISTS (SELECT 1 FROM {other} WHERE id = new.id)" if other else ""
+    delete_when = f"WHEN NOT EXISTS (SELECT 1 FROM {other} WHERE id = old.id)" if other else ""
+    return [
+        f"""
+        CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} {insert_when} BEGIN
+            INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} {delete_when} BEGIN
+            INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_update AFTER UPDATE OF name, description ON {table} BEGIN
+            INSERT INTO api_auction_fts(api_auction_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO api_auction_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+    ]
+
+
+SQLITE_DROP_SEARCH = [
+    *(f"DROP TRIGGER IF EXISTS {table}_fts_{event}"
+      for table in ("api_auction", "api_archivedauction") for event in ("insert", "delete", "update")),
+    "DROP TABLE IF EXISTS api_auction_fts",
+]
+
+SQLITE_FORWARDS = [
+    *views(AUCTION_COLUMNS),
+    *SQLITE_DROP_SEARCH,
+    SQLITE_FTS_TABLE.format(content="api_auction_record"),
+    *sqlite_triggers("api_auction", "api_archivedauction"),
+    *sqlite_triggers("api_archivedauction", "api_auction"),
+    "INSERT INTO api_auction_fts(api_auction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    *SQLITE_DROP_SEARCH,
+    *DROP_VIEWS,
+    SQLITE_FTS_TABLE.format(content="api_auction"),
+    *sqlite_triggers("api_auction"),
+    "INSERT INTO api_auction_fts(api_auction_fts) VALUES ('rebuild')",
+]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionImageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='auction_images/')),
+                ('width', models.PositiveIntegerField(null=True)),
+                ('height', models.PositiveIntegerField(null=True)),
+                ('thumbnail', models.ImageField(blank=True, upload_to='auction_images/thumbnails/')),
+                ('thumbnail_width', models.PositiveIntegerField(null=True)),
+                ('thumbnail_height', models.PositiveIntegerField(null=True)),
+                ('medium', models.ImageField(blank=True, upload_to='auction_images/medium/')),
+                ('medium_width', models.PositiveIntegerField(null=True)),
+                ('medium_height', models.PositiveIntegerField(null=True)),
+                ('webp', models.ImageField(blank=True, upload_to='auction_images/webp/')),
+                ('webp_width', models.PositiveIntegerField(null=True)),
+                ('webp_height', models.PositiveIntegerField(null=True)),
+                ('processed_on', models.DateTimeField(null=True)),
+            ],
+            options={
+                'db_table': 'api_auction_image_record',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AuctionRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('description', models.TextField(max_length=500)),
+                ('starting_price', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('minimal_bid', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('created_on', models.DateTimeField()),
+                ('closed', models.BooleanField()),
+                ('category', models.CharField(choices=[('home', 'Home'), ('sports', 'Sports'), ('music', 'Music'), ('electronics', 'Electronics'), ('clothing', 'Clothing'), ('other', 'Other')], max_length=11)),
+                ('deadline', models.DateTimeField()),
+                ('current_price', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('bid_count', models.PositiveIntegerField()),
+                ('last_bid_on', models.DateTimeField(null=True)),
+                ('is_hot', models.BooleanField()),
+                ('version', models.PositiveIntegerField()),
+            ],
+            options={
+                'db_table': 'api_auction_record',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='BidRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('placed_on', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'api_bid_record',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAuction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50)),
+                ('description', models.TextField(max_length=500)),
+                ('starting_price', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('minimal_bid', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('created_on', models.DateTimeField()),
+                ('closed', models.BooleanField(default=True)),
+                ('category', models.CharField(choices=[('home', 'Home'), ('sports', 'Sports'), ('music', 'Music'), ('electronics', 'Electronics'), ('clothing', 'Clothing'), ('other', 'Other')], max_length=11)),
+                ('deadline', models.DateTimeField()),
+                ('current_price', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('last_bid_on', models.DateTimeField(blank=True, null=True)),
+                ('is_hot', models.BooleanField(default=False)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_auctions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAuctionImage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('image', models.ImageField(upload_to='auction_images/')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnail', models.ImageField(blank=True, upload_to='auction_images/thumbnails/')),
+                ('thumbnail_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnail_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('medium', models.ImageField(blank=True, upload_to='auction_images/medium/')),
+                ('medium_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('medium_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('webp', models.ImageField(blank=True, upload_to='auction_images/webp/')),
+                ('webp_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('webp_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('processed_on', models.DateTimeField(blank=True, null=True)),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='api.archivedauction')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedBid',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('placed_on', models.DateTimeField()),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='api.archivedauction')),
+                ('bidder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedauction',
+            name='winning_bid',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_auction', to='api.archivedbid'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbid',
+            index=models.Index(fields=['auction', '-amount'], name='archived_bid_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauction',
+            index=models.Index(fields=['created_on'], name='archived_auction_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauction',
+            index=models.Index(fields=['deadline'], name='archived_auction_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauction',
+            index=models.Index(fields=['current_price'], name='archived_auction_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauction',
+            index=models.Index(fields=['author', 'closed', 'deadline'], name='archived_auction_author_idx'),
+        ),
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            run({'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
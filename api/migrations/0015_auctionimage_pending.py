@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auctionimage',
+            index=models.Index(condition=models.Q(('processed_on__isnull', True)), fields=['auction'], name='auction_image_pending_idx'),
+        ),
+    ]
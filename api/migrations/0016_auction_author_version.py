@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_auctionimage_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['author', 'version'], name='auction_author_version_idx'),
+        ),
+    ]
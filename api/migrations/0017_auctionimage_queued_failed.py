@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+# The image view from 0014_archive, with the two new columns.
+
+IMAGE_COLUMNS = (
+    "id, auction_id, image, width, height, thumbnail, thumbnail_width, thumbnail_height, "
+    "medium, medium_width, medium_height, webp, webp_width, webp_height, processed_on"
+)
+
+DROP_VIEW = "DROP VIEW IF EXISTS api_auction_image_record"
+
+
+def view(columns):
+    return f"""
+        CREATE VIEW api_auction_image_record AS
+        SELECT {columns} FROM api_auctionimage
+        UNION ALL SELECT {columns} FROM api_archivedauctionimage
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_auction_author_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionimage',
+            name='failed_on',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimage',
+            name='queued_on',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedauctionimage',
+            name='failed_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedauctionimage',
+            name='queued_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimagerecord',
+            name='failed_on',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='auctionimagerecord',
+            name='queued_on',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunSQL(
+            [DROP_VIEW, view(f"{IMAGE_COLUMNS}, queued_on, failed_on")],
+            [DROP_VIEW, view(IMAGE_COLUMNS)],
+        ),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+import logging
+
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from decimal import Decimal
+from .cache import auctions_changed
+from . import scheduler
 from django.core.validators import MaxValueValidator, MinValueValidator
 
+logger = logging.getLogger(__name__)
+
 
 class User(AbstractUser):
     follows = models.ManyToManyField(
@@ -11,6 +19,84 @@ class User(AbstractUser):
         related_name="followers",
         blank=True
     )
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    auctions_count = models.PositiveIntegerField(default=0, editable=False)
+    open_auctions_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped when the user's auctions are created, closed or archived; bids
+    # and image changes show in their auctions' versions instead.
+    auctions_version = models.PositiveIntegerField(default=1, editable=False)
+
+    def follow(self, other):
+        with transaction.atomic():
+            _, created = User.follows.through.objects.get_or_create(from_user_id=self.pk, to_user_id=other.pk)
+            if created:
+                User.objects.filter(pk=self.pk).update(following_count=F('following_count') + 1)
+                User.objects.filter(pk=other.pk).update(followers_count=F('followers_count') + 1)
+                FeedEntry.objects.add_author(self.pk, other.pk)
+        return created
+
+    def unfollow(self, other):
+        with transaction.atomic():
+            deleted, _ = User.follows.through.objects.filter(from_user_id=self.pk, to_user_id=other.pk).delete()
+            if deleted:
+                User.objects.filter(pk=self.pk).update(following_count=F('following_count') - 1)
+                User.objects.filter(pk=other.pk).update(followers_count=F('followers_count') - 1)
+                FeedEntry.objects.remove_author(self.pk, other.pk)
+        return bool(deleted)
+
+class AuctionQuerySet(models.QuerySet):
+    def for_display(self):
+        # Everything AuctionSerializer touches, loaded in a fixed number of queries.
+        return self.select_related('author').prefetch_related('images')
+
+    def bump_author_versions(self):
+        """Bump auctions_version for the authors of these auctions."""
+        return User.objects.filter(pk__in=self.values('author')).update(auctions_version=F('auctions_version') + 1)
+
+    def facets(self, category=None, min_price=None, max_price=None, price_buckets=()):
+        """
+        Category counts, a price histogram and the price range, in one
+        aggregate query. Category counts ignore `category` and the price
+        facets ignore the price bounds, so each still shows the choices a
+        user could switch to. `price_buckets` are the ascending upper
+        bounds of all but the last, open-ended, histogram bucket.
+        """
+        in_category = Q(category=category) if category else Q()
+        in_price = Q()
+        if min_price is not None:
+            in_price &= Q(current_price__gte=min_price)
+        if max_price is not None:
+            in_price &= Q(current_price__lte=max_price)
+
+        bounds = [None, *price_buckets, None]
+        ranges = list(zip(bounds, bounds[1:]))
+        aggregates = {
+            'count': Count('pk', filter=in_category & in_price),
+            'min_price': Min('current_price', filter=in_category),
+            'max_price': Max('current_price', filter=in_category),
+        }
+        for value in Auction.CategoryChoices.values:
+            aggregates[f'category_{value}'] = Count('pk', filter=in_price & Q(category=value))
+        for i, (low, high) in enumerate(ranges):
+            in_bucket = Q()
+            if low is not None:
+                in_bucket &= Q(current_price__gte=low)
+            if high is not None:
+                in_bucket &= Q(current_price__lt=high)
+            aggregates[f'bucket_{i}'] = Count('pk', filter=in_category & in_bucket)
+
+        result = self.order_by().aggregate(**aggregates)
+        return {
+            'count': result['count'],
+            'categories': {value: result[f'category_{value}'] for value in Auction.CategoryChoices.values},
+            'min_price': result['min_price'],
+            'max_price': result['max_price'],
+            'price_histogram': [
+                {'min': low, 'max': high, 'count': result[f'bucket_{i}']} for i, (low, high) in enumerate(ranges)
+            ],
+        }
+
 
 class Auction(models.Model):
     class CategoryChoices(models.TextChoices):
@@ -30,6 +116,59 @@ class Auction(models.Model):
     closed = models.BooleanField(default=False)
     category = models.CharField(max_length=11, choices=CategoryChoices.choices)
     deadline = models.DateTimeField()
+    current_price = models.DecimalField(max_digits=9, decimal_places=2, editable=False)
+    bid_count = models.PositiveIntegerField(default=0, editable=False)
+    last_bid_on = models.DateTimeField(null=True, blank=True, editable=False)
+    is_hot = models.BooleanField(default=False)
+    # Bumped on bids, closing and image changes; the read views' ETags
+    # are built from it.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    winning_bid = models.OneToOneField(
+        "Bid",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="won_auction",
+    )
+
+    objects = AuctionQuerySet.as_manager()
+
+    class Meta:
+        # Django filters booleans as `WHERE closed` / `WHERE NOT closed`, which
+        # only partial indexes on the same condition can serve.
+        indexes = [
+            models.Index(fields=["created_on"], condition=models.Q(closed=False), name="auction_open_created_idx"),
+            models.Index(fields=["deadline"], condition=models.Q(closed=False), name="auction_open_deadline_idx"),
+            models.Index(fields=["current_price"], condition=models.Q(closed=False), name="auction_open_price_idx"),
+            models.Index(fields=["created_on"], condition=models.Q(closed=True), name="auction_closed_created_idx"),
+            models.Index(fields=["deadline"], condition=models.Q(closed=True), name="auction_closed_deadline_idx"),
+            models.Index(fields=["current_price"], condition=models.Q(closed=True), name="auction_closed_price_idx"),
+            # A user's auctions, open first then by deadline.
+            models.Index(fields=["author", "closed", "deadline"], name="auction_author_status_idx"),
+            # The users/<id>/auctions/ version stamp, from the index alone.
+            models.Index(fields=["author", "version"], name="auction_author_version_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # current_price mirrors Coalesce(Max(bids.amount), starting_price)
+        if self.current_price is None:
+            self.current_price = self.starting_price
+
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            User.objects.filter(pk=self.author_id).update(
+                auctions_count=F('auctions_count') + 1,
+                open_auctions_count=F('open_auctions_count') + (0 if self.closed else 1),
+                auctions_version=F('auctions_version') + 1,
+            )
+            FeedEntry.objects.add_auction(self)
+            auctions_changed()
+            if not self.closed:
+                scheduler.schedule([(self.pk, self.deadline)])
 
 class Bid(models.Model):
     auction = models.ForeignKey(
@@ -39,8 +178,279 @@ class Bid(models.Model):
     )
     bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bids")
     amount = models.DecimalField(max_digits=9, decimal_places=2)
-    placed_on = models.DateTimeField(auto_now_add=True)
+    placed_on = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["auction", "-amount"], name="bid_auction_amount_idx"),
+        ]
 
 class AuctionImage(models.Model):
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to="auction_images/")
\ No newline at end of file
+    image = models.ImageField(upload_to="auction_images/")
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    # Filled in by api.tasks.process_auction_image after upload.
+    thumbnail = models.ImageField(
+        upload_to="auction_images/thumbnails/", blank=True, editable=False,
+        width_field="thumbnail_width", height_field="thumbnail_height",
+    )
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    medium = models.ImageField(
+        upload_to="auction_images/medium/", blank=True, editable=False,
+        width_field="medium_width", height_field="medium_height",
+    )
+    medium_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    medium_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    webp = models.ImageField(
+        upload_to="auction_images/webp/", blank=True, editable=False,
+        width_field="webp_width", height_field="webp_height",
+    )
+    webp_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    webp_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    processed_on = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set by api.tasks.process_pending_images when it queues the image
+    # again, and when processing raises; failed images aren't retried.
+    queued_on = models.DateTimeField(null=True, blank=True, editable=False)
+    failed_on = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # For api.tasks.process_pending_images.
+        indexes = [
+            models.Index(
+                fields=["auction"], condition=models.Q(processed_on__isnull=True), name="auction_image_pending_idx",
+            ),
+        ]
+
+
+FEED_BATCH_SIZE = 1000
+
+
+class FeedEntryQuerySet(models.QuerySet):
+    def add_auction(self, auction):
+        """
+        Put a new auction in the feed of everyone who follows its author.
+        Up to FEED_BATCH_SIZE followers are written right away; larger
+        audiences are fanned out by api.tasks.fan_out_auction once the
+        transaction commits, so listing costs at most one insert.
+        """
+        if auction.author.followers_count <= FEED_BATCH_SIZE:
+            self._insert_batches(self._followers_entries(auction.pk, auction.author_id, auction.closed, auction.deadline))
+            return
+
+        def send():
+            from .tasks import fan_out_auction
+            try:
+                fan_out_auction.delay(auction.pk)
+            except Exception:
+                logger.exception("Could not queue feed fan-out for auction %s", auction.pk)
+
+        transaction.on_commit(send)
+
+    def fan_out(self, auction_id):
+        """add_auction() for a committed auction, one insert per batch of followers."""
+        auction = Auction.objects.filter(pk=auction_id).values('author_id', 'closed', 'deadline').first()
+        if auction is None:
+            return
+        self._insert_batches(self._followers_entries(auction_id, **auction))
+        # close_auctions() may have run while the entries were written.
+        if Auction.objects.filter(pk=auction_id, closed=True).exists():
+            self.filter(auction_id=auction_id).update(closed=True)
+
+    def _followers_entries(self, auction_id, author_id, closed, deadline):
+        followers = User.follows.through.objects.filter(to_user_id=author_id).values_list('from_user_id', flat=True)
+        return (
+            FeedEntry(user_id=follower_id, auction_id=auction_id, author_id=author_id, closed=closed, deadline=deadline)
+            for follower_id in followers.iterator(chunk_size=FEED_BATCH_SIZE)
+        )
+
+    def add_author(self, user_id, author_id):
+        """Put all of `author_id`'s auctions in `user_id`'s feed."""
+        auctions = Auction.objects.filter(author_id=author_id).values_list('pk', 'closed', 'deadline')
+        self._insert_batches(
+            FeedEntry(user_id=user_id, auction_id=pk, author_id=author_id, closed=closed, deadline=deadline)
+            for pk, closed, deadline in auctions.iterator(chunk_size=FEED_BATCH_SIZE)
+        )
+
+    def remove_author(self, user_id, author_id):
+        return self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def rebuild(self, user_id):
+        with transaction.atomic():
+            self.filter(user_id=user_id).delete()
+            for author_id in User.follows.through.objects.filter(
+                from_user_id=user_id
+            ).values_list('to_user_id', flat=True):
+                self.add_author(user_id, author_id)
+
+    def _insert_batches(self, entries):
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == FEED_BATCH_SIZE:
+                self.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            self.bulk_create(batch, ignore_conflicts=True)
+
+
+class FeedEntry(models.Model):
+    """
+    One auction in the followed-auctions feed of one user. Written when a
+    followed seller lists an auction or the user follows someone, so the
+    feed is read with a single index range scan instead of joining follows
+    against every auction. `closed` and `deadline` mirror the auction's and
+    give the feed its order.
+    """
+    # Covered by the indexes below, which all lead with user.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="feed", db_index=False)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="feed_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    closed = models.BooleanField(default=False)
+    deadline = models.DateTimeField()
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "auction"], name="feed_entry_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "closed", "deadline", "auction"], name="feed_entry_order_idx"),
+            models.Index(fields=["user", "author"], name="feed_entry_author_idx"),
+        ]
+
+
+# Closed auctions are moved, with their bids and images, from the tables
+# above into the Archived* tables below by api.archive, keeping their ids.
+# The *Record models read database views that UNION ALL the live and the
+# archived table, for the reads that should see both. The views list
+# their columns (migration 0014_archive): a new Auction, Bid or
+# AuctionImage column has to be added to the archive table and the view too.
+
+
+class ArchivedAuction(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=50)
+    description = models.TextField(max_length=500)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_auctions")
+    starting_price = models.DecimalField(max_digits=9, decimal_places=2)
+    minimal_bid = models.DecimalField(max_digits=9, decimal_places=2)
+    created_on = models.DateTimeField()
+    closed = models.BooleanField(default=True)
+    category = models.CharField(max_length=11, choices=Auction.CategoryChoices.choices)
+    deadline = models.DateTimeField()
+    current_price = models.DecimalField(max_digits=9, decimal_places=2)
+    bid_count = models.PositiveIntegerField(default=0)
+    last_bid_on = models.DateTimeField(null=True, blank=True)
+    is_hot = models.BooleanField(default=False)
+    winning_bid = models.OneToOneField(
+        "ArchivedBid", on_delete=models.SET_NULL, null=True, blank=True, related_name="won_auction",
+    )
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_on"], name="archived_auction_created_idx"),
+            models.Index(fields=["deadline"], name="archived_auction_deadline_idx"),
+            models.Index(fields=["current_price"], name="archived_auction_price_idx"),
+            models.Index(fields=["author", "closed", "deadline"], name="archived_auction_author_idx"),
+        ]
+
+
+class ArchivedBid(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    auction = models.ForeignKey(ArchivedAuction, on_delete=models.CASCADE, related_name="bids")
+    bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_bids")
+    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    placed_on = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["auction", "-amount"], name="archived_bid_amount_idx"),
+        ]
+
+
+class ArchivedAuctionImage(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    auction = models.ForeignKey(ArchivedAuction, on_delete=models.CASCADE, related_name="images")
+    image = models.ImageField(upload_to="auction_images/")
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail = models.ImageField(upload_to="auction_images/thumbnails/", blank=True)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True)
+    medium = models.ImageField(upload_to="auction_images/medium/", blank=True)
+    medium_width = models.PositiveIntegerField(null=True, blank=True)
+    medium_height = models.PositiveIntegerField(null=True, blank=True)
+    webp = models.ImageField(upload_to="auction_images/webp/", blank=True)
+    webp_width = models.PositiveIntegerField(null=True, blank=True)
+    webp_height = models.PositiveIntegerField(null=True, blank=True)
+    processed_on = models.DateTimeField(null=True, blank=True)
+    queued_on = models.DateTimeField(null=True, blank=True)
+    failed_on = models.DateTimeField(null=True, blank=True)
+
+
+class AuctionRecord(models.Model):
+    """Any auction, live or archived. Read-only."""
+    name = models.CharField(max_length=50)
+    description = models.TextField(max_length=500)
+    author = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    starting_price = models.DecimalField(max_digits=9, decimal_places=2)
+    minimal_bid = models.DecimalField(max_digits=9, decimal_places=2)
+    created_on = models.DateTimeField()
+    closed = models.BooleanField()
+    category = models.CharField(max_length=11, choices=Auction.CategoryChoices.choices)
+    deadline = models.DateTimeField()
+    current_price = models.DecimalField(max_digits=9, decimal_places=2)
+    bid_count = models.PositiveIntegerField()
+    last_bid_on = models.DateTimeField(null=True)
+    is_hot = models.BooleanField()
+    winning_bid = models.OneToOneField(
+        "BidRecord", on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name="+",
+    )
+    version = models.PositiveIntegerField()
+
+    objects = AuctionQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = "api_auction_record"
+
+
+class BidRecord(models.Model):
+    """Any bid, on a live or an archived auction. Read-only."""
+    auction = models.ForeignKey(AuctionRecord, on_delete=models.DO_NOTHING, db_constraint=False, related_name="bids")
+    bidder = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    placed_on = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = "api_bid_record"
+
+
+class AuctionImageRecord(models.Model):
+    """Any auction image, live or archived. Read-only."""
+    auction = models.ForeignKey(AuctionRecord, on_delete=models.DO_NOTHING, db_constraint=False, related_name="images")
+    image = models.ImageField(upload_to="auction_images/")
+    width = models.PositiveIntegerField(null=True)
+    height = models.PositiveIntegerField(null=True)
+    thumbnail = models.ImageField(upload_to="auction_images/thumbnails/", blank=True)
+    thumbnail_width = models.PositiveIntegerField(null=True)
+    thumbnail_height = models.PositiveIntegerField(null=True)
+    medium = models.ImageField(upload_to="auction_images/medium/", blank=True)
+    medium_width = models.PositiveIntegerField(null=True)
+    medium_height = models.PositiveIntegerField(null=True)
+    webp = models.ImageField(upload_to="auction_images/webp/", blank=True)
+    webp_width = models.PositiveIntegerField(null=True)
+    webp_height = models.PositiveIntegerField(null=True)
+    processed_on = models.DateTimeField(null=True)
+    queued_on = models.DateTimeField(null=True)
+    failed_on = models.DateTimeField(null=True)
+
+    class Meta:
+        managed = False
+        db_table = "api_auction_image_record"
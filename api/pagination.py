@@ -0,0 +1,185 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset (cursor) pagination when
+    the request carries a `cursor` parameter. Send `cursor=` (empty) for the
+    first page and follow the returned `next`/`previous` links after that.
+
+    Keyset pages filter on the last seen ordering values instead of using
+    OFFSET, and skip the COUNT(*), so every page costs the same however
+    deep the client scrolls. The queryset's own ordering (including any
+    OrderingFilter term) is kept, with the primary key as a tiebreaker.
+    """
+    page_size = 10
+    page_size_query_param = 'size'
+    max_page_size = 20
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        queryset, size, values, backwards = self.keyset_queryset(queryset, request)
+        return self.keyset_page(list(queryset[:size + 1]), size, values, backwards)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: the queries are awaited."""
+        self.keyset = self.cursor_query_param in request.query_params
+        if self.keyset:
+            queryset, size, values, backwards = self.keyset_queryset(queryset, request)
+            rows = [row async for row in queryset[:size + 1]]
+            return self.keyset_page(rows, size, values, backwards)
+
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.page.object_list = [row async for row in self.page.object_list]
+        return list(self.page)
+
+    def keyset_queryset(self, queryset, request):
+        self.request = request
+        size = self.get_page_size(request)
+        ordering = [term for term in queryset.query.order_by if term.lstrip('-') not in ('pk', 'id')]
+        self.ordering = ordering + ['pk']
+
+        values, backwards = self.decode_cursor(request)
+        ordering = self.ordering
+        if backwards:
+            ordering = [self.invert(term) for term in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            values = self.cursor_values(queryset, values)
+            queryset = queryset.filter(self.after(ordering, values))
+        return queryset, size, values, backwards
+
+    def keyset_page(self, rows, size, values, backwards):
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        if backwards:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or self.last is None:
+            return None
+        return self.cursor_link(self.last, backwards=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or self.first is None:
+            return None
+        return self.cursor_link(self.first, backwards=True)
+
+    def cursor_link(self, instance, backwards):
+        values = [self.encode_value(self.position(instance, term)) for term in self.ordering]
+        payload = json.dumps({'v': values, 'b': backwards}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, backwards = payload['v'], bool(payload['b'])
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, backwards
+
+    def cursor_values(self, queryset, values):
+        # Cursors come from clients: each value must be valid for its column.
+        converted = []
+        try:
+            for term, value in zip(self.ordering, values):
+                field = self.ordering_field(queryset, term.lstrip('-'))
+                value = field.to_python(value)
+                if value is None:
+                    raise ValueError
+                field.run_validators(value)
+                converted.append(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return converted
+
+    @staticmethod
+    def ordering_field(queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def after(ordering, values):
+        # (a, b, pk) > (x, y, z) spelled out per column so mixed directions work.
+        condition = Q()
+        for index, term in enumerate(ordering):
+            step = Q(**{f'{term.lstrip("-")}__{"lt" if term.startswith("-") else "gt"}': values[index]})
+            for previous, value in zip(ordering[:index], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def invert(term):
+        return term[1:] if term.startswith('-') else f'-{term}'
+
+    @staticmethod
+    def position(instance, term):
+        return getattr(instance, term.lstrip('-'))
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
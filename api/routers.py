@@ -0,0 +1,79 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+# Reads go to a replica only inside a safe (GET/HEAD/OPTIONS) request, as
+# marked by api.middleware.ReplicaRoutingMiddleware, and only if the user
+# hasn't written in the last REPLICA_PIN_SECONDS. Writes, unsafe requests,
+# Celery tasks and management commands all use the primary. A request
+# reads from one replica throughout, and responses that go into the
+# response cache are built from the primary (see primary_reads).
+
+PRIMARY = 'default'
+
+current_routing = contextvars.ContextVar('current_routing', default=None)
+
+
+def pin_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary until replicas have caught up."""
+    cache.set(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the block's reads to the primary. For responses that are cached
+    under the current version: a lagging replica could give the body from
+    before a write, which would then be served until the entry expires.
+    """
+    token = current_routing.set(None)
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+class RequestRouting:
+    def __init__(self, request):
+        self.request = request
+        self.replica = None if request.method in SAFE_METHODS else False
+
+    def use_replica(self):
+        """The replica alias for this request's reads, or False for the primary."""
+        if self.replica is None:
+            # Decided on the first read, after DRF has authenticated the
+            # request. Loading a session user may itself query: that one
+            # goes to the primary.
+            self.replica = False
+            user = getattr(self.request, 'user', None)
+            if not (user is not None and user.is_authenticated and cache.get(pin_key(user.pk))):
+                # One replica for the whole request, so its count, page and
+                # prefetches see the same data.
+                self.replica = random.choice(settings.DATABASE_REPLICAS)
+        return self.replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if settings.DATABASE_REPLICAS and routing is not None:
+            return routing.use_replica() or PRIMARY
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,51 @@
+import logging
+
+from django.db import transaction
+from django_redis import get_redis_connection # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Open auctions are kept in a sorted set scored by deadline, so finding the
+# ones that are due is a range read of the set's head rather than a table
+# scan. api.tasks.close_due_auctions drains it every second.
+
+DEADLINES_KEY = 'auctions:deadlines'
+
+
+def get_redis():
+    return get_redis_connection('default')
+
+
+def schedule(auctions, key=DEADLINES_KEY):
+    """Register `auctions` (pairs of id and deadline) once the transaction commits."""
+    mapping = {str(auction_id): deadline.timestamp() for auction_id, deadline in auctions}
+    if not mapping:
+        return
+
+    def add():
+        try:
+            get_redis().zadd(key, mapping)
+        except Exception:
+            # The periodic sweep still closes anything missing from the set.
+            logger.exception("Could not schedule auction deadlines")
+
+    transaction.on_commit(add)
+
+
+def reschedule(auctions, key=DEADLINES_KEY):
+    """Move `auctions` (pairs of id and deadline) to their deadlines now."""
+    if auctions:
+        get_redis().zadd(key, {str(auction_id): deadline.timestamp() for auction_id, deadline in auctions})
+
+
+def due(now, limit, key=DEADLINES_KEY):
+    return [int(auction_id) for auction_id in get_redis().zrangebyscore(key, '-inf', now.timestamp(), 0, limit)]
+
+
+def unschedule(auction_ids, key=DEADLINES_KEY):
+    if auction_ids:
+        get_redis().zrem(key, *auction_ids)
+
+
+def pending(key=DEADLINES_KEY):
+    return get_redis().zcard(key)
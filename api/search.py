@@ -0,0 +1,76 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Full-text search over auction name and description.
+#
+# PostgreSQL keeps a weighted tsvector column with a GIN index, SQLite an
+# external-content FTS5 table. Both are maintained by triggers that only
+# fire when name or description change, so bid updates never touch them.
+# See migration 0011_auction_search.
+
+FTS_TABLE = 'api_auction_fts'
+
+# Name matches weigh more than description matches.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 5.0
+
+MAX_TERMS = 8
+
+
+def terms(text):
+    return re.findall(r'[^\W_]+', text.lower())[:MAX_TERMS]
+
+
+def postgres_query(words):
+    # Every word must match; the last characters typed match as a prefix.
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def sqlite_query(words):
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(queryset, text):
+    """
+    Filter `queryset` to auctions matching `text` and annotate each with a
+    `search_rank`, higher meaning more relevant.
+    """
+    words = terms(text)
+    if not words:
+        return queryset
+
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = postgres_query(words)
+        matches = RawSQL(
+            f'"{table}"."search_vector" @@ to_tsquery(\'english\', %s)',
+            [query], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'ts_rank_cd("{table}"."search_vector", to_tsquery(\'english\', %s))::float8',
+            [query], output_field=FloatField(),
+        )
+    elif vendor == 'sqlite':
+        # Joined rather than a correlated subquery: bm25() restarts the
+        # full-text query every time it is evaluated on its own.
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "{table}"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[sqlite_query(words)],
+        )
+        # bm25() is lower for better matches.
+        return queryset.annotate(search_rank=RawSQL(
+            f'-bm25({FTS_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT})', [], output_field=FloatField(),
+        ))
+    else:
+        condition = Q()
+        for word in words:
+            condition &= Q(name__icontains=word) | Q(description__icontains=word)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.filter(matches).annotate(search_rank=rank)
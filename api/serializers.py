@@ -1,14 +1,86 @@
-from django.utils import timezone
-from django.shortcuts import get_object_or_404
+import logging
+
+from django.db import transaction
 from .models import AuctionImage, User, Auction, Bid
+from .bidding import place_bid, BidRejected
+from .images import inspect_all
+from .metrics import SerializerTimingMixin
+from .tasks import process_auction_image
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from decimal import Decimal, ROUND_HALF_UP
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer    
 
+logger = logging.getLogger(__name__)
+
+
 class AuctionImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = AuctionImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'width', 'height', 'variants']
+
+    def get_variants(self, obj):
+        # Empty until the processing task has run for this image.
+        request = self.context.get('request')
+        variants = {}
+        for name in ('thumbnail', 'medium', 'webp'):
+            file = getattr(obj, name)
+            if not file:
+                continue
+            url = request.build_absolute_uri(file.url) if request else file.url
+            variants[name] = {
+                'url': url,
+                'width': getattr(obj, f'{name}_width'),
+                'height': getattr(obj, f'{name}_height'),
+            }
+        return variants
+
+
+def create_auctions(items):
+    """
+    Create auctions and their images in one transaction. Images for all
+    of them are inserted with a single bulk insert.
+    """
+    with transaction.atomic():
+        auctions = []
+        images = []
+        for attrs in items:
+            uploads = attrs.pop("uploaded_images", [])
+            auction = Auction.objects.create(**attrs)
+            auctions.append(auction)
+            images.extend(
+                AuctionImage(auction=auction, image=upload, width=width, height=height)
+                for upload, (width, height) in uploads
+            )
+
+        queue_processing([image.pk for image in AuctionImage.objects.bulk_create(images)])
+
+    return auctions
+
+
+def queue_processing(image_ids):
+    def send():
+        try:
+            for image_id in image_ids:
+                process_auction_image.delay(image_id)
+        except Exception:
+            # The auctions exist, so the request still succeeds;
+            # api.tasks.process_pending_images queues the images later.
+            logger.exception("Could not queue auction images for processing")
+
+    if image_ids:
+        transaction.on_commit(send)
+
+
+class TimedListSerializer(SerializerTimingMixin, serializers.ListSerializer):
+    pass
+
+
+class AuctionListSerializer(TimedListSerializer):
+    def create(self, validated_data):
+        return create_auctions(validated_data)
 
 
 class SmallUserSerializer(serializers.ModelSerializer):
@@ -17,13 +89,14 @@ class SmallUserSerializer(serializers.ModelSerializer):
         fields = ["id", "username"]
 
     
-class AuctionSerializer(serializers.ModelSerializer):
+class AuctionSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     highest_bid = serializers.SerializerMethodField()
     images = AuctionImageSerializer(many=True, read_only=True)
     author = SmallUserSerializer(read_only=True)
 
     uploaded_images = serializers.ListField(
-        child=serializers.ImageField(),
+        # Decoded by validate_uploaded_images instead of one by one here.
+        child=serializers.FileField(),
         write_only=True,
     )
 
@@ -45,6 +118,7 @@ class AuctionSerializer(serializers.ModelSerializer):
             "uploaded_images"
         ]
         read_only_fields = ('highest_bid', 'created_on')
+        list_serializer_class = AuctionListSerializer
 
 
     def validate_uploaded_images(self, images):
@@ -58,33 +132,26 @@ class AuctionSerializer(serializers.ModelSerializer):
             if img.size > 5 * 1024 * 1024:
                 raise serializers.ValidationError(f"{img.name} is too large (max 5MB).")
 
-        return images
+        sizes = inspect_all(images)
+        invalid = [img.name for img, size in zip(images, sizes) if size is None]
+        if invalid:
+            raise serializers.ValidationError(
+                [f"{name} is not a valid image." for name in invalid]
+            )
 
+        return list(zip(images, sizes))
 
-    def create(self, validated_data):
-        uploaded_images = validated_data.pop("uploaded_images", [])
-        auction = super().create(validated_data)
-
-        for img in uploaded_images:
-            AuctionImage.objects.create(auction=auction, image=img)
 
-        return auction
+    def create(self, validated_data):
+        return create_auctions([validated_data])[0]
 
 
     def get_highest_bid(self, obj):
-        value = getattr(obj, 'highest_bid_amount', None)
-        if value is None:
-            highest = obj.bids.order_by('-amount').first()
-            value = highest.amount if highest else obj.starting_price
-        value = Decimal(value).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        value = Decimal(obj.current_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
         return str(value)
 
 
-class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(source="followers.count", read_only=True)
-    following_count = serializers.SerializerMethodField()
-    auctions_count = serializers.IntegerField(source="auctions.count")
-    open_auctions_count = serializers.SerializerMethodField()
+class UserSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     is_following = serializers.SerializerMethodField()
 
     class Meta:
@@ -96,53 +163,45 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
     
-    def get_following_count(self, obj):
-        return obj.follows.all().count()
-    
-    def get_open_auctions_count(self, obj):
-        return obj.auctions.filter(closed=False).count()
-    
     def get_is_following(self, obj):
         request_user = self.context['request'].user
 
-        if not request_user.is_authenticated or request_user == obj:
+        # request_user may be a TokenUser, so compare ids rather than objects.
+        if not request_user.is_authenticated or request_user.pk == obj.pk:
             return None
-        
+
+        # Annotated by RetrieveUserAPIView to spare a query.
+        if hasattr(obj, 'viewer_follows'):
+            return obj.viewer_follows
         return obj.followers.filter(pk=request_user.pk).exists()
     
-class BidSerializer(serializers.ModelSerializer):
-    bidder = UserSerializer(read_only=True)
+class BidSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    bidder = SmallUserSerializer(read_only=True)
 
     class Meta:
         model = Bid
         fields = ['id', 'bidder', 'amount', 'placed_on']
         read_only_fields = ['auction']
-        
-    def validate(self, attrs):
-        request = self.context['request']
-        view = self.context['view']
-        auction_id = view.kwargs.get('auction_id')
-
-        auction = get_object_or_404(Auction, pk=auction_id)
-        amount = attrs['amount']
-        user = request.user
-
-        if user == auction.author:
-            raise serializers.ValidationError("You can't bid on your auction")
-        
-        if auction.deadline < timezone.now():
-            raise serializers.ValidationError("Auction has ended")
-        
-
-        highest_bid = auction.bids.order_by('-amount').first()
-        highest_amount = Decimal(highest_bid.amount) if highest_bid else Decimal('0')
+        list_serializer_class = TimedListSerializer
 
-        minimal_allowed = Decimal(auction.minimal_bid) + highest_amount
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Bids accepted by the hot auction ledger have no id yet.
+        if instance.pk is None:
+            del data['id']
+        return data
 
-        if Decimal(amount) < minimal_allowed:
-            raise serializers.ValidationError(f"Bid must be at least ${minimal_allowed}")
-
-        return attrs
+    def create(self, validated_data):
+        try:
+            return place_bid(
+                validated_data['auction_id'],
+                validated_data['bidder'],
+                validated_data['amount'],
+            )
+        except BidRejected as rejection:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [rejection.message]
+            })
 
 
 # Ensuring the new bid is higher than the last bid.
@@ -1,9 +1,63 @@
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from .models import Auction
+from .models import Auction, FeedEntry
+from .archive import archive_due
+from .closing import close_auctions, close_due
+from . import images, ledger
+
+@shared_task
+def close_due_auctions():
+    return close_due(settings.AUCTION_CLOSE_BATCH_SIZE, settings.AUCTION_CLOSE_MAX_BATCHES)
+
 
 @shared_task
 def close_expired_auctions():
-    now = timezone.now()
-    expired = Auction.objects.filter(closed=False, deadline__lte=now)
-    expired.update(closed=True)
\ No newline at end of file
+    # Safety net for auctions missing from the deadline set.
+    batch_size = settings.AUCTION_CLOSE_BATCH_SIZE
+    closed = 0
+
+    while True:
+        ids = list(
+            Auction.objects.filter(closed=False, deadline__lte=timezone.now())
+            .order_by('deadline').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        closed_ids = close_auctions(Auction.objects.filter(pk__in=ids))
+        if not closed_ids:
+            break
+        closed += len(closed_ids)
+
+    return closed
+
+
+@shared_task
+def flush_hot_bids():
+    if not ledger.enabled():
+        return 0
+    return sum(ledger.flush(auction_id) for auction_id in ledger.dirty_auctions())
+
+
+@shared_task
+def process_auction_image(image_id):
+    images.process_by_id(image_id)
+
+
+@shared_task
+def fan_out_auction(auction_id):
+    FeedEntry.objects.fan_out(auction_id)
+
+
+@shared_task
+def process_pending_images():
+    # Safety net for images whose processing task was never queued.
+    image_ids = images.pending(timezone.now() - settings.IMAGE_PENDING_AFTER, settings.IMAGE_PENDING_BATCH_SIZE)
+    for image_id in image_ids:
+        process_auction_image.delay(image_id)
+    return len(image_ids)
+
+
+@shared_task
+def archive_closed_auctions():
+    return archive_due(settings.ARCHIVE_AFTER, settings.ARCHIVE_BATCH_SIZE, settings.ARCHIVE_MAX_BATCHES)
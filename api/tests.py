@@ -1,3 +1,1744 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from . import events, images, ledger, metrics, scheduler, throttling, urls, views
+from .authentication import user_cache_key
+from .benchmarks import request_factory
+from .cache import CachedResponseMixin, get_versions
+from .bidding import place_bid, BidRejected
+from .archive import archive_auctions
+from .closing import close_auctions
+from .middleware import MetricsMiddleware, ReplicaRoutingMiddleware
+from .models import User, ArchivedAuction, Auction, AuctionImage, Bid, FeedEntry
+from .routers import ReplicaRouter, pin_key
+from .serializers import MyTokenObtainPairSerializer
+from .tasks import (
+    archive_closed_auctions, close_due_auctions, close_expired_auctions, fan_out_auction, flush_hot_bids,
+    process_pending_images,
+)
+
+
+def fake_redis():
+    """A private fakeredis, or None if fakeredis is not installed."""
+    try:
+        import fakeredis # type: ignore
+    except ImportError:
+        return None
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+# Throttles are tested on their own in ThrottleTests.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    THROTTLE_BUCKETS={},
+)
+class AuctionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # The locmem cache has no Redis connection; metrics, events and the
+        # deadline set get a throwaway one instead of logging errors.
+        redis = fake_redis()
+        if redis is not None:
+            for module in (events, metrics, scheduler):
+                patcher = mock.patch.object(module, "get_redis", return_value=redis)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+        self.seller = User.objects.create_user(username="seller", password="pass12345")
+        self.bidder = User.objects.create_user(username="bidder", password="pass12345")
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_image(self, name="photo.png", size=(64, 48), format="PNG"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, format=format)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{format.lower()}")
+
+    def auction_payload(self, **kwargs):
+        payload = {
+            "name": "Guitar",
+            "description": "Barely used",
+            "starting_price": "100.00",
+            "minimal_bid": "5.00",
+            "category": "music",
+            "deadline": (timezone.now() + timedelta(days=1)).isoformat(),
+            "uploaded_images": [self.make_image()],
+        }
+        payload.update(kwargs)
+        return payload
+
+    def make_auction(self, **kwargs):
+        fields = {
+            "name": "Guitar",
+            "description": "Barely used",
+            "author": self.seller,
+            "starting_price": Decimal("100.00"),
+            "minimal_bid": Decimal("5.00"),
+            "category": Auction.CategoryChoices.MUSIC,
+            "deadline": timezone.now() + timedelta(days=1),
+        }
+        fields.update(kwargs)
+        return Auction.objects.create(**fields)
+
+    def place_bid(self, auction, amount, user=None):
+        self.client.force_authenticate(user or self.bidder)
+        response = self.client.post(reverse("bids", args=[auction.pk]), {"amount": amount})
+        self.client.force_authenticate(None)
+        return response
+
+
+class AuctionPriceTests(AuctionTestCase):
+    def test_new_auction_starts_at_starting_price(self):
+        auction = self.make_auction()
+        self.assertEqual(auction.current_price, Decimal("100.00"))
+        self.assertEqual(auction.bid_count, 0)
+        self.assertIsNone(auction.last_bid_on)
+
+    def test_bid_updates_stored_price(self):
+        auction = self.make_auction()
+        self.assertEqual(self.place_bid(auction, "120.00").status_code, 201)
+        self.assertEqual(self.place_bid(auction, "130.00").status_code, 201)
+
+        auction.refresh_from_db()
+        self.assertEqual(auction.current_price, Decimal("130.00"))
+        self.assertEqual(auction.bid_count, 2)
+        self.assertEqual(auction.last_bid_on, Bid.objects.latest("placed_on").placed_on)
+
+    def test_bid_below_increment_rejected(self):
+        auction = self.make_auction()
+        self.place_bid(auction, "120.00")
+        response = self.place_bid(auction, "122.00")
+
+        self.assertEqual(response.status_code, 400)
+        auction.refresh_from_db()
+        self.assertEqual(auction.bid_count, 1)
+
+    def test_list_filters_and_orders_by_stored_price(self):
+        cheap = self.make_auction(name="Cheap", starting_price=Decimal("10.00"))
+        pricey = self.make_auction(name="Pricey", starting_price=Decimal("50.00"))
+        self.place_bid(cheap, "200.00")
+
+        response = self.client.get(reverse("auctions"), {"ordering": "-highest_bid_amount"})
+        self.assertEqual([a["id"] for a in response.data["results"]], [cheap.pk, pricey.pk])
+        self.assertEqual(response.data["results"][0]["highest_bid"], "200.00")
+
+        response = self.client.get(reverse("auctions"), {"max_bid": "100"})
+        self.assertEqual([a["id"] for a in response.data["results"]], [pricey.pk])
+
+
+class PlaceBidTests(AuctionTestCase):
+    def assertRejected(self, reason, auction, amount, user=None):
+        with self.assertRaises(BidRejected) as caught:
+            place_bid(auction.pk, user or self.bidder, amount)
+        self.assertEqual(caught.exception.reason, reason)
+
+    def test_first_bid_needs_minimal_bid(self):
+        auction = self.make_auction(minimal_bid=Decimal("5.00"))
+        self.assertRejected(BidRejected.OUTBID, auction, "4.99")
+        bid = place_bid(auction.pk, self.bidder, "5.00")
+        self.assertEqual(bid.amount, Decimal("5.00"))
+
+    def test_rejects_own_auction(self):
+        auction = self.make_auction()
+        self.assertRejected(BidRejected.OWN_AUCTION, auction, "500.00", user=self.seller)
+
+    def test_rejects_after_deadline(self):
+        auction = self.make_auction(deadline=timezone.now() - timedelta(seconds=1))
+        self.assertRejected(BidRejected.ENDED, auction, "500.00")
+
+    def test_stale_amount_is_outbid(self):
+        auction = self.make_auction()
+        place_bid(auction.pk, self.bidder, "120.00")
+        # A second bidder who read the price before the first bid landed.
+        self.assertRejected(BidRejected.OUTBID, auction, "105.00")
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), 1)
+
+    def test_rejection_is_reported_as_non_field_error(self):
+        auction = self.make_auction()
+        response = self.place_bid(auction, "500.00", user=self.seller)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"], ["You can't bid on your auction"])
+
+    def test_missing_auction_is_404(self):
+        self.client.force_authenticate(self.bidder)
+        response = self.client.post(reverse("bids", args=[999]), {"amount": "10.00"})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(HOT_AUCTION_LEDGER=True)
+class HotAuctionLedgerTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fake_redis()
+        if self.redis is None:
+            self.skipTest("fakeredis is not installed")
+        patcher = mock.patch.object(ledger, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.auction = self.make_auction(is_hot=True)
+
+    def test_bids_are_queued_then_flushed(self):
+        place_bid(self.auction.pk, self.bidder, "120.00")
+        place_bid(self.auction.pk, self.bidder, "130.00")
+        self.assertFalse(Bid.objects.exists())
+
+        self.assertEqual(flush_hot_bids(), 2)
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_price, Decimal("130.00"))
+        self.assertEqual(self.auction.bid_count, 2)
+        self.assertEqual(
+            list(Bid.objects.order_by("pk").values_list("amount", flat=True)),
+            [Decimal("120.00"), Decimal("130.00")],
+        )
+
+    def test_ledger_rejects_like_the_database(self):
+        place_bid(self.auction.pk, self.bidder, "120.00")
+        with self.assertRaises(BidRejected) as caught:
+            place_bid(self.auction.pk, self.bidder, "124.99")
+        self.assertEqual(caught.exception.message, "Bid must be at least $125.00")
+
+        with self.assertRaises(BidRejected) as caught:
+            place_bid(self.auction.pk, self.seller, "500.00")
+        self.assertEqual(caught.exception.reason, BidRejected.OWN_AUCTION)
+
+    def test_ledger_rejects_in_the_database_order(self):
+        Auction.objects.filter(pk=self.auction.pk).update(deadline=timezone.now() - timedelta(seconds=1))
+        self.auction.refresh_from_db()
+        ledger.load(self.auction)
+        with self.assertRaises(BidRejected) as caught:
+            place_bid(self.auction.pk, self.seller, "500.00")
+        self.assertEqual(caught.exception.reason, BidRejected.OWN_AUCTION)
+
+    def test_other_auctions_skip_the_ledger(self):
+        auction = self.make_auction()
+        with mock.patch.object(ledger, "try_place_bid") as try_place_bid:
+            self.assertIsNotNone(place_bid(auction.pk, self.bidder, "120.00").pk)
+        try_place_bid.assert_not_called()
+
+    def test_ledger_bids_have_no_id_yet(self):
+        response = self.place_bid(self.auction, "120.00")
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("id", response.data)
+        self.assertEqual(response.data["amount"], "120.00")
+
+    def test_redis_errors_fall_back_to_the_database(self):
+        with mock.patch.object(ledger, "get_redis", side_effect=ConnectionError), \
+                self.assertLogs("api.bidding", level="ERROR"):
+            bid = place_bid(self.auction.pk, self.bidder, "120.00")
+            with self.assertRaises(BidRejected):
+                place_bid(self.auction.pk, self.bidder, "121.00")
+        self.assertIsNotNone(bid.pk)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_price, Decimal("120.00"))
+
+    def test_queued_bids_survive_a_failed_close(self):
+        place_bid(self.auction.pk, self.bidder, "120.00")
+        with mock.patch("api.closing.auctions_changed", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            close_auctions(Auction.objects.filter(pk=self.auction.pk))
+
+        self.assertFalse(Auction.objects.get(pk=self.auction.pk).closed)
+        self.assertEqual(list(Bid.objects.values_list("amount", flat=True)), [Decimal("120.00")])
+
+    def test_close_reconciles_ledger(self):
+        place_bid(self.auction.pk, self.bidder, "120.00")
+        Auction.objects.filter(pk=self.auction.pk).update(deadline=timezone.now() - timedelta(seconds=1))
+
+        close_expired_auctions()
+
+        self.auction.refresh_from_db()
+        self.assertTrue(self.auction.closed)
+        self.assertEqual(self.auction.current_price, Decimal("120.00"))
+        self.assertEqual(Bid.objects.count(), 1)
+        self.assertFalse(self.redis.exists(ledger.ledger_key(self.auction.pk)))
+
+
+class QueryBudgetTests(AuctionTestCase):
+    """Each endpoint loads a page in a fixed number of queries, whatever its size."""
+
+    def seed(self, count, author=None):
+        for i in range(count):
+            auction = self.make_auction(name=f"Auction {i}", author=author or self.seller)
+            AuctionImage.objects.create(auction=auction, image=f"auction_images/{i}-a.jpg")
+            AuctionImage.objects.create(auction=auction, image=f"auction_images/{i}-b.jpg")
+            place_bid(auction.pk, self.bidder, "150.00")
+        return auction
+
+    def assertBudget(self, budget, url, params=None, user=None):
+        for count in (2, 8):
+            with self.subTest(auctions=count):
+                Auction.objects.all().delete()
+                cache.clear()
+                self.seed(count)
+                path = url()
+                self.client.force_authenticate(user)
+                with self.assertNumQueries(budget):
+                    response = self.client.get(path, params or {"size": 20})
+                self.assertEqual(response.status_code, 200)
+
+    def test_auction_list(self):
+        # count, page with authors, images
+        self.assertBudget(3, lambda: reverse("auctions"))
+
+    def test_auction_list_with_filters(self):
+        self.assertBudget(3, lambda: reverse("auctions"), {"category": "music", "min_bid": 10, "ordering": "-highest_bid_amount"})
+
+    def test_user_auctions(self):
+        # version lookup (which also finds the user), count, page, images
+        self.assertBudget(4, lambda: reverse("user_auctions", args=[self.seller.pk]))
+
+    def test_followed_auctions(self):
+        self.bidder.follow(self.seller)
+        self.assertBudget(3, lambda: reverse("followed_auctions"), user=self.bidder)
+
+    def test_bids_list(self):
+        auction = self.make_auction()
+        for i in range(8):
+            bidder = User.objects.create_user(username=f"bidder-{i}")
+            place_bid(auction.pk, bidder, 110 + i * 10)
+
+        # version lookup (which also finds the auction), count, page with bidders
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("bids", args=[auction.pk]))
+        self.assertEqual(response.data["results"][0]["bidder"], {"id": bidder.pk, "username": "bidder-7"})
+
+    def test_auction_detail(self):
+        # version lookup, auction with author, images
+        self.assertBudget(3, lambda: reverse("auction", args=[Auction.objects.latest("pk").pk]))
+
+
+class UserCounterTests(AuctionTestCase):
+    def follow(self, user, target):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse("follow_user", args=[target.pk]))
+
+    def test_follow_toggle_updates_counters(self):
+        self.follow(self.bidder, self.seller)
+        self.seller.refresh_from_db()
+        self.bidder.refresh_from_db()
+        self.assertEqual((self.seller.followers_count, self.bidder.following_count), (1, 1))
+
+        self.follow(self.bidder, self.seller)
+        self.seller.refresh_from_db()
+        self.bidder.refresh_from_db()
+        self.assertEqual((self.seller.followers_count, self.bidder.following_count), (0, 0))
+
+    def test_auction_create_and_close_update_counters(self):
+        self.client.force_authenticate(self.seller)
+        response = self.client.post(reverse("auctions"), self.auction_payload(), format="multipart")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.seller.refresh_from_db()
+        self.assertEqual((self.seller.auctions_count, self.seller.open_auctions_count), (1, 1))
+
+        Auction.objects.update(deadline=timezone.now() - timedelta(seconds=1))
+        close_expired_auctions()
+        close_expired_auctions()
+        self.seller.refresh_from_db()
+        self.assertEqual((self.seller.auctions_count, self.seller.open_auctions_count), (1, 0))
+
+    def test_profile_is_a_single_row_fetch(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("user", args=[self.seller.pk]))
+        self.assertEqual(response.data["followers_count"], 0)
+
+    def test_recount_repairs_drift(self):
+        self.make_auction()
+        self.bidder.follows.add(self.seller)
+        User.objects.filter(pk=self.seller.pk).update(auctions_count=7)
+
+        call_command("recount_user_stats", stdout=io.StringIO())
+
+        self.seller.refresh_from_db()
+        self.assertEqual((self.seller.followers_count, self.seller.auctions_count), (1, 1))
+        self.assertEqual(User.objects.get(pk=self.bidder.pk).following_count, 1)
+
+
+class CursorPaginationTests(AuctionTestCase):
+    def walk(self, url, params, backwards_check=True):
+        pages = []
+        response = self.client.get(url, {**params, "cursor": ""})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pages.append([item["id"] for item in response.data["results"]])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        if backwards_check and len(pages) > 1:
+            previous = self.client.get(response.data["previous"])
+            self.assertEqual([item["id"] for item in previous.data["results"]], pages[-2])
+        return [pk for page in pages for pk in page]
+
+    def test_walks_every_ordering_in_order(self):
+        for i in range(7):
+            auction = self.make_auction(name=f"Auction {i}", deadline=timezone.now() + timedelta(days=i % 3 + 1))
+            if i % 2:
+                place_bid(auction.pk, self.bidder, 200 + i)
+
+        for ordering in ("created_on", "-created_on", "highest_bid_amount", "-highest_bid_amount", "deadline", "-deadline"):
+            with self.subTest(ordering=ordering):
+                field = ordering.replace("highest_bid_amount", "current_price")
+                expected = list(Auction.objects.order_by(field, "pk").values_list("pk", flat=True))
+                walked = self.walk(reverse("auctions"), {"ordering": ordering, "size": 3})
+                self.assertEqual(walked, expected)
+
+    def test_bids_and_user_auctions(self):
+        auction = self.make_auction()
+        for i in range(5):
+            place_bid(auction.pk, self.bidder, 110 + i * 10)
+        walked = self.walk(reverse("bids", args=[auction.pk]), {"size": 2})
+        self.assertEqual(walked, list(Bid.objects.order_by("-amount").values_list("pk", flat=True)))
+
+        for i in range(4):
+            self.make_auction(closed=i % 2 == 0)
+        walked = self.walk(reverse("user_auctions", args=[self.seller.pk]), {"size": 2})
+        self.assertEqual(len(set(walked)), 5)
+
+    def test_deep_pages_skip_count(self):
+        for i in range(6):
+            self.make_auction(name=f"Auction {i}")
+        first = self.client.get(reverse("auctions"), {"cursor": "", "size": 2})
+        # page with authors, images
+        with self.assertNumQueries(2):
+            self.client.get(first.data["next"])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("auctions"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_crafted_cursor_values_are_404(self):
+        auction = self.make_auction()
+        place_bid(auction.pk, self.bidder, 110)
+
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps({"v": values, "b": False}).encode()).decode()
+
+        for url, values in [
+            (reverse("auctions"), ["abc", 1]),
+            (reverse("auctions"), [{"x": 1}, 1]),
+            (reverse("auctions"), ["2026-01-01", "x"]),
+            (reverse("auctions"), [None, None]),
+            (reverse("auctions"), ["2026-01-01", 99999999999999999999999]),
+            (reverse("bids", args=[auction.pk]), ["lots", 1]),
+            (reverse("user_auctions", args=[self.seller.pk]), ["maybe", "2026-01-01", 1]),
+        ]:
+            with self.subTest(url=url, values=values):
+                response = self.client.get(url, {"cursor": cursor(values)})
+                self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_still_work(self):
+        for i in range(3):
+            self.make_auction()
+        response = self.client.get(reverse("auctions"), {"size": 2, "page": 2})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+class IndexUsageTests(AuctionTestCase):
+    """The hot access paths are served by an index rather than a scan plus sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = User.objects.bulk_create(User(username=f"seeder-{i}") for i in range(25))
+        now = timezone.now()
+        auctions = Auction.objects.bulk_create(
+            Auction(
+                name=f"Auction {i}",
+                description="Seeded",
+                author=authors[i % 25],
+                starting_price=Decimal(i % 97 + 1),
+                current_price=Decimal(i % 97 + 1),
+                category=Auction.CategoryChoices.values[i % 6],
+                closed=i % 4 == 0,
+                deadline=now + timedelta(hours=i % 48 - 6),
+            )
+            for i in range(500)
+        )
+        Bid.objects.bulk_create(
+            Bid(auction=auctions[i % 50], bidder=authors[i % 7], amount=Decimal(i + 1)) for i in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Small tables are cheaper to scan; only check the index is usable.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_listing_by_created_on(self):
+        self.assertUsesIndex(
+            Auction.objects.for_display().filter(closed=False).order_by("-created_on")[:10],
+            "auction_open_created_idx",
+        )
+
+    def test_listing_by_deadline(self):
+        self.assertUsesIndex(
+            Auction.objects.filter(closed=True).order_by("deadline")[:10],
+            "auction_closed_deadline_idx",
+        )
+        self.assertUsesIndex(
+            Auction.objects.filter(closed=False).order_by("deadline")[:10],
+            "auction_open_deadline_idx",
+        )
+
+    def test_listing_by_price(self):
+        self.assertUsesIndex(
+            Auction.objects.filter(closed=False, current_price__gte=10).order_by("-current_price")[:10],
+            "auction_open_price_idx",
+        )
+
+    def test_user_auctions(self):
+        author = User.objects.get(username="seeder-3")
+        self.assertUsesIndex(
+            Auction.objects.filter(author=author).order_by("closed", "deadline")[:10],
+            "auction_author_status_idx",
+        )
+
+    def test_expiry_sweep(self):
+        self.assertUsesIndex(
+            Auction.objects.filter(closed=False, deadline__lte=timezone.now()).values("pk"),
+            "auction_open_deadline_idx",
+        )
+
+    def test_bids_by_amount(self):
+        auction = Auction.objects.order_by("pk").first()
+        self.assertUsesIndex(
+            Bid.objects.filter(auction=auction).order_by("-amount")[:10],
+            "bid_auction_amount_idx",
+        )
+
+
+class ResponseCacheTests(AuctionTestCase):
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_listing_is_served_from_cache(self):
+        self.make_auction()
+        first = self.get("auctions", closed="false")
+        with self.assertNumQueries(0):
+            second = self.get("auctions", closed="FALSE ")
+        self.assertEqual(first.data, second.data)
+
+    def test_bid_invalidates_listing_and_detail(self):
+        auction = self.make_auction()
+        self.get("auctions")
+        self.get("auction", auction.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(auction.pk, self.bidder, "150.00")
+
+        self.assertEqual(self.get("auctions").data["results"][0]["highest_bid"], "150.00")
+        self.assertEqual(self.get("auction", auction.pk).data["highest_bid"], "150.00")
+
+    def test_bid_leaves_other_details_cached(self):
+        auction, other = self.make_auction(), self.make_auction()
+        self.get("auction", other.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(auction.pk, self.bidder, "150.00")
+
+        # Only the ETag's version lookup.
+        with self.assertNumQueries(1):
+            self.get("auction", other.pk)
+
+    def test_create_and_close_invalidate_user_auctions(self):
+        self.get("user_auctions", self.seller.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = self.make_auction()
+        self.assertEqual(self.get("user_auctions", self.seller.pk).data["count"], 1)
+
+        Auction.objects.update(deadline=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            close_expired_auctions()
+        self.assertTrue(self.get("user_auctions", self.seller.pk).data["results"][0]["closed"])
+        self.assertTrue(self.get("auction", auction.pk).data["closed"])
+
+    def test_stats(self):
+        self.get("auctions")
+        self.get("auctions")
+        admin = User.objects.create_superuser(username="admin", password="pass12345")
+        self.client.force_authenticate(admin)
+        response = self.get("response_cache_stats")
+        self.assertEqual(response.data["auctions"], {"hits": 1, "misses": 1})
+
+
+class DeadlineSchedulerTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fake_redis()
+        if self.redis is None:
+            self.skipTest("fakeredis is not installed")
+        patcher = mock.patch.object(scheduler, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_created_auctions_are_scheduled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = self.make_auction()
+        self.assertEqual(self.redis.zscore(scheduler.DEADLINES_KEY, auction.pk), auction.deadline.timestamp())
+
+    def test_due_auctions_close_with_winner(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            due = self.make_auction(deadline=timezone.now() + timedelta(seconds=1))
+            later = self.make_auction()
+        place_bid(due.pk, self.bidder, "110.00")
+        winner = place_bid(due.pk, User.objects.create_user(username="late"), "120.00")
+
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + timedelta(seconds=2)):
+            self.assertEqual(close_due_auctions(), 1)
+
+        due.refresh_from_db()
+        later.refresh_from_db()
+        self.assertTrue(due.closed)
+        self.assertEqual(due.winning_bid, winner)
+        self.assertFalse(later.closed)
+        self.assertEqual(scheduler.pending(), 1)
+
+    @override_settings(AUCTION_CLOSE_BATCH_SIZE=2, AUCTION_CLOSE_MAX_BATCHES=2)
+    def test_due_auctions_are_closed_in_bounded_batches(self):
+        past = timezone.now() - timedelta(seconds=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                self.make_auction(deadline=past)
+
+        self.assertEqual(close_due_auctions(), 4)
+        self.assertEqual(close_due_auctions(), 1)
+        self.assertFalse(Auction.objects.filter(closed=False).exists())
+
+    def test_locked_auctions_stay_scheduled(self):
+        past = timezone.now() - timedelta(seconds=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = self.make_auction(deadline=past)
+            gone = self.make_auction(deadline=past)
+        gone.delete()
+
+        # As if close_auctions skipped the row while a bid held its lock.
+        with mock.patch("api.closing.close_auctions", return_value=[]):
+            self.assertEqual(close_due_auctions(), 0)
+        self.assertEqual(self.redis.zrange(scheduler.DEADLINES_KEY, 0, -1), [str(auction.pk).encode()])
+
+        self.assertEqual(close_due_auctions(), 1)
+        self.assertEqual(scheduler.pending(), 0)
+
+    def test_extended_deadlines_are_not_closed_early(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            auction = self.make_auction(deadline=timezone.now() - timedelta(seconds=1))
+        extended = timezone.now() + timedelta(hours=1)
+        Auction.objects.filter(pk=auction.pk).update(deadline=extended)
+
+        self.assertEqual(close_due_auctions(), 0)
+        self.assertFalse(Auction.objects.get(pk=auction.pk).closed)
+        self.assertEqual(self.redis.zscore(scheduler.DEADLINES_KEY, auction.pk), extended.timestamp())
+
+    @override_settings(AUCTION_CLOSE_BATCH_SIZE=2)
+    def test_sweep_closes_unscheduled_auctions(self):
+        for _ in range(5):
+            self.make_auction(deadline=timezone.now() - timedelta(seconds=1))
+        open_auction = self.make_auction()
+
+        self.assertEqual(close_expired_auctions(), 5)
+        self.assertEqual(list(Auction.objects.filter(closed=False)), [open_auction])
+
+
+class ImagePipelineTests(AuctionTestCase):
+    def upload(self, size=(2000, 1500)):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        Image.new("RGB", size, "blue").save(buffer, format="JPEG", exif=exif)
+        auction = self.make_auction()
+        return AuctionImage.objects.create(
+            auction=auction, image=SimpleUploadedFile("photo.jpg", buffer.getvalue())
+        )
+
+    def test_upload_only_enqueues_processing(self):
+        self.client.force_authenticate(self.seller)
+        with mock.patch("api.serializers.process_auction_image.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("auctions"), self.auction_payload(), format="multipart")
+
+        image_id = response.data["images"][0]["id"]
+        delay.assert_called_once_with(image_id)
+        self.assertEqual(response.data["images"][0]["variants"], {})
+        self.assertIsNone(AuctionImage.objects.get(pk=image_id).thumbnail_width)
+
+    def test_broker_outage_does_not_fail_the_upload(self):
+        self.client.force_authenticate(self.seller)
+        with mock.patch("api.serializers.process_auction_image.delay", side_effect=ConnectionError), \
+                self.assertLogs(level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("auctions"), self.auction_payload(), format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        image_id = response.data["images"][0]["id"]
+        Auction.objects.update(created_on=timezone.now() - timedelta(hours=1))
+        with mock.patch("api.tasks.process_auction_image.delay") as delay:
+            self.assertEqual(process_pending_images(), 1)
+        delay.assert_called_once_with(image_id)
+
+    def test_sweep_skips_queued_and_failed_images(self):
+        queued, failed = self.upload(), self.upload()
+        Auction.objects.update(created_on=timezone.now() - timedelta(hours=1))
+        with mock.patch("api.images.process", side_effect=OSError), self.assertLogs(level="ERROR"):
+            with self.assertRaises(OSError):
+                images.process_by_id(failed.pk)
+
+        with mock.patch("api.tasks.process_auction_image.delay") as delay:
+            self.assertEqual(process_pending_images(), 1)
+            self.assertEqual(process_pending_images(), 0)
+        delay.assert_called_once_with(queued.pk)
+        self.assertIsNotNone(AuctionImage.objects.get(pk=failed.pk).failed_on)
+
+        AuctionImage.objects.filter(pk=queued.pk).update(queued_on=timezone.now() - timedelta(hours=1))
+        with mock.patch("api.tasks.process_auction_image.delay") as delay:
+            self.assertEqual(process_pending_images(), 1)
+        delay.assert_called_once_with(queued.pk)
+
+    def test_variants_are_resized_and_stripped(self):
+        auction_image = images.process(self.upload())
+
+        self.assertEqual((auction_image.width, auction_image.height), (2000, 1500))
+        self.assertEqual((auction_image.thumbnail_width, auction_image.thumbnail_height), (240, 180))
+        self.assertEqual((auction_image.medium_width, auction_image.medium_height), (960, 720))
+        self.assertEqual((auction_image.webp_width, auction_image.webp_height), (960, 720))
+
+        with auction_image.webp.open("rb") as webp:
+            self.assertEqual(Image.open(webp).format, "WEBP")
+        for field in ("image", "thumbnail", "medium"):
+            with getattr(auction_image, field).open("rb") as file:
+                self.assertEqual(len(Image.open(file).getexif()), 0)
+
+    def test_serializer_exposes_variants(self):
+        auction_image = images.process(self.upload(size=(100, 80)))
+
+        response = self.client.get(reverse("auction", args=[auction_image.auction_id]))
+        variants = response.data["images"][0]["variants"]
+        self.assertEqual(set(variants), {"thumbnail", "medium", "webp"})
+        self.assertEqual(variants["thumbnail"]["width"], 100)
+        self.assertTrue(variants["webp"]["url"].endswith(".webp"))
+
+
+class AuctionCreateTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.seller)
+
+    def test_images_are_inserted_in_one_query(self):
+        payload = self.auction_payload(uploaded_images=[self.make_image(f"{i}.png") for i in range(5)])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("auctions"), payload, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["images"]), 5)
+        self.assertEqual(response.data["images"][0]["width"], 64)
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "api_auctionimage"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_invalid_image_rejects_whole_auction(self):
+        truncated = self.make_image("bad.jpg", format="JPEG").read()[:200]
+        payload = self.auction_payload(uploaded_images=[
+            self.make_image("1.png"),
+            SimpleUploadedFile("bad.jpg", truncated, content_type="image/jpeg"),
+            SimpleUploadedFile("notes.png", b"not an image", content_type="image/png"),
+        ])
+        response = self.client.post(reverse("auctions"), payload, format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data["uploaded_images"]), 2)
+        self.assertFalse(Auction.objects.exists())
+        self.assertFalse(AuctionImage.objects.exists())
+
+    def test_failed_image_insert_rolls_back_auction(self):
+        with mock.patch.object(AuctionImage.objects, "bulk_create", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse("auctions"), self.auction_payload(), format="multipart")
+
+        self.assertFalse(Auction.objects.exists())
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.auctions_count, 0)
+
+    def bulk_payload(self, auctions, files):
+        return {"auctions": json.dumps(auctions), **files}
+
+    def bulk_item(self, name, images):
+        return self.auction_payload(name=name, uploaded_images=images)
+
+    def test_bulk_create(self):
+        auctions = [self.bulk_item("Guitar", ["a", "b"]), self.bulk_item("Drums", ["c"])]
+        files = {name: self.make_image(f"{name}.png") for name in ("a", "b", "c")}
+
+        with mock.patch("api.serializers.process_auction_image.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("bulk_auctions"), self.bulk_payload(auctions, files), format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(delay.call_count, 3)
+        self.assertEqual([auction["name"] for auction in response.data], ["Guitar", "Drums"])
+        self.assertEqual([len(auction["images"]) for auction in response.data], [2, 1])
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.auctions_count, 2)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        auctions = [self.bulk_item("Guitar", ["a"]), self.bulk_item("Drums", ["b"])]
+        files = {
+            "a": self.make_image("a.png"),
+            "b": SimpleUploadedFile("b.png", b"not an image", content_type="image/png"),
+        }
+        response = self.client.post(reverse("bulk_auctions"), self.bulk_payload(auctions, files), format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Auction.objects.exists())
+
+    def test_bulk_create_requires_file_parts(self):
+        auctions = [self.bulk_item("Guitar", ["missing"])]
+        response = self.client.post(reverse("bulk_auctions"), self.bulk_payload(auctions, {}), format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("missing", response.data["auctions"][0])
+
+
+class SearchTests(AuctionTestCase):
+    def search(self, text, **params):
+        response = self.client.get(reverse("auctions"), {"search": text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_matches_name_and_description_with_prefixes_and_stems(self):
+        self.make_auction(name="Fender guitar", description="Sunburst finish")
+        self.make_auction(name="Drum kit", description="Comes with a guitar stand")
+        self.make_auction(name="Bicycle", description="Road bike")
+
+        self.assertEqual(self.search("guitars"), ["Fender guitar", "Drum kit"])
+        self.assertEqual(self.search("sunb"), ["Fender guitar"])
+        self.assertEqual(self.search("guitar stand"), ["Drum kit"])
+        self.assertEqual(self.search("violin"), [])
+
+    def test_name_matches_rank_first(self):
+        self.make_auction(name="Stand", description="Fits any guitar")
+        self.make_auction(name="Old guitar", description="Needs strings")
+
+        self.assertEqual(self.search("guitar"), ["Old guitar", "Stand"])
+        self.assertEqual(self.search("guitar", ordering="created_on"), ["Stand", "Old guitar"])
+
+    def test_combines_with_filters_and_closed_split(self):
+        self.make_auction(name="Guitar", category=Auction.CategoryChoices.MUSIC)
+        self.make_auction(name="Guitar poster", category=Auction.CategoryChoices.OTHER)
+        self.make_auction(name="Sold guitar", closed=True)
+
+        self.assertEqual(self.search("guitar", category="other"), ["Guitar poster"])
+        self.assertEqual(self.search("guitar", closed="true"), ["Sold guitar"])
+
+    def test_index_follows_edits_and_deletes(self):
+        auction = self.make_auction(name="Guitar")
+        auction.name = "Ukulele"
+        auction.save()
+        self.assertEqual(self.search("guitar"), [])
+        self.assertEqual(self.search("ukulele"), ["Ukulele"])
+
+        place_bid(auction.pk, self.bidder, Decimal("150.00"))
+        self.assertEqual(self.search("ukulele"), ["Ukulele"])
+
+        auction.delete()
+        cache.clear()
+        self.assertEqual(self.search("ukulele"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.make_auction(name="Guitar")
+        for text in ('"guitar', "guitar*)", "NOT guitar", "guitar OR", "!!!"):
+            with self.subTest(text=text):
+                self.assertEqual(self.client.get(reverse("auctions"), {"search": text}).status_code, 200)
+        self.assertEqual(self.search("guitar: OR (NOT"), [])
+
+    def test_keyset_pages_follow_rank(self):
+        for i in range(5):
+            self.make_auction(name=f"Guitar {i}", description="guitar " * i)
+
+        expected = self.search("guitar", size=10)
+        names, url, params = [], reverse("auctions"), {"search": "guitar", "size": 2, "cursor": ""}
+        while url:
+            response = self.client.get(url, params)
+            names += [item["name"] for item in response.data["results"]]
+            url, params = response.data["next"], None
+        self.assertEqual(names, expected)
+
+
+class AuctionEventsTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        try:
+            import fakeredis # type: ignore
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server)
+        for patcher in (
+            mock.patch.object(events, "get_redis", return_value=self.redis),
+            mock.patch.object(events.aioredis, "from_url", lambda url: fakeredis.aioredis.FakeRedis(server=server)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def publish(self, auction, event, data):
+        self.redis.publish(events.channel(auction.pk), json.dumps({"event": event, "data": data}))
+
+    def test_accepted_bids_and_close_are_published(self):
+        auction = self.make_auction()
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(events.channel(auction.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(auction.pk, self.bidder, "110.00")
+            with self.assertRaises(BidRejected):
+                place_bid(auction.pk, self.bidder, "111.00")
+            close_auctions(Auction.objects.filter(pk=auction.pk))
+
+        # get_message() also returns None for the skipped subscribe confirmation.
+        received = (pubsub.get_message(timeout=0.1) for _ in range(5))
+        messages = [json.loads(message["data"]) for message in received if message]
+        self.assertEqual([message["event"] for message in messages], [events.BID, events.CLOSED])
+        self.assertEqual(messages[0]["data"]["amount"], "110.00")
+        self.assertEqual(messages[0]["data"]["bidder"], {"id": self.bidder.pk, "username": "bidder"})
+
+    async def test_stream_sends_snapshot_then_events_until_close(self):
+        auction = await sync_to_async(self.make_auction)()
+        response = await self.async_client.get(reverse("auction_events", args=[auction.pk]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+
+        snapshot = await anext(stream)
+        self.assertTrue(snapshot.startswith(b"event: auction\n"))
+        self.assertIn(b'"current_price": "100.00"', snapshot)
+
+        self.publish(auction, events.BID, {"amount": "110.00"})
+        self.assertEqual(await asyncio.wait_for(anext(stream), 5), b'event: bid\ndata: {"amount": "110.00"}\n\n')
+
+        self.publish(auction, events.CLOSED, {"closed": True})
+        self.assertTrue((await asyncio.wait_for(anext(stream), 5)).startswith(b"event: closed\n"))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertFalse(events.get_broadcaster().queues)
+
+    async def test_slow_viewer_gets_a_fresh_snapshot(self):
+        auction = await sync_to_async(self.make_auction)()
+        broadcaster = events.get_broadcaster()
+        with self.settings(BID_STREAM_QUEUE_SIZE=2):
+            queue = await broadcaster.subscribe(auction.pk)
+        try:
+            for amount in ("110.00", "120.00", "130.00"):
+                broadcaster.dispatch(events.channel(auction.pk), json.dumps({"event": events.BID, "data": {"amount": amount}}))
+            self.assertEqual(await queue.get(), (events.RESYNC, None))
+            self.assertTrue(queue.empty())
+        finally:
+            await broadcaster.unsubscribe(auction.pk, queue)
+
+    async def test_closed_and_missing_auctions(self):
+        auction = await sync_to_async(self.make_auction)(closed=True)
+        response = await self.async_client.get(reverse("auction_events", args=[auction.pk]))
+        frames = [frame async for frame in response.streaming_content]
+        self.assertEqual(len(frames), 1)
+        self.assertIn(b'"closed": true', frames[0])
+
+        response = await self.async_client.get(reverse("auction_events", args=[auction.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_wsgi_requests_are_refused(self):
+        auction = await sync_to_async(self.make_auction)()
+        response = await sync_to_async(self.client.get)(reverse("auction_events", args=[auction.pk]))
+        self.assertEqual(response.status_code, 501)
+
+
+class FollowedFeedTests(AuctionTestCase):
+    def feed(self, user=None, **params):
+        self.client.force_authenticate(user or self.bidder)
+        response = self.client.get(reverse("followed_auctions"), params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_new_auctions_reach_followers(self):
+        self.bidder.follow(self.seller)
+        self.make_auction(name="Later", deadline=timezone.now() + timedelta(days=3))
+        self.make_auction(name="Sooner", deadline=timezone.now() + timedelta(days=1))
+        self.make_auction(name="Not followed", author=User.objects.create_user(username="other"))
+
+        self.assertEqual(self.feed(), ["Sooner", "Later"])
+        self.assertEqual(self.feed(user=self.seller), [])
+
+    def test_follow_toggle_adds_and_removes_existing_auctions(self):
+        self.make_auction(name="Guitar")
+        self.client.force_authenticate(self.bidder)
+
+        self.client.post(reverse("follow_user", args=[self.seller.pk]))
+        self.assertEqual(self.feed(), ["Guitar"])
+
+        self.client.post(reverse("follow_user", args=[self.seller.pk]))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_closed_auctions_move_to_the_end(self):
+        self.bidder.follow(self.seller)
+        first = self.make_auction(name="First", deadline=timezone.now() + timedelta(days=1))
+        self.make_auction(name="Second", deadline=timezone.now() + timedelta(days=2))
+
+        close_auctions(Auction.objects.filter(pk=first.pk))
+        self.assertEqual(self.feed(), ["Second", "First"])
+        self.assertEqual(self.feed(cursor="", size=1), ["Second"])
+
+    @mock.patch("api.models.FEED_BATCH_SIZE", 2)
+    def test_large_audiences_are_fanned_out_by_a_task(self):
+        followers = [User.objects.create_user(username=f"follower-{i}") for i in range(3)]
+        for follower in followers:
+            follower.follow(self.seller)
+        self.seller.refresh_from_db()
+
+        with mock.patch("api.tasks.fan_out_auction.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                auction = self.make_auction(name="Guitar")
+        delay.assert_called_once_with(auction.pk)
+        self.assertFalse(FeedEntry.objects.exists())
+
+        # Closed before the task ran.
+        close_auctions(Auction.objects.filter(pk=auction.pk))
+        fan_out_auction(auction.pk)
+        self.assertEqual(FeedEntry.objects.filter(auction=auction, closed=True).count(), 3)
+        self.assertEqual(self.feed(user=followers[0]), ["Guitar"])
+
+    def test_rebuild_cold_feeds(self):
+        self.make_auction(name="Guitar")
+        # Follows written behind the feed's back leave it cold.
+        self.bidder.follows.add(self.seller)
+        self.assertEqual(self.feed(), [])
+
+        call_command("rebuild_feeds", stdout=io.StringIO())
+        self.assertEqual(self.feed(), ["Guitar"])
+
+
+class StatelessAuthTests(AuctionTestCase):
+    def authorize(self, user):
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_reads_do_not_load_the_user(self):
+        self.bidder.follow(self.seller)
+        self.make_auction()
+        self.authorize(self.bidder)
+        url = reverse("followed_auctions")
+
+        # feed count, page, images
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_token_user_is_not_following_itself(self):
+        self.authorize(self.seller)
+        response = self.client.get(reverse("user", args=[self.seller.pk]))
+        self.assertIsNone(response.data["is_following"])
+
+        response = self.client.get(reverse("user", args=[self.bidder.pk]))
+        self.assertIs(response.data["is_following"], False)
+
+    def test_writes_use_a_cached_user(self):
+        auction = self.make_auction()
+        self.authorize(self.bidder)
+
+        response = self.client.post(reverse("bids", args=[auction.pk]), {"amount": "110.00"})
+        self.assertEqual(response.status_code, 201)
+        cached = cache.get(user_cache_key(self.bidder.pk))
+        self.assertEqual(cached.pk, self.bidder.pk)
+        self.assertNotIn("password", cached.__dict__)
+
+        with self.assertNumQueries(4):
+            # savepoint, auction update, bid insert, release; no user lookup
+            response = self.client.post(reverse("bids", args=[auction.pk]), {"amount": "120.00"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["bidder"]["username"], "bidder")
+
+    def test_admin_endpoint_checks_the_stored_user(self):
+        self.authorize(self.bidder)
+        self.assertEqual(self.client.get(reverse("response_cache_stats")).status_code, 403)
+
+        self.bidder.is_staff = True
+        self.bidder.save()
+        cache.delete(user_cache_key(self.bidder.pk))
+        self.assertEqual(self.client.get(reverse("response_cache_stats")).status_code, 200)
+
+
+class AsyncReadTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = self.make_auction()
+        AuctionImage.objects.create(auction=self.auction, image=self.make_image())
+        self.place_bid(self.auction, "120.00")
+        self.bidder.follow(self.seller)
+        self.token = MyTokenObtainPairSerializer.get_token(self.bidder).access_token
+
+    def drf_json(self, view, path, params=None, **kwargs):
+        cache.clear()
+        request = request_factory().get(path, params, HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return json.loads(view.as_view()(request, **kwargs).render().content)
+
+    def test_matches_drf_views(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        cases = [
+            (views.ListCreateAuctionAPIView, reverse("auctions"), {}, {}),
+            (views.ListCreateAuctionAPIView, reverse("auctions"), {"ordering": "-current_price", "page_size": 1}, {}),
+            (views.RetrieveAuctionAPIView, reverse("auction", args=[self.auction.pk]), {}, {"auction_id": self.auction.pk}),
+            (views.ListCreateBidAPIView, reverse("bids", args=[self.auction.pk]), {}, {"auction_id": self.auction.pk}),
+            (views.RetrieveUserAPIView, reverse("user", args=[self.seller.pk]), {}, {"user_id": self.seller.pk}),
+            (views.RetrieveAuctionAPIView, reverse("auction", args=[0]), {}, {"auction_id": 0}),
+        ]
+        for view, path, params, kwargs in cases:
+            with self.subTest(path=path, params=params):
+                cache.clear()
+                response = self.client.get(path, params)
+                self.assertEqual(response.json(), self.drf_json(view, path, params, **kwargs))
+
+    async def test_reads_skip_the_drf_handlers(self):
+        with mock.patch.object(views.RetrieveAuctionAPIView, "get") as sync_get, \
+                mock.patch.object(views.ListCreateBidAPIView, "get") as sync_list:
+            response = await self.async_client.get(reverse("auction", args=[self.auction.pk]))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)["highest_bid"], "120.00")
+
+            response = await self.async_client.get(reverse("bids", args=[self.auction.pk]))
+            self.assertEqual(json.loads(response.content)["count"], 1)
+        sync_get.assert_not_called()
+        sync_list.assert_not_called()
+
+    async def test_writes_go_to_the_drf_view(self):
+        token = await sync_to_async(lambda: str(self.token))()
+        response = await self.async_client.post(
+            reverse("bids", args=[self.auction.pk]),
+            {"amount": "130.00"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 201)
+        await self.auction.arefresh_from_db()
+        self.assertEqual(self.auction.current_price, Decimal("130.00"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(AuctionTestCase):
+    def route(self, method="get", user=None, status=200):
+        # The view reports where a read would go without running it.
+        def view(request):
+            return HttpResponse(Auction.objects.all().db, status=status)
+
+        request = getattr(RequestFactory(), method)("/")
+        request.user = user or AnonymousUser()
+        return ReplicaRoutingMiddleware(view)(request).content.decode()
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.route(), "replica")
+        self.assertEqual(self.route(user=self.bidder), "replica")
+        self.assertEqual(self.route("post", user=self.bidder), "default")
+        self.assertEqual(Auction.objects.all().db, "default")
+
+    def test_writers_read_their_writes(self):
+        self.route("post", user=self.bidder)
+        self.assertEqual(self.route(user=self.bidder), "default")
+        self.assertEqual(self.route(user=self.seller), "replica")
+
+        cache.delete(pin_key(self.bidder.pk))
+        self.assertEqual(self.route(user=self.bidder), "replica")
+
+    def test_failed_and_anonymous_writes_do_not_pin(self):
+        self.route("post", user=self.bidder, status=400)
+        self.route("post")
+        self.assertEqual(self.route(user=self.bidder), "replica")
+
+    def test_drf_writes_pin_the_authenticated_user(self):
+        auction = self.make_auction()
+        self.assertEqual(self.place_bid(auction, "120.00").status_code, 201)
+        self.assertTrue(cache.get(pin_key(self.bidder.pk)))
+        self.assertIsNone(cache.get(pin_key(self.seller.pk)))
+
+    async def test_async_views_route_in_the_orm_thread(self):
+        async def view(request):
+            return HttpResponse(await sync_to_async(lambda: Auction.objects.all().db)())
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        response = await ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(response.content, b"replica")
+
+    @override_settings(DATABASE_REPLICAS=["replica", "replica_2"])
+    def test_one_replica_per_request(self):
+        def view(request):
+            return HttpResponse(",".join({Auction.objects.all().db for _ in range(20)}))
+
+        for _ in range(5):
+            request = RequestFactory().get("/")
+            request.user = AnonymousUser()
+            self.assertIn(ReplicaRoutingMiddleware(view)(request).content.decode(), ["replica", "replica_2"])
+
+    def test_cached_responses_are_built_from_the_primary(self):
+        mixin = CachedResponseMixin()
+        mixin.cache_name = "routing"
+        seen = []
+
+        def handler(request):
+            seen.append(Auction.objects.all().db)
+            return Response({})
+
+        def view(request):
+            mixin.cached_response(handler, Request(request))
+            seen.append(Auction.objects.all().db)
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(seen, ["default", "replica"])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(ReplicaRouter().allow_migrate("replica", "api"))
+        self.assertTrue(ReplicaRouter().allow_migrate("default", "api"))
+
+
+class LoadToolTests(AuctionTestCase):
+    def seed(self):
+        call_command(
+            "seed_data", users=30, follows_per_user=4, auctions=60, bids=600, chunk_size=25,
+            prefix="t", stdout=io.StringIO(),
+        )
+
+    def test_seed_data_matches_what_the_app_would_store(self):
+        self.seed()
+        self.assertEqual(Auction.objects.count(), 60)
+        self.assertEqual(Bid.objects.count(), 600)
+        self.assertEqual(AuctionImage.objects.exclude(thumbnail="").count(), 60)
+
+        output = io.StringIO()
+        call_command("recount_user_stats", dry_run=True, stdout=output)
+        self.assertIn("Found 0 users", output.getvalue())
+
+        for auction in Auction.objects.prefetch_related("bids"):
+            bids = sorted(auction.bids.all(), key=lambda bid: bid.amount)
+            self.assertEqual(auction.bid_count, len(bids))
+            if bids:
+                self.assertEqual(auction.current_price, bids[-1].amount)
+                self.assertEqual(auction.last_bid_on, max(bid.placed_on for bid in bids))
+                self.assertNotIn(auction.author_id, {bid.bidder_id for bid in bids})
+            self.assertEqual(auction.winning_bid_id, bids[-1].pk if auction.closed and bids else None)
+
+        follower = User.objects.filter(username__startswith="t-").first()
+        expected = Auction.objects.filter(author__followers=follower).count()
+        self.assertEqual(FeedEntry.objects.filter(user=follower).count(), expected)
+
+    def test_bench_endpoints_records_every_route(self):
+        self.seed()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = f"{directory}/results.json"
+        redis = fake_redis()
+        if redis is None:
+            self.skipTest("fakeredis is not installed")
+        with mock.patch("api.serializers.process_auction_image.delay"), \
+                mock.patch.object(metrics, "get_redis", return_value=redis):
+            call_command("bench_endpoints", requests=2, output=output, stdout=io.StringIO())
+
+        with open(output) as results:
+            routes = json.load(results)["routes"]
+        names = {pattern.name for pattern in urls.urlpatterns} | {"register", "get_token", "refresh"}
+        self.assertLessEqual(names, set(routes))
+        for name, result in routes.items():
+            with self.subTest(name):
+                self.assertEqual(result["requests"], 2)
+                self.assertEqual(set(result["statuses"]) - {"200", "201"}, set())
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fake_redis()
+        if self.redis is None:
+            self.skipTest("fakeredis is not installed")
+        patcher = mock.patch.object(metrics, "get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, **headers):
+        return self.client.get(reverse("metrics"), **{"HTTP_AUTHORIZATION": "Bearer secret", **headers})
+
+    async def test_async_requests_flush_off_the_event_loop(self):
+        async def view(request):
+            return HttpResponse()
+
+        threads = []
+        with mock.patch.object(metrics, "flush_due", return_value=True), \
+                mock.patch.object(metrics, "flush", side_effect=lambda: threads.append(threading.get_ident())):
+            await MetricsMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    def test_responses_report_server_timing(self):
+        self.make_auction()
+        response = self.client.get(reverse("auctions"))
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("render;dur=", timing)
+
+    def test_requests_are_recorded_per_view(self):
+        self.make_auction()
+        self.client.get(reverse("auctions"))
+        self.client.get(reverse("auctions"))
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="auctions"} 2', body)
+        self.assertIn('http_request_db_queries_bucket{method="GET",view="auctions",le="+Inf"} 2', body)
+        self.assertIn('http_request_serialize_seconds_sum{method="GET",view="auctions"}', body)
+
+    def test_celery_tasks_are_recorded(self):
+        auction = self.make_auction()
+        Auction.objects.filter(pk=auction.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        close_expired_auctions.apply()
+
+        body = self.scrape().content.decode()
+        self.assertIn('celery_task_duration_seconds_count{task="api.tasks.close_expired_auctions"} 1', body)
+        self.assertNotIn('celery_task_db_queries_bucket{task="api.tasks.close_expired_auctions",le="0"} 1', body)
+
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.scrape().status_code, 200)
+
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+            with self.settings(METRICS_PUBLIC=True):
+                self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    def test_slow_sampled_requests_are_profiled(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_SLOW_REQUEST_SECONDS=0, PROFILE_DIR=directory):
+            self.client.get(reverse("auctions"))
+        with override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_SLOW_REQUEST_SECONDS=60, PROFILE_DIR=directory):
+            self.client.get(reverse("auctions"))
+        profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith("auctions-"))
+
+
+class AuctionFacetsTests(AuctionTestCase):
+    def facets(self, **params):
+        response = self.client.get(reverse("auction_facets"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_facets_are_one_query(self):
+        self.make_auction(starting_price=Decimal("5.00"))
+        self.make_auction(starting_price=Decimal("120.00"), category=Auction.CategoryChoices.HOME)
+        self.make_auction(starting_price=Decimal("7000.00"))
+        self.make_auction(starting_price=Decimal("30.00"), closed=True)
+
+        with self.assertNumQueries(1):
+            data = self.facets()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["categories"]["music"], 2)
+        self.assertEqual(data["categories"]["home"], 1)
+        self.assertEqual(data["categories"]["sports"], 0)
+        self.assertEqual((data["min_price"], data["max_price"]), ("5.00", "7000.00"))
+        histogram = data["price_histogram"]
+        self.assertEqual(histogram[0], {"min": None, "max": "10.00", "count": 1})
+        self.assertEqual(histogram[-1], {"min": "5000.00", "max": None, "count": 1})
+        self.assertEqual(sum(bucket["count"] for bucket in histogram), 3)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        self.make_auction(starting_price=Decimal("5.00"))
+        self.make_auction(starting_price=Decimal("120.00"), category=Auction.CategoryChoices.HOME)
+        self.make_auction(starting_price=Decimal("300.00"), category=Auction.CategoryChoices.HOME)
+
+        data = self.facets(category="home", min_bid="100", max_bid="200")
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["categories"]["home"], 1)
+        self.assertEqual(data["categories"]["music"], 0)
+        self.assertEqual((data["min_price"], data["max_price"]), ("120.00", "300.00"))
+        self.assertEqual(sum(bucket["count"] for bucket in data["price_histogram"]), 2)
+
+    def test_search_and_closed_match_the_listing(self):
+        self.make_auction(name="Red guitar")
+        self.make_auction(name="Blue piano")
+        self.make_auction(name="Old guitar", closed=True)
+
+        self.assertEqual(self.facets(search="guitar")["count"], 1)
+        self.assertEqual(self.facets(search="guitar", closed="true")["count"], 1)
+        self.assertEqual(self.facets(closed="true")["categories"]["music"], 1)
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse("auction_facets"), {"category": "boats"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bids_and_closing_invalidate_cached_facets(self):
+        auction = self.make_auction()
+        self.facets()
+        with self.assertNumQueries(0):
+            self.facets()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(auction.pk, self.bidder, "400.00")
+        self.assertEqual(self.facets()["max_price"], "400.00")
+
+        Auction.objects.filter(pk=auction.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            close_auctions(Auction.objects.filter(pk=auction.pk))
+        self.assertEqual(self.facets()["count"], 0)
+        self.assertEqual(self.facets(closed="true")["count"], 1)
+
+
+class BatchRetrieveAuctionTests(AuctionTestCase):
+    def batch(self, ids):
+        return self.client.get(reverse("auction_batch"), {"ids": ",".join(map(str, ids))})
+
+    def test_auctions_come_back_in_order_with_missing_ids(self):
+        auctions = [self.make_auction(name=f"Item {i}") for i in range(3)]
+        for auction in auctions:
+            AuctionImage.objects.create(auction=auction, image=self.make_image())
+        ids = [auctions[2].pk, 999, auctions[0].pk, auctions[2].pk]
+
+        # versions, auctions with authors, images
+        with self.assertNumQueries(3):
+            response = self.batch(ids)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [auctions[2].pk, auctions[0].pk])
+        self.assertEqual(response.data["missing"], [999])
+        self.assertEqual(
+            response.data["results"][0], self.client.get(reverse("auction", args=[auctions[2].pk])).data,
+        )
+
+    def test_detail_cache_is_shared(self):
+        cached, fresh = self.make_auction(), self.make_auction()
+        self.client.get(reverse("auction", args=[cached.pk]))
+
+        # update() doesn't bump the version, so a cached copy keeps the old name.
+        Auction.objects.filter(pk__in=[cached.pk, fresh.pk]).update(name="Renamed")
+        names = [item["name"] for item in self.batch([cached.pk, fresh.pk]).data["results"]]
+        self.assertEqual(names, ["Guitar", "Renamed"])
+
+        # Only the versions.
+        with self.assertNumQueries(1):
+            response = self.batch([cached.pk, fresh.pk])
+        self.assertEqual(len(response.data["results"]), 2)
+        # Only the ETag's version lookup.
+        with self.assertNumQueries(1):
+            self.client.get(reverse("auction", args=[fresh.pk]))
+
+    def test_bids_invalidate_batched_auctions(self):
+        auction = self.make_auction()
+        self.batch([auction.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(auction.pk, self.bidder, "150.00")
+        self.assertEqual(self.batch([auction.pk]).data["results"][0]["highest_bid"], "150.00")
+
+    def test_ids_are_validated(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.client.get(reverse("auction_batch"), {"ids": "1,x"}).status_code, 400)
+        with mock.patch.object(views.BatchRetrieveAuctionAPIView, "max_ids", 2):
+            self.assertEqual(self.batch([1, 2, 3]).status_code, 400)
+        for ids in ([0], [-3], [1, 99999999999999999999999]):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.batch(ids).status_code, 400)
+
+    def test_cold_versions_are_added_in_one_pipeline(self):
+        try:
+            import fakeredis # type: ignore
+        except ImportError:
+            self.skipTest("fakeredis is not installed")
+        redis_cache = {"default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://fake/0",
+            "OPTIONS": {"CONNECTION_POOL_KWARGS": {
+                "connection_class": fakeredis.FakeConnection, "server": fakeredis.FakeServer(),
+            }},
+        }}
+        keys = [f"version:test:{i}" for i in range(200)]
+        with self.settings(CACHES=redis_cache), mock.patch.object(cache, "add", side_effect=AssertionError):
+            versions = get_versions(keys)
+            self.assertEqual(get_versions(keys), versions)
+        self.assertEqual(len(versions), 200)
+        self.assertNotIn(None, versions.values())
+
+
+class ConditionalGetTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.auction = self.make_auction()
+        AuctionImage.objects.create(auction=self.auction, image=self.make_image())
+        self.place_bid(self.auction, "120.00")
+        self.client.force_authenticate(None)
+        self.paths = {
+            "auction": reverse("auction", args=[self.auction.pk]),
+            "bids": reverse("bids", args=[self.auction.pk]),
+            "user_auctions": reverse("user_auctions", args=[self.seller.pk]),
+        }
+
+    def poll(self, name, etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(self.paths[name], params, **headers)
+
+    def test_unchanged_polls_cost_one_query_and_no_body(self):
+        for name in self.paths:
+            with self.subTest(name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as full:
+                    first = self.poll(name)
+                self.assertEqual(first.status_code, 200)
+                etag = first["ETag"]
+
+                with CaptureQueriesContext(connection) as conditional:
+                    with mock.patch.object(views.AuctionSerializer, "to_representation") as auction_data, \
+                            mock.patch.object(views.BidSerializer, "to_representation") as bid_data:
+                        second = self.poll(name, etag)
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second["ETag"], etag)
+                auction_data.assert_not_called()
+                bid_data.assert_not_called()
+
+                self.assertEqual(len(conditional), 1)
+                self.assertGreater(len(full), len(conditional))
+                self.assertEqual(len(second.content), 0)
+                self.assertGreater(len(first.content), 100)
+
+    def test_bids_change_every_etag(self):
+        etags = {name: self.poll(name)["ETag"] for name in self.paths}
+        self.place_bid(self.auction, "130.00")
+        self.client.force_authenticate(None)
+        for name, etag in etags.items():
+            with self.subTest(name):
+                response = self.poll(name, etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_closing_and_images_change_etags(self):
+        etag = self.poll("user_auctions")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            close_auctions(Auction.objects.filter(pk=self.auction.pk))
+        self.assertEqual(self.poll("user_auctions", etag).status_code, 200)
+
+        etag = self.poll("auction")["ETag"]
+        images.process(self.auction.images.get())
+        self.assertEqual(self.poll("auction", etag).status_code, 200)
+
+    def test_bids_change_the_users_etag_without_writing_the_user(self):
+        etag = self.poll("user_auctions")["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            place_bid(self.auction.pk, self.bidder, "150.00")
+        self.assertFalse([query for query in queries if 'UPDATE "api_user"' in query["sql"]])
+        self.assertEqual(self.poll("user_auctions", etag).status_code, 200)
+
+    def test_archiving_changes_the_users_etag(self):
+        close_auctions(Auction.objects.filter(pk=self.auction.pk))
+        etag = self.poll("user_auctions")["ETag"]
+        archive_auctions(Auction.objects.filter(pk=self.auction.pk))
+        response = self.poll("user_auctions", etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_new_auctions_change_the_users_etag(self):
+        etag = self.poll("user_auctions")["ETag"]
+        self.make_auction()
+        self.assertEqual(self.poll("user_auctions", etag).status_code, 200)
+
+    def test_bodies_follow_the_etag_without_the_cache_bump(self):
+        for name in ("auction", "user_auctions"):
+            with self.subTest(name):
+                etag = self.poll(name)["ETag"]
+                with mock.patch("api.cache._bump"):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        place_bid(self.auction.pk, self.bidder, f"{200 + len(name)}.00")
+                response = self.poll(name, etag)
+                self.assertEqual(response.status_code, 200)
+                data = response.data if name == "auction" else response.data["results"][0]
+                self.assertEqual(data["highest_bid"], f"{200 + len(name)}.00")
+                self.assertEqual(self.poll(name, response["ETag"]).status_code, 304)
+
+    def test_etag_depends_on_query_params(self):
+        first = self.poll("bids")["ETag"]
+        self.assertNotEqual(self.poll("bids", size=1)["ETag"], first)
+        self.assertEqual(self.poll("bids", first, size=1).status_code, 200)
+
+    def test_missing_auction_is_still_404(self):
+        response = self.client.get(reverse("auction", args=[999]), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 404)
+
+
+class ArchiveTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder.follow(self.seller)
+        self.old = self.make_auction(name="Vintage guitar")
+        AuctionImage.objects.create(auction=self.old, image=self.make_image())
+        place_bid(self.old.pk, self.bidder, "120.00")
+        place_bid(self.old.pk, self.bidder, "130.00")
+        self.recent = self.make_auction(name="Recent guitar")
+        self.open = self.make_auction(name="Open guitar")
+        Auction.objects.filter(pk=self.old.pk).update(deadline=timezone.now() - timedelta(days=40))
+        Auction.objects.filter(pk=self.recent.pk).update(deadline=timezone.now() - timedelta(days=1))
+        close_auctions(Auction.objects.filter(pk__in=[self.old.pk, self.recent.pk]))
+
+    def responses(self):
+        cache.clear()
+        return {
+            "auction": self.client.get(reverse("auction", args=[self.old.pk])).data,
+            "bids": self.client.get(reverse("bids", args=[self.old.pk])).data,
+            "closed": self.client.get(reverse("auctions"), {"closed": "true"}).data,
+            "search": self.client.get(reverse("auctions"), {"closed": "true", "search": "vintage"}).data,
+            "user_auctions": self.client.get(reverse("user_auctions", args=[self.seller.pk])).data,
+            "batch": self.client.get(reverse("auction_batch"), {"ids": f"{self.old.pk},{self.open.pk}"}).data,
+            "facets": self.client.get(reverse("auction_facets"), {"closed": "true"}).data,
+        }
+
+    def test_old_closed_auctions_move_with_bids_and_images(self):
+        self.assertEqual(archive_closed_auctions.apply().get(), 1)
+
+        self.assertEqual(set(Auction.objects.values_list("pk", flat=True)), {self.recent.pk, self.open.pk})
+        archived = ArchivedAuction.objects.get()
+        self.assertEqual((archived.pk, archived.name, archived.bid_count), (self.old.pk, "Vintage guitar", 2))
+        self.assertEqual(archived.winning_bid.amount, Decimal("130.00"))
+        self.assertEqual(archived.bids.count(), 2)
+        self.assertEqual(archived.images.count(), 1)
+        self.assertFalse(Bid.objects.filter(auction_id=self.old.pk).exists())
+        self.assertFalse(AuctionImage.objects.filter(auction_id=self.old.pk).exists())
+        self.assertFalse(FeedEntry.objects.filter(auction_id=self.old.pk).exists())
+
+    def test_reads_are_the_same_after_archiving(self):
+        before = self.responses()
+        archive_closed_auctions.apply()
+        after = self.responses()
+        for name in before:
+            with self.subTest(name):
+                self.assertEqual(json.loads(json.dumps(after[name])), json.loads(json.dumps(before[name])))
+        self.assertEqual([item["id"] for item in after["search"]["results"]], [self.old.pk])
+        self.assertEqual(after["bids"]["count"], 2)
+
+    def test_search_index_survives_the_move(self):
+        archive_closed_auctions.apply()
+        ArchivedAuction.objects.filter(pk=self.old.pk).update(name="Vintage banjo")
+        open_search = self.client.get(reverse("auctions"), {"search": "guitar"}).data
+        self.assertEqual([item["id"] for item in open_search["results"]], [self.open.pk])
+        closed_search = self.client.get(reverse("auctions"), {"closed": "true", "search": "banjo"}).data
+        self.assertEqual([item["id"] for item in closed_search["results"]], [self.old.pk])
+
+    def test_stored_counters_still_match(self):
+        archive_closed_auctions.apply()
+        output = io.StringIO()
+        call_command("recount_user_stats", dry_run=True, stdout=output)
+        self.assertIn("Found 0 users", output.getvalue())
+
+
+class ThrottleTests(AuctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fake_redis()
+        if self.redis is None:
+            self.skipTest("fakeredis is not installed")
+        for module in (throttling, metrics):
+            patcher = mock.patch.object(module, "get_redis", return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        buckets = self.settings(THROTTLE_BUCKETS={
+            "bids": {"rate": "1/m", "burst": 2},
+            "search": {"rate": "1/m", "burst": 1},
+            "register": {"rate": "1/h", "burst": 1},
+        })
+        buckets.enable()
+        self.addCleanup(buckets.disable)
+
+    def register(self, username, **extra):
+        return self.client.post(reverse("register"), {"username": username, "password": "pass12345"}, **extra)
+
+    def test_bids_are_throttled_per_user(self):
+        auction = self.make_auction()
+        self.assertEqual(self.place_bid(auction, "105.00").status_code, 201)
+        self.assertEqual(self.place_bid(auction, "110.00").status_code, 201)
+
+        response = self.place_bid(auction, "115.00")
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(55 <= int(response["Retry-After"]) <= 60)
+
+        other = User.objects.create_user(username="other", password="pass12345")
+        self.assertEqual(self.place_bid(auction, "115.00", user=other).status_code, 201)
+
+    def test_bid_listing_is_not_throttled(self):
+        auction = self.make_auction()
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse("bids", args=[auction.pk])).status_code, 200)
+
+    def test_only_searches_are_throttled(self):
+        self.make_auction()
+        self.assertEqual(self.client.get(reverse("auctions"), {"search": "guitar"}).status_code, 200)
+        self.assertEqual(self.client.get(reverse("auctions"), {"search": "guitar"}).status_code, 429)
+        self.assertEqual(self.client.get(reverse("auction_facets"), {"search": "guitar"}).status_code, 429)
+        self.assertEqual(self.client.get(reverse("auctions")).status_code, 200)
+
+    def test_registration_is_throttled_per_ip(self):
+        self.assertEqual(self.register("first", REMOTE_ADDR="10.0.0.1").status_code, 201)
+        self.assertEqual(self.register("second", REMOTE_ADDR="10.0.0.1").status_code, 429)
+        self.assertEqual(self.register("third", REMOTE_ADDR="10.0.0.2").status_code, 201)
+
+    def test_forwarded_for_does_not_reset_the_bucket(self):
+        self.assertEqual(self.register("first", HTTP_X_FORWARDED_FOR="1.1.1.1").status_code, 201)
+        self.assertEqual(self.register("second", HTTP_X_FORWARDED_FOR="2.2.2.2").status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1})
+    def test_clients_behind_a_proxy_are_told_apart(self):
+        self.assertEqual(self.register("first", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.1.1.1").status_code, 201)
+        self.assertEqual(self.register("second", HTTP_X_FORWARDED_FOR="1.1.1.1").status_code, 429)
+        self.assertEqual(self.register("third", HTTP_X_FORWARDED_FOR="2.2.2.2").status_code, 201)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_outcomes_are_counted_in_metrics(self):
+        self.register("first")
+        self.register("second")
+        self.register("third")
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('http_throttle_requests_total{outcome="allowed",scope="register"} 1', body)
+        self.assertIn('http_throttle_requests_total{outcome="rejected",scope="register"} 2', body)
+
+    def test_redis_errors_let_requests_through(self):
+        with mock.patch.object(throttling, "get_redis", side_effect=ConnectionError), \
+                self.assertLogs("api.throttling", level="ERROR"):
+            self.assertEqual(self.register("first").status_code, 201)
+            self.assertEqual(self.register("second").status_code, 201)
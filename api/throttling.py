@@ -0,0 +1,110 @@
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection # type: ignore
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import THROTTLE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Token buckets kept in Redis, so every web worker draws from the same
+# bucket. Each scope in THROTTLE_BUCKETS gives a client (the user, or the
+# IP address when anonymous) `burst` requests at once, refilled at `rate`.
+# Taking a token, and counting the outcome for metrics/, is one script
+# call: one round trip per throttled request.
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: bucket hash, counter hash
+# ARGV: burst, tokens per second, allowed field, rejected field
+# Returns the seconds until a token is available, 0 if one was taken.
+TAKE_TOKEN = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    redis.call('HINCRBY', KEYS[2], ARGV[3], 1)
+else
+    wait = (1 - tokens) / rate
+    redis.call('HINCRBY', KEYS[2], ARGV[4], 1)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+def get_redis():
+    return get_redis_connection('default')
+
+
+def parse_rate(rate):
+    """Tokens per second for a rate like '30/m'."""
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period[0]]
+
+
+def bucket_key(scope, ident):
+    return f'throttle:{scope}:{ident}'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Rejects a client's request when its bucket for `scope` is empty, with
+    a Retry-After of the time until the next token. Scopes missing from
+    THROTTLE_BUCKETS aren't throttled, and a Redis error lets the request
+    through.
+    """
+    scope = None
+
+    def get_cache_ident(self, request):
+        user = request.user
+        if user and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        bucket = settings.THROTTLE_BUCKETS.get(self.scope)
+        if bucket is None:
+            return True
+
+        try:
+            wait = float(get_redis().eval(
+                TAKE_TOKEN, 2,
+                bucket_key(self.scope, self.get_cache_ident(request)), THROTTLE_REQUESTS.key,
+                bucket['burst'], parse_rate(bucket['rate']),
+                THROTTLE_REQUESTS.field(scope=self.scope, outcome='allowed'),
+                THROTTLE_REQUESTS.field(scope=self.scope, outcome='rejected'),
+            ))
+        except Exception:
+            logger.exception("Could not check the %s throttle", self.scope)
+            return True
+
+        if wait > 0:
+            self.retry_after = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class BidThrottle(TokenBucketThrottle):
+    scope = 'bids'
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = 'search'
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
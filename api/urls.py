@@ -1,13 +1,19 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
-    path('users/<int:user_id>/', views.RetrieveUserAPIView.as_view(), name="user"),
+    path('users/<int:user_id>/', async_views.UserDetailView.as_view(), name="user"),
     path('users/<int:user_id>/auctions/', views.ListUserAuctions.as_view(), name="user_auctions"),
     path('users/<int:pk>/follow/', views.FollowUserView.as_view(), name="follow_user"),
-    path('auctions/', views.ListCreateAuctionAPIView.as_view(), name="auctions"),
-    path('auctions/<int:auction_id>/', views.RetrieveAuctionAPIView.as_view(), name="auction"),
-    path('auctions/<int:auction_id>/bids/', views.ListCreateBidAPIView.as_view(), name="bids"),
-    path('auctions/followed/', views.ListFollowedAuctionsAPIView.as_view(), name="followed_auctions")
+    path('auctions/', async_views.AuctionListView.as_view(), name="auctions"),
+    path('auctions/facets/', views.AuctionFacetsAPIView.as_view(), name="auction_facets"),
+    path('auctions/batch/', views.BatchRetrieveAuctionAPIView.as_view(), name="auction_batch"),
+    path('auctions/bulk/', views.BulkCreateAuctionAPIView.as_view(), name="bulk_auctions"),
+    path('auctions/<int:auction_id>/', async_views.AuctionDetailView.as_view(), name="auction"),
+    path('auctions/<int:auction_id>/bids/', async_views.BidListView.as_view(), name="bids"),
+    path('auctions/<int:auction_id>/events/', views.AuctionEventsView.as_view(), name="auction_events"),
+    path('auctions/followed/', views.ListFollowedAuctionsAPIView.as_view(), name="followed_auctions"),
+    path('cache/stats/', views.ResponseCacheStatsView.as_view(), name="response_cache_stats"),
+    path('metrics/', views.MetricsView.as_view(), name="metrics"),
 ]
\ No newline at end of file
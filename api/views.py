@@ -1,24 +1,47 @@
+import asyncio
+import json
+from decimal import ROUND_HALF_UP, Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import User, Auction, Bid
+from django.utils.crypto import constant_time_compare
+from django.views import View
+from .models import User, Auction, AuctionRecord, BidRecord
 from rest_framework import generics
 from .serializers import UserSerializer, AuctionSerializer, BidSerializer, MyTokenObtainPairSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend # type: ignore
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Max
+from .pagination import HybridPagination
+from . import events, metrics
+from .authentication import CachedJWTAuthentication
+from .conditional import ConditionalGetMixin
+from .routers import primary_reads
+from .throttling import BidThrottle, RegisterThrottle, SearchThrottle
+from .cache import (
+    CachedResponseMixin, response_key, stats as response_cache_stats,
+)
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
 from django.db.models.functions import Coalesce
-from .filters import AuctionFilter
+from .filters import AuctionFilter, AuctionSearchFilter
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Case, When, Value, IntegerField
+from rest_framework import status
 
 
 class CreateUserAPIView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterThrottle]
 
 
 class RetrieveUserAPIView(generics.RetrieveAPIView):
@@ -27,48 +50,70 @@ class RetrieveUserAPIView(generics.RetrieveAPIView):
     lookup_url_kwarg = 'user_id'
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        viewer = self.request.user
+        if not viewer.is_authenticated:
+            return queryset
+        return queryset.annotate(viewer_follows=Exists(
+            User.follows.through.objects.filter(from_user_id=viewer.pk, to_user_id=OuterRef('pk'))
+        ))
 
-class ListUserAuctions(generics.ListAPIView):
+
+class ListUserAuctions(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = AuctionSerializer
     lookup_url_kwarg = 'user_id'
     permission_classes = [AllowAny]
-    pagination_class = PageNumberPagination
-    pagination_class.page_size = 10
+    pagination_class = HybridPagination
+    cache_name = 'user_auctions'
+    etag_name = 'user_auctions'
+
+    def get_version_queryset(self):
+        # auctions_version changes with the set of the user's auctions, the
+        # sum of their live auctions' versions with any one of them. Bids
+        # don't write the user's row, so they don't queue on its lock.
+        live_versions = Auction.objects.filter(
+            author=OuterRef('pk')
+        ).order_by().values('author').annotate(total=Sum('version')).values('total')
+        return User.objects.filter(pk=self.kwargs[self.lookup_url_kwarg]).values_list(
+            'auctions_version', Coalesce(Subquery(live_versions), 0),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(partial(self.cached_response, super().list), request, *args, **kwargs)
 
     def get_queryset(self):
-        user = get_object_or_404(User, pk=self.kwargs.get(self.lookup_url_kwarg))
-        queryset = Auction.objects.filter(author=user)
-        return queryset.annotate(
-            closed_order=Case(
-                When(closed=True, then=Value(1)),
-                When(closed=False, then=Value(0)),
-                output_field=IntegerField()
-            )
-        ).order_by("closed_order", "deadline")
+        user_id = self.kwargs.get(self.lookup_url_kwarg)
+        if self.current_version is None:
+            user_id = get_object_or_404(User, pk=user_id).pk
+        # closed sorts False before True, i.e. open auctions first.
+        return AuctionRecord.objects.filter(author_id=user_id).for_display().order_by("closed", "deadline")
 
 
-class ListCreateAuctionAPIView(generics.ListCreateAPIView):
+class ListCreateAuctionAPIView(CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = AuctionSerializer
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        AuctionSearchFilter,
         filters.OrderingFilter
     ]
     filterset_class = AuctionFilter
-    search_fields = ['name']
-    pagination_class = PageNumberPagination
-    pagination_class.page_size = 10
-    pagination_class.page_size_query_param = 'size'
-    pagination_class.max_page_size = 20
+    pagination_class = HybridPagination
     ordering_fields = ['created_on', 'highest_bid_amount', 'deadline']
+    cache_name = 'auctions'
 
-    def get_queryset(self):
-        queryset = Auction.objects.all().annotate(
-            highest_bid_amount=Coalesce(Max('bids__amount'), 'starting_price')
-        ).order_by('-created_on')
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
+    def get_queryset(self):
         is_closed_filter = self.request.query_params.get('closed', 'false')
 
+        # Closed auctions may have been archived.
+        model = AuctionRecord if is_closed_filter.lower() == 'true' else Auction
+        queryset = model.objects.for_display().annotate(
+            highest_bid_amount=F('current_price')
+        ).order_by('-created_on')
+
         if is_closed_filter.lower() == 'true':
             return queryset.filter(closed=True)
         else:
@@ -81,24 +126,186 @@ class ListCreateAuctionAPIView(generics.ListCreateAPIView):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_throttles(self):
+        return search_throttles(self.request)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class RetrieveAuctionAPIView(generics.RetrieveAPIView):
-    queryset = Auction.objects.all()
+def search_throttles(request):
+    # Only full-text searches are throttled; plain listings are cheap.
+    if request.method == 'GET' and request.query_params.get(AuctionSearchFilter.search_param, '').strip():
+        return [SearchThrottle()]
+    return []
+
+
+class AuctionFacetsAPIView(CachedResponseMixin, APIView):
+    """
+    Counts per category, a price histogram and the price range of the
+    auctions auctions/ would list for the same category, min_bid, max_bid,
+    search and closed parameters.
+    """
+    permission_classes = [AllowAny]
+    cache_name = 'auction_facets'
+
+    def get_cache_timeout(self):
+        return settings.FACETS_CACHE_TIMEOUT
+
+    def get_throttles(self):
+        return search_throttles(self.request)
+
+    def get(self, request):
+        return self.cached_response(self.facets, request)
+
+    def facets(self, request):
+        filterset = AuctionFilter(request.query_params, queryset=Auction.objects.none(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        closed = request.query_params.get('closed', 'false').lower() == 'true'
+        queryset = (AuctionRecord if closed else Auction).objects.filter(closed=closed)
+        queryset = AuctionSearchFilter().filter_queryset(request, queryset, self)
+        facets = queryset.facets(
+            category=filterset.form.cleaned_data.get('category'),
+            min_price=filterset.form.cleaned_data.get('min_bid'),
+            max_price=filterset.form.cleaned_data.get('max_bid'),
+            price_buckets=settings.FACETS_PRICE_BUCKETS,
+        )
+        facets['min_price'] = price(facets['min_price'])
+        facets['max_price'] = price(facets['max_price'])
+        for bucket in facets['price_histogram']:
+            bucket['min'] = price(bucket['min'])
+            bucket['max'] = price(bucket['max'])
+        return Response(facets)
+
+
+def price(value):
+    # Formatted like AuctionSerializer.highest_bid.
+    return None if value is None else str(Decimal(value).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+class BulkCreateAuctionAPIView(APIView):
+    """
+    Create several auctions at once, all or nothing.
+
+    Expects a multipart body with an `auctions` field holding a JSON list of
+    auctions. Each auction's `uploaded_images` lists the names of the file
+    parts that belong to it.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    max_auctions = 20
+
+    def post(self, request):
+        try:
+            items = json.loads(request.data.get('auctions', ''))
+        except ValueError:
+            raise ValidationError({'auctions': ["Must be a JSON list of auctions."]})
+
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            raise ValidationError({'auctions': ["Must be a JSON list of auctions."]})
+        if len(items) > self.max_auctions:
+            raise ValidationError({'auctions': [f"Max {self.max_auctions} auctions per request."]})
+
+        for item in items:
+            names = item.get('uploaded_images') or []
+            if not isinstance(names, list):
+                raise ValidationError({'auctions': ["uploaded_images must be a list of file part names."]})
+            missing = [name for name in names if not isinstance(name, str) or name not in request.FILES]
+            if missing:
+                raise ValidationError({'auctions': [f"Missing file parts: {', '.join(map(str, missing))}."]})
+            item['uploaded_images'] = [request.FILES[name] for name in names]
+
+        serializer = AuctionSerializer(data=items, many=True, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(author=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class RetrieveAuctionAPIView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    queryset = AuctionRecord.objects.for_display()
     serializer_class = AuctionSerializer
     lookup_url_kwarg = 'auction_id'
     permission_classes = [AllowAny]
+    cache_name = 'auction'
+    etag_name = 'auction'
 
+    def get_version_queryset(self):
+        return AuctionRecord.objects.filter(pk=self.kwargs[self.lookup_url_kwarg]).values_list('version', flat=True)
 
-class ListCreateBidAPIView(generics.ListCreateAPIView):
-    queryset = Bid.objects.all() 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(partial(self.cached_response, super().retrieve), request, *args, **kwargs)
+
+
+class BatchRetrieveAuctionAPIView(APIView):
+    """
+    Auctions by id, from `?ids=1,2,3`, in the order asked for. Ids with no
+    auction are listed in `missing`. Auctions cached for auctions/<id>/ are
+    served from there; the rest are loaded together and cached for it.
+    """
+    permission_classes = [AllowAny]
+    max_ids = 200
+
+    def get(self, request):
+        ids = self.parse_ids(request.query_params.get('ids', ''))
+
+        # The versions auctions/<id>/ keys its cache on; ids with none are missing.
+        versions = dict(AuctionRecord.objects.filter(pk__in=ids).values_list('pk', 'version'))
+        keys = {
+            auction_id: response_key(
+                RetrieveAuctionAPIView.cache_name, request.get_host(),
+                {RetrieveAuctionAPIView.lookup_url_kwarg: auction_id}, '', [versions[auction_id]],
+            )
+            for auction_id in ids if auction_id in versions
+        }
+        cached = cache.get_many(list(keys.values()))
+        found = {auction_id: cached[key] for auction_id, key in keys.items() if key in cached}
+
+        uncached = [auction_id for auction_id in keys if auction_id not in found]
+        if uncached:
+            auctions = AuctionRecord.objects.for_display().filter(pk__in=uncached)
+            serializer = AuctionSerializer(auctions, many=True, context={'request': request, 'view': self})
+            # Cached for auctions/<id>/, so built from the primary.
+            with primary_reads():
+                loaded = {item['id']: item for item in serializer.data}
+            cache.set_many({keys[auction_id]: item for auction_id, item in loaded.items()}, settings.RESPONSE_CACHE_TIMEOUT)
+            found.update(loaded)
+
+        return Response({
+            'results': [found[auction_id] for auction_id in ids if auction_id in found],
+            'missing': [auction_id for auction_id in ids if auction_id not in found],
+        })
+
+    def parse_ids(self, value):
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise ValidationError({'ids': ["Must be a comma-separated list of auction ids."]})
+        ids = list(dict.fromkeys(ids))
+        largest = connection.ops.integer_field_range(AuctionRecord._meta.pk.get_internal_type())[1]
+        if any(not 0 < auction_id <= largest for auction_id in ids):
+            raise ValidationError({'ids': ["Auction ids must be positive integers."]})
+        if not ids:
+            raise ValidationError({'ids': ["At least one auction id is required."]})
+        if len(ids) > self.max_ids:
+            raise ValidationError({'ids': [f"Max {self.max_ids} auctions per request."]})
+        return ids
+
+
+class ListCreateBidAPIView(ConditionalGetMixin, generics.ListCreateAPIView):
+    queryset = BidRecord.objects.select_related('bidder')
     serializer_class = BidSerializer
     lookup_url_kwarg = 'auction_id'
     permission_classes = [AllowAny]
-    pagination_class = PageNumberPagination
-    pagination_class.page_size = 10
+    pagination_class = HybridPagination
+    etag_name = 'bids'
+
+    def get_version_queryset(self):
+        return AuctionRecord.objects.filter(pk=self.kwargs[self.lookup_url_kwarg]).values_list('version', flat=True)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -107,16 +314,78 @@ class ListCreateBidAPIView(generics.ListCreateAPIView):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_throttles(self):
+        if self.request.method == 'POST':
+            return [BidThrottle()]
+        return []
+
     def get_queryset(self):
-        queryset = super().get_queryset()
-        auction = get_object_or_404(Auction, pk=self.kwargs.get(self.lookup_url_kwarg))
-        queryset = queryset.filter(auction=auction)
-        return queryset.order_by('-amount')
+        auction_id = self.kwargs.get(self.lookup_url_kwarg)
+        if self.current_version is None:
+            auction_id = get_object_or_404(AuctionRecord, pk=auction_id).pk
+        return self.bids(auction_id)
+
+    def bids(self, auction_id):
+        return super().get_queryset().filter(auction_id=auction_id).order_by('-amount')
     
     def perform_create(self, serializer):
         auction_id = self.kwargs.get(self.lookup_url_kwarg)
-        auction = get_object_or_404(Auction, pk=auction_id)
-        serializer.save(bidder=self.request.user, auction=auction)
+        serializer.save(bidder=self.request.user, auction_id=auction_id)
+
+
+class AuctionEventsView(View):
+    """
+    Server-sent events for one auction: an `auction` snapshot on connect,
+    then `bid` events as bids are accepted and a final `closed` event.
+    Needs an ASGI server, where each viewer is a coroutine: under WSGI
+    Django would buffer the whole stream, so it answers 501 there.
+    """
+
+    async def get(self, request, auction_id):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse("Event streams need an ASGI server.", status=501, content_type='text/plain')
+        if not await Auction.objects.filter(pk=auction_id).aexists():
+            raise Http404("No Auction matches the given query.")
+
+        response = StreamingHttpResponse(self.stream(auction_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def snapshot(self, auction_id):
+        state = await Auction.objects.filter(pk=auction_id).values(
+            'current_price', 'bid_count', 'last_bid_on', 'deadline', 'closed'
+        ).afirst()
+        return state or {'closed': True}
+
+    async def stream(self, auction_id):
+        broadcaster = events.get_broadcaster()
+        # Subscribed before the snapshot is read so no bid falls in between.
+        queue = await broadcaster.subscribe(auction_id)
+        try:
+            state = await self.snapshot(auction_id)
+            yield events.encode('auction', state)
+            if state['closed']:
+                return
+
+            while True:
+                try:
+                    # Cheaper than wait_for(), which wraps every wait in a task.
+                    async with asyncio.timeout(settings.BID_STREAM_HEARTBEAT):
+                        event, frame = await queue.get()
+                except TimeoutError:
+                    yield b': keepalive\n\n'
+                    continue
+
+                if event == events.RESYNC:
+                    state = await self.snapshot(auction_id)
+                    frame = events.encode('auction', state)
+                    event = events.CLOSED if state['closed'] else event
+                yield frame
+                if event == events.CLOSED:
+                    return
+        finally:
+            await broadcaster.unsubscribe(auction_id, queue)
 
 
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -128,28 +397,46 @@ class FollowUserView(APIView):
 
     def post(self, request, pk):
         target_user = get_object_or_404(User, pk=pk)
-        if request.user.follows.filter(pk=target_user.pk).exists():
-            request.user.follows.remove(target_user)
+        if request.user.unfollow(target_user):
             return Response({"detail": f"Unfollowed {target_user.username}"})
         else:
-            request.user.follows.add(target_user)
+            request.user.follow(target_user)
             return Response({"detail": f"Followed {target_user.username}"})
         
 
 class ListFollowedAuctionsAPIView(generics.ListAPIView):
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = PageNumberPagination
-    pagination_class.page_size = 10
+    pagination_class = HybridPagination
 
     def get_queryset(self):
-        user = self.request.user
+        # Read from the user's precomputed feed, open auctions first.
         return Auction.objects.filter(
-            author__in=user.follows.all()
-        ).annotate(
-            closed_order=Case(
-                When(closed=True, then=Value(1)),
-                When(closed=False, then=Value(0)),
-                output_field=IntegerField()
-            )
-        ).order_by("closed_order", "deadline")
\ No newline at end of file
+            feed_entries__user_id=self.request.user.pk
+        ).for_display().annotate(
+            feed_closed=F('feed_entries__closed'),
+            feed_deadline=F('feed_entries__deadline'),
+        ).order_by("feed_closed", "feed_deadline")
+
+
+class ResponseCacheStatsView(APIView):
+    # is_staff isn't a token claim, so this needs the real User.
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        views = [ListCreateAuctionAPIView, RetrieveAuctionAPIView, ListUserAuctions, AuctionFacetsAPIView]
+        return Response(response_cache_stats([view.cache_name for view in views]))
+
+
+class MetricsView(View):
+    """Request and task histograms in the Prometheus text format."""
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not settings.METRICS_PUBLIC and not (
+            token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+        ):
+            return HttpResponse(status=403)
+        metrics.flush(force=True)
+        return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
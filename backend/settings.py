@@ -15,6 +15,7 @@ from datetime import timedelta
 from dotenv import load_dotenv
 import os
 from celery.schedules import crontab
+from corsheaders.defaults import default_headers # type: ignore
 
 load_dotenv()
 
@@ -35,18 +36,30 @@ ALLOWED_HOSTS = []
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.StatelessReadJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For. Throttles
+    # key anonymous clients on the address this many hops from the end;
+    # with 0 the header is ignored, so clients can't pick their own.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_USER_CLASS": "api.authentication.TokenUser",
 }
 
+# Seconds a User loaded for an authenticated write is cached.
+AUTH_USER_CACHE_TIMEOUT = 60
+
 
 # Application definition
 
@@ -65,12 +78,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,12 +113,51 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Postgres when POSTGRES_DB is set, otherwise a local SQLite file.
+# POSTGRES_REPLICA_HOSTS is a comma-separated list of read replicas; safe
+# requests read from them through api.routers.ReplicaRouter. Pointing it at
+# the primary's host gives a local stand-in for a replica.
+def postgres(host):
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv("POSTGRES_DB"),
+        'USER': os.getenv("POSTGRES_USER", "postgres"),
+        'PASSWORD': os.getenv("POSTGRES_PASSWORD", ""),
+        'HOST': host,
+        'PORT': os.getenv("POSTGRES_PORT", "5432"),
+        # A connection pool per process (psycopg 3), so requests and the
+        # async views' ORM threads reuse connections instead of opening one
+        # each. Persistent connections (CONN_MAX_AGE) don't work under ASGI.
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                'timeout': int(os.getenv("DB_POOL_TIMEOUT", "10")),
+            },
+        },
     }
-}
+
+
+if os.getenv("POSTGRES_DB"):
+    DATABASES = {'default': postgres(os.getenv("POSTGRES_HOST", "localhost"))}
+    replica_hosts = [host.strip() for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if host.strip()]
+    for i, host in enumerate(replica_hosts):
+        DATABASES[f'replica_{i}'] = {**postgres(host), 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write, so they see
+# their own bids, auctions and follows while replicas catch up.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
 
 
 # Password validation
@@ -157,21 +211,122 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173"
 ]
 
+# Polling clients revalidate with If-None-Match against the ETag.
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match")
+
+CORS_EXPOSE_HEADERS = ["ETag"]
+
 CACHES = {
     "default": {
     "BACKEND": "django_redis.cache.RedisCache",
     "LOCATION": "redis://127.0.0.1:6379/1",
     "OPTIONS": {
         "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        # A Redis outage degrades to cache misses instead of failing reads.
+        "IGNORE_EXCEPTIONS": True,
     }
 }
 }
 
+# Seconds a cached auctions/, auctions/<id>/ or users/<id>/auctions/ response
+# is kept; writes invalidate entries earlier by bumping version keys.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# auctions/facets/ responses are kept briefly; bids and closing auctions
+# invalidate them like listings. The price histogram's buckets end at these
+# prices, plus one open-ended bucket above the last.
+FACETS_CACHE_TIMEOUT = 30
+
+FACETS_PRICE_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Token buckets for bids, searches and registrations, shared by all web
+# workers through Redis. Each user, or IP address when anonymous, can make
+# `burst` requests at once and then `rate` ("<count>/<s|m|h|d>"). Remove a
+# scope to stop throttling it.
+THROTTLE_BUCKETS = {
+    "bids": {"rate": "2/s", "burst": 10},
+    "search": {"rate": "5/s", "burst": 20},
+    "register": {"rate": "5/h", "burst": 5},
+}
+
 CELERY_BROKER_URL = "redis://redis:6379/1"
 
 CELERY_BEAT_SCHEDULE = {
-    'close-expired-auctions-every-minute': {
+    'close-due-auctions': {
+        'task': 'api.tasks.close_due_auctions',
+        'schedule': timedelta(seconds=1),
+    },
+    'close-expired-auctions-sweep': {
         'task': 'api.tasks.close_expired_auctions',
-        'schedule': crontab(minute='*/1'),
+        'schedule': crontab(minute='*/5'),
+    },
+    'flush-hot-bids': {
+        'task': 'api.tasks.flush_hot_bids',
+        'schedule': timedelta(seconds=2),
+    },
+    'process-pending-images': {
+        'task': 'api.tasks.process_pending_images',
+        'schedule': crontab(minute='*/10'),
+    },
+    'archive-closed-auctions': {
+        'task': 'api.tasks.archive_closed_auctions',
+        'schedule': crontab(minute=30),
     },
 }
+
+# Auctions are closed in batches of AUCTION_CLOSE_BATCH_SIZE, at most
+# AUCTION_CLOSE_MAX_BATCHES per run of close_due_auctions.
+AUCTION_CLOSE_BATCH_SIZE = 500
+
+AUCTION_CLOSE_MAX_BATCHES = 20
+
+# Images still unprocessed IMAGE_PENDING_AFTER after their auction was
+# created, or after they were last queued, are queued again,
+# IMAGE_PENDING_BATCH_SIZE per run of process_pending_images.
+IMAGE_PENDING_AFTER = timedelta(minutes=10)
+
+IMAGE_PENDING_BATCH_SIZE = 500
+
+# Auctions whose deadline passed more than ARCHIVE_AFTER ago are moved to
+# the archive tables, ARCHIVE_BATCH_SIZE per transaction and at most
+# ARCHIVE_MAX_BATCHES per run of archive_closed_auctions.
+ARCHIVE_AFTER = timedelta(days=int(os.getenv("ARCHIVE_AFTER_DAYS", "30")))
+
+ARCHIVE_BATCH_SIZE = 500
+
+ARCHIVE_MAX_BATCHES = 20
+
+# Auctions flagged is_hot accept bids against a Redis ledger and are
+# written to the database in batches of HOT_AUCTION_FLUSH_BATCH.
+HOT_AUCTION_LEDGER = os.getenv("HOT_AUCTION_LEDGER", "false").lower() == "true"
+
+HOT_AUCTION_FLUSH_BATCH = 500
+
+# Live auction events are fanned out from Redis pub/sub to server-sent
+# event streams. Viewers more than BID_STREAM_QUEUE_SIZE events behind are
+# sent a fresh snapshot instead.
+BID_STREAM_REDIS_URL = CACHES["default"]["LOCATION"]
+
+BID_STREAM_HEARTBEAT = 15
+
+BID_STREAM_QUEUE_SIZE = 100
+
+# Request and Celery task timings, kept as histograms in Redis and served
+# at metrics/ in the Prometheus text format. Scrapers send METRICS_TOKEN
+# as a bearer token; without one metrics/ answers 403, unless
+# METRICS_PUBLIC opens it to anyone.
+METRICS_SERVER_TIMING = True
+
+METRICS_FLUSH_INTERVAL = 1.0
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
+
+# Share of requests run under cProfile; the ones slower than
+# PROFILE_SLOW_REQUEST_SECONDS are saved to PROFILE_DIR as .prof files.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+PROFILE_SLOW_REQUEST_SECONDS = float(os.getenv("PROFILE_SLOW_REQUEST_SECONDS", "0.5"))
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, 'profiles'))